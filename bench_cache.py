@@ -0,0 +1,139 @@
+"""
+Microbenchmark for DealCache lookups, expiry and memory
+Run this to check that lookup cost stays flat as the dedup window grows
+and to compare memory per entry of the cache implementations
+"""
+import argparse
+import gc
+import random
+import string
+import sys
+import time
+import tracemalloc
+
+from cache import DealCache, PackedDealCache
+
+
+ASIN_CHARS = string.ascii_uppercase + string.digits
+MARKETPLACES = (1, 3, 4, 8, 9)  # Keepa domains: US, DE, FR, IT, ES
+
+IMPLEMENTATIONS = {
+    "dict": lambda hours, size: DealCache(cache_duration_hours=hours),
+    "packed": lambda hours, size: PackedDealCache(cache_duration_hours=hours),
+    "packed+bloom": lambda hours, size: PackedDealCache(cache_duration_hours=hours, bloom_capacity=size),
+}
+
+
+def random_asins(count: int, seed: int) -> list:
+    """Generate random ASIN-like identifiers spread over several marketplaces"""
+    rng = random.Random(seed)
+    return [
+        f"{rng.choice(MARKETPLACES)}-{''.join(rng.choices(ASIN_CHARS, k=10))}"
+        for _ in range(count)
+    ]
+
+
+def fill_cache(cache, asins, window_hours: int, size: int) -> None:
+    """Add size asins to the cache, spread evenly over the window"""
+    now = time.time()
+    step = (window_hours * 3600) / max(size, 1)
+    start = now - window_hours * 3600
+
+    for i, asin in enumerate(asins):
+        cache.add(asin, timestamp=start + i * step)
+
+
+def time_per_op(func, ops: int) -> float:
+    """Run func and return nanoseconds per operation"""
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) / ops * 1e9
+
+
+def bench(impl: str, size: int, window_hours: int, lookups: int) -> dict:
+    """Benchmark lookups and eviction for one implementation and size"""
+    asins = random_asins(size, seed=size)
+    cache = IMPLEMENTATIONS[impl](window_hours, size)
+
+    fill_start = time.perf_counter()
+    fill_cache(cache, asins, window_hours, size)
+    fill_seconds = time.perf_counter() - fill_start
+
+    rng = random.Random(0)
+    hits = [rng.choice(asins) for _ in range(lookups)]
+    misses = random_asins(lookups, seed=-1)
+    cycle = hits[:lookups // 2] + misses[:lookups // 2]
+
+    hit_ns = time_per_op(lambda: [cache.is_cached(a) for a in hits], lookups)
+    miss_ns = time_per_op(lambda: [cache.is_cached(a) for a in misses], lookups)
+    filter_ns = time_per_op(lambda: cache.filter_new(cycle), len(cycle))
+
+    # Force one eviction tick over the oldest 1% of the window
+    cache._next_eviction = 0.0
+    cache.cache_duration_seconds *= 0.99
+    evict_start = time.perf_counter()
+    cache._clean_expired()
+    evict_ms = (time.perf_counter() - evict_start) * 1000
+
+    return {
+        "size": size,
+        "fill_s": fill_seconds,
+        "hit_ns": hit_ns,
+        "miss_ns": miss_ns,
+        "filter_ns": filter_ns,
+        "evict_ms": evict_ms,
+    }
+
+
+def measure_memory(impl: str, size: int, window_hours: int) -> float:
+    """Return bytes allocated per entry for a filled cache"""
+    asins = random_asins(size, seed=size)
+    gc.collect()
+    tracemalloc.start()
+    cache = IMPLEMENTATIONS[impl](window_hours, size)
+    # Fresh string copies, as the scraper hands new strings to the cache every cycle
+    fill_cache(cache, (asin.encode().decode() for asin in asins), window_hours, size)
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del cache
+    return current / size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DealCache microbenchmark")
+    parser.add_argument("--max-size", type=int, default=2_000_000, help="Largest cache size")
+    parser.add_argument("--window-hours", type=int, default=24 * 30, help="Dedup window")
+    parser.add_argument("--lookups", type=int, default=100_000, help="Lookups per measurement")
+    parser.add_argument("--impl", choices=sorted(IMPLEMENTATIONS), action="append", help="Implementations to run")
+    args = parser.parse_args()
+
+    sizes = [s for s in (1_000, 10_000, 100_000, 1_000_000, 2_000_000, 5_000_000) if s <= args.max_size]
+    impls = args.impl or list(IMPLEMENTATIONS)
+
+    for impl in impls:
+        print(f"\n{impl} cache (window {args.window_hours}h, {args.lookups} lookups)")
+        print("=" * 66)
+        print(f"{'entries':>10} {'fill s':>8} {'hit ns':>8} {'miss ns':>8} {'filter ns':>10} {'evict ms':>9}")
+        print("-" * 66)
+
+        for size in sizes:
+            r = bench(impl, size, args.window_hours, args.lookups)
+            print(
+                f"{r['size']:>10} {r['fill_s']:>8.2f} {r['hit_ns']:>8.0f} {r['miss_ns']:>8.0f} "
+                f"{r['filter_ns']:>10.0f} {r['evict_ms']:>9.1f}"
+            )
+            sys.stdout.flush()
+
+    memory_size = min(sizes[-1], 1_000_000)
+    print(f"\nMemory per entry ({memory_size} entries, tracemalloc)")
+    print("=" * 30)
+    for impl in impls:
+        print(f"{impl:>14} {measure_memory(impl, memory_size, args.window_hours):>10.1f} B")
+        sys.stdout.flush()
+
+    print("\nhit/miss/filter are per ASIN; filter_new answers a whole cycle in one call.\n")
+
+
+if __name__ == "__main__":
+    main()
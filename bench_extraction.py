@@ -0,0 +1,334 @@
+"""
+Offline benchmark for deal extraction
+Serves recorded Keepa pages from fixtures/ and synthetic pages of 10 to 10k rows
+from a local HTTP server, drives KeepaScraperEngine against them and reports
+rows/s, evaluate time, Python-side conversion time and the size of the data
+returned by the page. Nothing leaves localhost.
+
+Run it before and after every extractor change:
+    python bench_extraction.py
+    python bench_extraction.py --rows 1000 --rows 10000 --repeat 50
+
+Record a live page as a fixture (the only mode that touches the network):
+    python bench_extraction.py --record "https://keepa.com/#!deals/..."
+The recording is sanitized (scripts, handlers, hidden inputs, remote images
+and link query strings removed) so it can be committed as is.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import string
+import sys
+import tempfile
+from html import escape
+from typing import Dict, List
+
+from aiohttp import web
+
+from logs import stop_logging
+from network import NetworkFilter
+from scraper import _DOM_COLLECT_SCRIPT, KeepaScraperEngine
+from tracing import configure_tracing, trace_cycle
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+DEFAULT_SIZES = (10, 100, 1_000, 10_000)
+ASIN_CHARS = string.ascii_uppercase + string.digits
+
+# 1x1 transparent GIF, so synthetic rows have an image without leaving localhost
+BLANK_GIF = bytes.fromhex('47494638396101000100800000000000ffffff21f90401000000002c00000000010001000002024401003b')
+
+# Removed from recordings: they run code, carry session tokens or load remote resources
+_SANITIZE_PATTERNS = (
+    re.compile(r'<(script|noscript|iframe)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL),
+    re.compile(r'<input\b[^>]*\btype=["\']?hidden\b[^>]*>', re.IGNORECASE),
+    re.compile(r'<link\b[^>]*\bhref=["\']?(?:https?:)?//[^>]*>', re.IGNORECASE),
+    re.compile(r'\s+on[a-z]+\s*=\s*(?:"[^"]*"|\'[^\']*\'|[^\s>]+)', re.IGNORECASE),
+)
+_REMOTE_SRC = re.compile(r'\b(src|srcset)=(["\'])(?:https?:)?//[^"\']*\2', re.IGNORECASE)
+# Affiliate tags and session parameters after a product link
+_LINK_QUERY = re.compile(r'(href=["\'][^"\'?#]*/(?:dp|gp/product)/[A-Z0-9]{10})[^"\']*', re.IGNORECASE)
+
+WORDS = (
+    "Casque", "Sans", "Fil", "Bluetooth", "Enceinte", "Connectée", "Souris", "Clavier", "Mécanique",
+    "Écran", "Pouces", "Batterie", "Externe", "Chargeur", "Rapide", "Aspirateur", "Robot", "Noir",
+    "Blanc", "Pro", "Édition", "Pack", "Lot", "Cuisine", "Inox", "Lego", "Console", "Manette",
+)
+
+
+def synthetic_page(rows: int, seed: int = 0) -> str:
+    """
+    Generate a deals page with the row markup the DOM extractor reads
+
+    Discounts are spread from 0 to 95% so the 40% default filter keeps
+    about half of the rows, close to what a real deals page yields.
+
+    Args:
+        rows: Number of deal rows
+        seed: Random seed, the same seed gives the same page
+
+    Returns:
+        HTML document
+    """
+    rng = random.Random(seed)
+    lines = [
+        '<!DOCTYPE html><html lang="fr"><head><meta charset="utf-8">',
+        f'<title>Synthetic deals ({rows} rows)</title></head><body><div id="grid">',
+    ]
+    for _ in range(rows):
+        asin = 'B0' + ''.join(rng.choices(ASIN_CHARS, k=8))
+        title = escape(' '.join(rng.choices(WORDS, k=rng.randint(4, 12))))
+        average = rng.uniform(10, 900)
+        current = average * (1 - rng.uniform(0, 0.95))
+        # French formatting, as on keepa.com with the .fr domain
+        current_text = f"{current:.2f}".replace('.', ',')
+        average_text = f"{average:.2f}".replace('.', ',')
+        lines.append(
+            f'<div class="dealRow" data-asin="{asin}">'
+            f'<a class="productTitle" href="https://www.amazon.fr/dp/{asin}">{title}</a>'
+            f'<span class="priceValue">{current_text} €</span>'
+            f'<span class="priceAvg">{average_text} €</span>'
+            '<img src="/static/blank.gif" alt="">'
+            '</div>'
+        )
+    lines.append('</div></body></html>')
+    return '\n'.join(lines)
+
+
+class FixtureServer:
+    """Serves fixtures/*.html and /synthetic/<rows>.html on localhost"""
+
+    def __init__(self, fixtures_dir: str = FIXTURES_DIR):
+        self.fixtures_dir = fixtures_dir
+        self._pages: Dict[int, str] = {}
+        self._runner = None
+        self.port = 0
+
+    async def _fixture(self, request: web.Request) -> web.StreamResponse:
+        path = os.path.join(self.fixtures_dir, os.path.basename(request.match_info['name']))
+        if not path.endswith('.html') or not os.path.exists(path):
+            raise web.HTTPNotFound()
+        return web.FileResponse(path)
+
+    async def _synthetic(self, request: web.Request) -> web.Response:
+        rows = int(request.match_info['rows'])
+        if rows not in self._pages:
+            self._pages[rows] = synthetic_page(rows, seed=rows)
+        return web.Response(text=self._pages[rows], content_type='text/html')
+
+    async def _blank(self, request: web.Request) -> web.Response:
+        return web.Response(body=BLANK_GIF, content_type='image/gif')
+
+    async def start(self) -> str:
+        """Start the server on a free port and return its base URL"""
+        app = web.Application()
+        app.router.add_get('/fixtures/{name}', self._fixture)
+        app.router.add_get(r'/synthetic/{rows:\d+}.html', self._synthetic)
+        app.router.add_get('/static/blank.gif', self._blank)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{self.port}"
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of a list of values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))]
+
+
+def read_cycles(path: str) -> Dict[str, dict]:
+    """
+    Sum span durations (ms) of each trace cycle
+
+    Returns:
+        Per cycle ID: the page, the cycle duration and the summed evaluate
+        and build_deals durations
+    """
+    cycles: Dict[str, dict] = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line)
+            if record['cycle'] is None:
+                continue
+            cycle = cycles.setdefault(record['cycle'], {"evaluate": 0.0, "convert": 0.0})
+            if record['span'] == 'cycle':
+                cycle['page'] = record['page']
+                cycle['extract'] = record['duration_ms']
+            elif record['span'] == 'scraper.evaluate':
+                cycle['evaluate'] += record['duration_ms']
+            elif record['span'] == 'scraper.build_deals':
+                cycle['convert'] += record['duration_ms']
+    return cycles
+
+
+async def bench(urls: List[str], repeat: int, min_discount: float, chunk_size: int, trace_path: str) -> List[dict]:
+    """
+    Extract every page repeat times and collect timings from the tracing spans
+
+    Each extraction runs in its own trace cycle, so the evaluate and
+    build_deals spans of one extraction are summed together.
+
+    Returns:
+        One result per page with its unique rows, deals, payload size
+        (bytes of JSON for the whole page) and per-run timings (ms)
+    """
+    engine = KeepaScraperEngine(
+        keepa_url=urls,
+        headless=True,
+        network_filter=NetworkFilter(blocked_hosts=[]),
+        extraction_mode='dom',
+        max_contexts=1,
+        save_cookies=False
+    )
+    await engine.initialize()
+
+    pages = []
+    try:
+        for source in engine.sources:
+            await engine.navigate_to_deals(source)
+            rows = await source.page.evaluate(_DOM_COLLECT_SCRIPT)
+            payload = await source.page.evaluate(
+                "() => JSON.stringify(window.__spybotExtractRange(0, window.__spybotRows.length)).length"
+            )
+
+            deals = 0
+            for _ in range(repeat):
+                with trace_cycle(page=source.url):
+                    deals = 0
+                    async for chunk in engine.extract_deals_stream(min_discount, source, chunk_size):
+                        deals += len(chunk)
+            pages.append({"url": source.url, "rows": rows, "deals": deals, "payload": payload})
+    finally:
+        await engine.cleanup()
+
+    # Spans are written by a listener thread: flush them before reading the file
+    stop_logging()
+    cycles = read_cycles(trace_path).values()
+    for page in pages:
+        runs = [cycle for cycle in cycles if cycle.get('page') == page['url']]
+        for key in ('extract', 'evaluate', 'convert'):
+            page[key] = [run[key] for run in runs]
+    return pages
+
+
+def print_report(pages: List[dict], repeat: int, min_discount: float, chunk_size: int) -> None:
+    """Print the timings of every page as a table"""
+    print(f"\nDOM extraction ({repeat} runs per page, min discount {min_discount}%, chunks of {chunk_size})")
+    print("=" * 113)
+    print(
+        f"{'page':<28} {'rows':>6} {'deals':>6} {'KiB':>8} {'rows/s':>9} "
+        f"{'extract p50':>11} {'p95':>8} {'evaluate p50':>12} {'p95':>8} {'convert p50':>11} {'p95':>8}"
+    )
+    print("-" * 113)
+    for page in pages:
+        extract_p50 = percentile(page['extract'], 50)
+        rows_per_s = page['rows'] / (extract_p50 / 1000) if extract_p50 else 0.0
+        name = page['url'].split('/', 3)[-1]
+        print(
+            f"{name[-28:]:<28} {page['rows']:>6} {page['deals']:>6} {page['payload'] / 1024:>8.1f} {rows_per_s:>9.0f} "
+            f"{extract_p50:>11.2f} {percentile(page['extract'], 95):>8.2f} "
+            f"{percentile(page['evaluate'], 50):>12.2f} {percentile(page['evaluate'], 95):>8.2f} "
+            f"{percentile(page['convert'], 50):>11.2f} {percentile(page['convert'], 95):>8.2f}"
+        )
+        sys.stdout.flush()
+    print("\nrows are unique deal rows, KiB is the JSON returned by the page for all of them.")
+    print("Times in ms. evaluate = page.evaluate round trips, convert = rules and Deal objects in Python.\n")
+
+
+def sanitize_recording(html: str) -> str:
+    """
+    Strip a recorded page down to the markup the extractor reads
+
+    Args:
+        html: Page content as returned by the browser
+
+    Returns:
+        HTML safe to commit, and served without leaving localhost
+    """
+    for pattern in _SANITIZE_PATTERNS:
+        html = pattern.sub('', html)
+    html = _REMOTE_SRC.sub(r'\1=\2/static/blank.gif\2', html)
+    return _LINK_QUERY.sub(r'\1', html)
+
+
+async def record(url: str, name: str, headless: bool, cookies_file: str) -> None:
+    """Save a live deals page as a fixture, once its rows have rendered"""
+    engine = KeepaScraperEngine(
+        keepa_url=url,
+        headless=headless,
+        use_cookies=os.path.exists(cookies_file),
+        cookies_file=cookies_file,
+        save_cookies=False
+    )
+    await engine.initialize()
+    try:
+        source = engine.sources[0]
+        await engine.navigate_to_deals(source)
+        html = sanitize_recording(await source.page.content())
+    finally:
+        await engine.cleanup()
+
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    path = os.path.join(FIXTURES_DIR, name if name.endswith('.html') else f"{name}.html")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(html)
+    print(f"Recorded {len(html) / 1024:.0f} KiB to {path}")
+
+
+async def run(args) -> None:
+    server = FixtureServer()
+    base_url = await server.start()
+
+    fixtures = sorted(name for name in os.listdir(FIXTURES_DIR) if name.endswith('.html')) if args.fixtures else []
+    sizes = args.rows or list(DEFAULT_SIZES)
+    urls = [f"{base_url}/fixtures/{name}" for name in fixtures] + [f"{base_url}/synthetic/{rows}.html" for rows in sizes]
+
+    trace_dir = tempfile.mkdtemp(prefix='bench_extraction_')
+    trace_path = os.path.join(trace_dir, 'spans.jsonl')
+    configure_tracing(trace_path)
+
+    try:
+        pages = await bench(urls, args.repeat, args.min_discount, args.chunk_size, trace_path)
+    finally:
+        await server.stop()
+
+    print_report(pages, args.repeat, args.min_discount, args.chunk_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline deal extraction benchmark")
+    parser.add_argument("--rows", type=int, action="append", help="Synthetic page sizes (default 10, 100, 1k, 10k)")
+    parser.add_argument("--repeat", type=int, default=20, help="Extractions per page")
+    parser.add_argument("--min-discount", type=float, default=40.0, help="Discount filter applied while converting")
+    parser.add_argument("--chunk-size", type=int, default=25, help="Rows evaluated per chunk (EXTRACT_CHUNK_SIZE)")
+    parser.add_argument("--no-fixtures", dest="fixtures", action="store_false", help="Skip the recorded fixtures")
+    parser.add_argument("--record", metavar="URL", help="Save a live deals page to fixtures/ and exit")
+    parser.add_argument("--name", default="recorded_deals", help="Fixture name for --record")
+    parser.add_argument("--cookies", default="cookies.json", help="Cookies used by --record if the file exists")
+    parser.add_argument("--show-browser", action="store_true", help="Run --record with a visible browser")
+    args = parser.parse_args()
+
+    # Keep the scraper's per-page logs out of the report
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s %(name)s: %(message)s')
+
+    if args.record:
+        asyncio.run(record(args.record, args.name, not args.show_browser, args.cookies))
+    else:
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
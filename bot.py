@@ -2,18 +2,188 @@
 Discord Bot for Amazon Price Error Monitoring
 """
 import logging
-from typing import Optional
+from typing import Dict, List, Optional
 
+import aiohttp
 import discord
 from discord import Embed, Color, ButtonStyle
 from discord.ui import View, Button
 from discord.ext import commands
 
-from scraper import Deal
+from scraper import OUT_OF_STOCK, Deal
 
 logger = logging.getLogger(__name__)
 
 
+def create_deal_embed(deal: Deal) -> Embed:
+    """
+    Create a rich Discord embed for a deal
+
+    Args:
+        deal: Deal object
+
+    Returns:
+        Discord Embed object
+    """
+    # Calculate color based on discount (deeper red = better deal)
+    if deal.discount_percent >= 70:
+        color = Color.dark_red()
+    elif deal.discount_percent >= 60:
+        color = Color.red()
+    elif deal.discount_percent >= 50:
+        color = Color.orange()
+    else:
+        color = Color.blurple()  # Default Discord blue
+
+    # Create embed
+    embed = Embed(
+        title=deal.title,
+        url=deal.product_url,
+        description=f"**🚨 Price Error Detected - {deal.discount_percent:.1f}% OFF!**",
+        color=color
+    )
+
+    # Add fields
+    embed.add_field(
+        name="🏪 Store",
+        value="Amazon FR",
+        inline=True
+    )
+
+    embed.add_field(
+        name="💰 Price",
+        value=f"~~€{deal.average_price:.2f}~~ → **€{deal.current_price:.2f}**",
+        inline=True
+    )
+
+    embed.add_field(
+        name="📉 Discount",
+        value=f"**-{deal.discount_percent:.1f}%**",
+        inline=True
+    )
+
+    embed.add_field(
+        name="📦 Availability",
+        value=deal.availability,
+        inline=True
+    )
+
+    embed.add_field(
+        name="🔖 ASIN",
+        value=f"`{deal.asin}`",
+        inline=True
+    )
+
+    # Add savings calculation
+    savings = deal.average_price - deal.current_price
+    embed.add_field(
+        name="💸 You Save",
+        value=f"**€{savings:.2f}**",
+        inline=True
+    )
+
+    # Set Keepa price history graph as image
+    embed.set_image(url=deal.keepa_graph_url)
+
+    # Set thumbnail (product image if available)
+    if deal.image_url:
+        embed.set_thumbnail(url=deal.image_url)
+
+    # Footer
+    embed.set_footer(
+        text="Amazon Price Monitor • Powered by Keepa",
+        icon_url="https://keepa.com/favicon.ico"
+    )
+
+    return embed
+
+
+def create_digest_embed(deal: Deal, number: int) -> Embed:
+    """
+    Create a compact embed for a deal in a digest
+
+    Ten full embeds would exceed Discord's 6000 characters per message,
+    so digest embeds keep only the price line and a thumbnail.
+
+    Args:
+        deal: Deal object
+        number: Position of the deal in the digest
+
+    Returns:
+        Discord Embed object
+    """
+    embed = Embed(
+        title=f"#{number} {deal.title[:120]}",
+        url=deal.product_url,
+        description=(
+            f"~~€{deal.average_price:.2f}~~ → **€{deal.current_price:.2f}** "
+            f"(**-{deal.discount_percent:.1f}%**) • `{deal.asin}` • [Keepa]({deal.keepa_url})"
+        ),
+        color=Color.orange() if deal.discount_percent >= 50 else Color.blurple()
+    )
+
+    if deal.image_url:
+        embed.set_thumbnail(url=deal.image_url)
+
+    return embed
+
+
+def create_update_embed(deal: Deal, previous_price: float) -> Embed:
+    """
+    Create the embed replacing a posted deal's embed after a change
+
+    Args:
+        deal: Deal as seen in the latest cycle
+        previous_price: Price shown in the message until now
+
+    Returns:
+        Discord Embed object
+    """
+    if deal.availability == OUT_OF_STOCK:
+        embed = Embed(
+            title=deal.title,
+            url=deal.product_url,
+            description=f"**❌ Out of stock** (was €{previous_price:.2f})",
+            color=Color.dark_grey()
+        )
+        embed.add_field(name="🔖 ASIN", value=f"`{deal.asin}`", inline=True)
+        embed.set_image(url=deal.keepa_graph_url)
+        if deal.image_url:
+            embed.set_thumbnail(url=deal.image_url)
+        embed.set_footer(
+            text="Amazon Price Monitor • Powered by Keepa",
+            icon_url="https://keepa.com/favicon.ico"
+        )
+        return embed
+
+    embed = create_deal_embed(deal)
+    embed.description = f"**📉 Price dropped again - {deal.discount_percent:.1f}% OFF!**"
+    embed.add_field(
+        name="🔁 Previously posted at",
+        value=f"€{previous_price:.2f}",
+        inline=True
+    )
+    return embed
+
+
+def create_status_embed(message: str, error: bool = False) -> Embed:
+    """
+    Create a status message embed
+
+    Args:
+        message: Status message
+        error: Whether this is an error message
+
+    Returns:
+        Discord Embed object
+    """
+    return Embed(
+        title="🤖 Bot Status",
+        description=message,
+        color=Color.red() if error else Color.green()
+    )
+
+
 class DealButtonsView(View):
     """Discord UI View with action buttons for deals"""
 
@@ -49,6 +219,22 @@ class DealButtonsView(View):
         self.add_item(keepa_button)
 
 
+class DigestButtonsView(View):
+    """Discord UI View with one add-to-cart button per deal of a digest"""
+
+    def __init__(self, deals: List[Deal]):
+        super().__init__(timeout=None)  # Buttons never expire
+
+        # Buttons are numbered like the embeds they belong to
+        for i, deal in enumerate(deals, start=1):
+            self.add_item(Button(
+                style=ButtonStyle.link,
+                label=f"#{i} -{deal.discount_percent:.0f}%",
+                emoji="🛒",
+                url=deal.amazon_cart_url
+            ))
+
+
 class PriceMonitorBot(commands.Bot):
     """
     Discord bot for monitoring and posting Amazon price errors
@@ -59,7 +245,7 @@ class PriceMonitorBot(commands.Bot):
         Initialize the bot
 
         Args:
-            channel_id: Discord channel ID where deals will be posted
+            channel_id: Discord channel ID where deals and status messages are posted by default
         """
         intents = discord.Intents.default()
         intents.message_content = True
@@ -73,12 +259,16 @@ class PriceMonitorBot(commands.Bot):
 
         self.channel_id = channel_id
         self.target_channel: Optional[discord.TextChannel] = None
+        self.channels: Dict[int, discord.TextChannel] = {}
 
     async def on_ready(self):
         """Called when the bot is ready"""
         logger.info(f"Bot logged in as {self.user.name} (ID: {self.user.id})")
 
         # Get the target channel
+        if not self.channel_id:
+            return
+
         try:
             self.target_channel = self.get_channel(self.channel_id)
             if not self.target_channel:
@@ -92,117 +282,141 @@ class PriceMonitorBot(commands.Bot):
         except Exception as e:
             logger.error(f"Error fetching channel: {e}")
 
-    async def post_deal(self, deal: Deal) -> bool:
+    async def get_target_channel(self, channel_id: Optional[int] = None) -> Optional[discord.TextChannel]:
         """
-        Post a deal to the configured Discord channel
+        Get a channel to post to, fetching it on first use
+
+        Args:
+            channel_id: Channel ID (defaults to the configured channel)
+
+        Returns:
+            Channel, or None if it cannot be found
+        """
+        if not channel_id or channel_id == self.channel_id:
+            return self.target_channel
+
+        channel = self.channels.get(channel_id)
+        if channel is None:
+            try:
+                channel = self.get_channel(channel_id) or await self.fetch_channel(channel_id)
+                self.channels[channel_id] = channel
+                logger.info(f"Routing channel set: {channel.name}")
+            except Exception as e:
+                logger.error(f"Error fetching channel {channel_id}: {e}")
+                return None
+        return channel
+
+    async def post_deal(self, deal: Deal, channel_id: Optional[int] = None) -> Optional[int]:
+        """
+        Post a deal to a Discord channel
 
         Args:
             deal: Deal object to post
+            channel_id: Channel ID (defaults to the configured channel)
 
         Returns:
-            True if posted successfully, False otherwise
+            ID of the posted message, None on failure
         """
-        if not self.target_channel:
+        channel = await self.get_target_channel(channel_id)
+        if not channel:
             logger.error("Target channel not set, cannot post deal")
-            return False
+            return None
 
         try:
             # Create rich embed
-            embed = self._create_deal_embed(deal)
+            embed = create_deal_embed(deal)
 
             # Create button view
             view = DealButtonsView(deal)
 
             # Send message with embed and buttons
-            await self.target_channel.send(embed=embed, view=view)
+            message = await channel.send(embed=embed, view=view)
             logger.info(f"Posted deal: {deal.asin} ({deal.discount_percent:.1f}% off)")
-            return True
+            return message.id
+
+        except discord.RateLimited:
+            # Let the posting queue wait out the limit and retry
+            raise
 
         except Exception as e:
             logger.error(f"Failed to post deal {deal.asin}: {e}")
-            return False
-
-    def _create_deal_embed(self, deal: Deal) -> Embed:
+            return None
+
+    async def edit_deal(
+        self,
+        deal: Deal,
+        message_id: int,
+        previous_price: float,
+        channel_id: Optional[int] = None
+    ) -> bool:
         """
-        Create a rich Discord embed for a deal
+        Edit the embed of a posted deal in place
+
+        The buttons are left as they are, so this is a single PATCH.
 
         Args:
-            deal: Deal object
+            deal: Deal as seen in the latest cycle
+            message_id: ID of the message posted for the deal
+            previous_price: Price shown in the message until now
+            channel_id: Channel ID (defaults to the configured channel)
 
         Returns:
-            Discord Embed object
+            True if edited successfully, False otherwise
         """
-        # Calculate color based on discount (deeper red = better deal)
-        if deal.discount_percent >= 70:
-            color = Color.dark_red()
-        elif deal.discount_percent >= 60:
-            color = Color.red()
-        elif deal.discount_percent >= 50:
-            color = Color.orange()
-        else:
-            color = Color.blurple()  # Default Discord blue
-
-        # Create embed
-        embed = Embed(
-            title=deal.title,
-            url=deal.product_url,
-            description=f"**🚨 Price Error Detected - {deal.discount_percent:.1f}% OFF!**",
-            color=color
-        )
+        channel = await self.get_target_channel(channel_id)
+        if not channel:
+            logger.error("Target channel not set, cannot edit deal")
+            return False
 
-        # Add fields
-        embed.add_field(
-            name="🏪 Store",
-            value="Amazon FR",
-            inline=True
-        )
+        try:
+            await channel.get_partial_message(message_id).edit(embed=create_update_embed(deal, previous_price))
+            logger.info(f"Edited deal: {deal.asin} (€{previous_price:.2f} → €{deal.current_price:.2f}, {deal.availability})")
+            return True
 
-        embed.add_field(
-            name="💰 Price",
-            value=f"~~€{deal.average_price:.2f}~~ → **€{deal.current_price:.2f}**",
-            inline=True
-        )
+        except discord.RateLimited:
+            # Let the posting queue wait out the limit and retry
+            raise
 
-        embed.add_field(
-            name="📉 Discount",
-            value=f"**-{deal.discount_percent:.1f}%**",
-            inline=True
-        )
+        except discord.NotFound:
+            logger.warning(f"Message of deal {deal.asin} was deleted, not editing it")
+            return False
 
-        embed.add_field(
-            name="📦 Availability",
-            value=deal.availability,
-            inline=True
-        )
+        except Exception as e:
+            logger.error(f"Failed to edit deal {deal.asin}: {e}")
+            return False
 
-        embed.add_field(
-            name="🔖 ASIN",
-            value=f"`{deal.asin}`",
-            inline=True
-        )
+    async def post_digest(self, deals: List[Deal], channel_id: Optional[int] = None) -> bool:
+        """
+        Post several deals as one multi-embed message
 
-        # Add savings calculation
-        savings = deal.average_price - deal.current_price
-        embed.add_field(
-            name="💸 You Save",
-            value=f"**€{savings:.2f}**",
-            inline=True
-        )
+        Used during bursts to cut API calls; Discord allows up to 10 embeds
+        per message.
 
-        # Set Keepa price history graph as image
-        embed.set_image(url=deal.keepa_graph_url)
+        Args:
+            deals: Deals to post together (10 at most)
+            channel_id: Channel ID (defaults to the configured channel)
 
-        # Set thumbnail (product image if available)
-        if deal.image_url:
-            embed.set_thumbnail(url=deal.image_url)
+        Returns:
+            True if posted successfully, False otherwise
+        """
+        channel = await self.get_target_channel(channel_id)
+        if not channel:
+            logger.error("Target channel not set, cannot post digest")
+            return False
 
-        # Footer
-        embed.set_footer(
-            text="Amazon Price Monitor • Powered by Keepa",
-            icon_url="https://keepa.com/favicon.ico"
-        )
+        try:
+            embeds = [create_digest_embed(deal, i) for i, deal in enumerate(deals, start=1)]
+            await channel.send(embeds=embeds, view=DigestButtonsView(deals))
+            logger.info(f"Posted digest of {len(deals)} deals: {', '.join(deal.asin for deal in deals)}")
+            return True
 
-        return embed
+        except discord.RateLimited:
+            # Let the posting queue wait out the limit and retry
+            raise
+
+        except Exception as e:
+            logger.error(f"Failed to post digest of {len(deals)} deals: {e}")
+            return False
 
     async def send_status_message(self, message: str, error: bool = False) -> None:
         """
@@ -216,26 +430,31 @@ class PriceMonitorBot(commands.Bot):
             return
 
         try:
-            embed = Embed(
-                title="🤖 Bot Status",
-                description=message,
-                color=Color.red() if error else Color.green()
-            )
-            await self.target_channel.send(embed=embed)
+            await self.target_channel.send(embed=create_status_embed(message, error))
         except Exception as e:
             logger.error(f"Failed to send status message: {e}")
 
 
-async def create_bot(token: str, channel_id: int) -> PriceMonitorBot:
+async def create_bot(
+    token: str,
+    channel_id: int,
+    http_trace: Optional[aiohttp.TraceConfig] = None
+) -> PriceMonitorBot:
     """
     Factory function to create and return the bot instance
 
     Args:
         token: Discord bot token
         channel_id: Channel ID for posting deals
+        http_trace: Trace config receiving every Discord API response
 
     Returns:
         Configured PriceMonitorBot instance
     """
-    bot = PriceMonitorBot(channel_id=channel_id)
+    bot = PriceMonitorBot(
+        channel_id=channel_id,
+        http_trace=http_trace,
+        # Raise long rate limits to the posting queue instead of sleeping inside send()
+        max_ratelimit_timeout=30.0
+    )
     return bot
@@ -1,38 +1,480 @@
 """
 Cache system for deal deduplication
 """
+import asyncio
+import math
+import re
+import sqlite3
 import time
+from array import array
 from collections import deque
-from typing import Set, Tuple
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
+# Per-entry debug lines, sampled by the logging setup
+entry_logger = logging.getLogger(f"{__name__}.entries")
+
+
+@dataclass
+class PostedDeal:
+    """Discord messages of a posted deal and the price they show"""
+    price: float
+    in_stock: bool = True
+    messages: Dict[str, int] = field(default_factory=dict)  # Route name -> message ID
+
+
+class PostedDeals:
+    """
+    Message IDs and last posted price of cached deals, so their messages can be edited
+
+    Only deals posted on their own are recorded; digest messages hold
+    several deals and are never edited. Entries are dropped together with
+    the cache entry of their ASIN.
+    """
+
+    def __init__(self, on_change: Optional[Callable[[str, PostedDeal], None]] = None):
+        """
+        Initialize the store
+
+        Args:
+            on_change: Called with each recorded or updated deal
+        """
+        self.on_change = on_change
+        self._deals: Dict[str, PostedDeal] = {}
+
+    def __len__(self) -> int:
+        return len(self._deals)
+
+    def asins(self) -> List[str]:
+        """ASINs with a posted message"""
+        return list(self._deals)
+
+    def get(self, asin: str) -> Optional[PostedDeal]:
+        """Get the messages of a posted deal"""
+        return self._deals.get(asin)
+
+    def record(self, asin: str, route: str, message_id: int, price: float) -> None:
+        """
+        Remember the message a deal was posted as on a route
+
+        Args:
+            asin: Amazon Standard Identification Number
+            route: Name of the route the message was posted to
+            message_id: Discord message ID
+            price: Price shown in the message
+        """
+        posted = self._deals.get(asin)
+        if posted is None:
+            posted = self._deals[asin] = PostedDeal(price=price)
+        posted.messages[route] = message_id
+        if self.on_change:
+            self.on_change(asin, posted)
+
+    def update(self, asin: str, price: float, in_stock: bool = True) -> None:
+        """
+        Record the price and availability shown after an edit
+
+        Args:
+            asin: Amazon Standard Identification Number
+            price: Price now shown
+            in_stock: Whether the deal is still available
+        """
+        posted = self._deals.get(asin)
+        if posted is None:
+            return
+        posted.price = price
+        posted.in_stock = in_stock
+        if self.on_change:
+            self.on_change(asin, posted)
+
+    def retain(self, keep: Callable[[str], bool]) -> int:
+        """
+        Drop the deals whose cache entry expired
+
+        Args:
+            keep: Returns True for ASINs still in cache
+
+        Returns:
+            Number of deals dropped
+        """
+        expired = [asin for asin in self._deals if not keep(asin)]
+        for asin in expired:
+            del self._deals[asin]
+        return len(expired)
+
+    def clear(self) -> None:
+        self._deals.clear()
 
 
 class DealCache:
     """
     Thread-safe cache to prevent duplicate deal notifications within a time window
+
+    Entries are grouped into time buckets. Lookups compare the stored timestamp
+    directly, so they stay exact, while eviction drops whole buckets at most
+    once per bucket tick instead of on every call.
     """
 
-    def __init__(self, cache_duration_hours: int = 24):
+    def __init__(self, cache_duration_hours: int = 24, bucket_seconds: float = 60.0):
         """
         Initialize the deal cache
 
         Args:
             cache_duration_hours: How long to keep deals in cache (default 24h)
+            bucket_seconds: Width of an expiry bucket, also the eviction tick
+        """
+        self.cache_duration_seconds = cache_duration_hours * 3600
+        self.bucket_seconds = bucket_seconds
+        self._timestamps: Dict[str, float] = {}  # ASIN -> time added, fast lookup
+        self._buckets: deque = deque()  # (bucket index, [asins]) in time order
+        self._next_eviction = 0.0
+        self.posted = PostedDeals()
+
+    def _clean_expired(self) -> None:
+        """Remove expired buckets from cache, at most once per tick"""
+        current_time = time.time()
+        if current_time < self._next_eviction:
+            return
+        self._next_eviction = current_time + self.bucket_seconds
+
+        removed = 0
+        while self._buckets:
+            index, asins = self._buckets[0]
+            bucket_end = (index + 1) * self.bucket_seconds
+            if current_time - bucket_end <= self.cache_duration_seconds:
+                break
+
+            self._buckets.popleft()
+            for asin in asins:
+                # Skip ASINs re-added after expiring, they live in a newer bucket
+                timestamp = self._timestamps.get(asin)
+                if timestamp is not None and timestamp < bucket_end:
+                    del self._timestamps[asin]
+                    removed += 1
+
+        if removed:
+            self.posted.retain(self._timestamps.__contains__)
+            logger.debug(f"Removed {removed} expired ASINs from cache")
+
+    def _is_fresh(self, asin: str, current_time: float) -> bool:
+        """Check an ASIN against its own timestamp, regardless of eviction"""
+        timestamp = self._timestamps.get(asin)
+        return timestamp is not None and (current_time - timestamp) <= self.cache_duration_seconds
+
+    def is_cached(self, asin: str) -> bool:
+        """
+        Check if an ASIN is already in cache
+
+        Args:
+            asin: Amazon Standard Identification Number
+
+        Returns:
+            True if ASIN is in cache, False otherwise
+        """
+        self._clean_expired()
+        return self._is_fresh(asin, time.time())
+
+    def filter_new(self, asins: Iterable[str]) -> List[str]:
+        """
+        Get the ASINs that are not in cache, in one pass
+
+        Args:
+            asins: ASINs found during a cycle
+
+        Returns:
+            ASINs not in cache, in input order and without duplicates
+        """
+        self._clean_expired()
+        current_time = time.time()
+
+        new_asins = []
+        seen: Set[str] = set()
+        for asin in asins:
+            if asin not in seen and not self._is_fresh(asin, current_time):
+                new_asins.append(asin)
+            seen.add(asin)
+        return new_asins
+
+    def add(self, asin: str, timestamp: Optional[float] = None) -> None:
+        """
+        Add an ASIN to the cache
+
+        Args:
+            asin: Amazon Standard Identification Number
+            timestamp: Time the deal was posted (defaults to now)
+        """
+        self._clean_expired()
+
+        current_time = time.time()
+        if self._is_fresh(asin, current_time):
+            return
+
+        self._insert(asin, current_time if timestamp is None else timestamp)
+        entry_logger.debug(f"Added ASIN to cache: {asin}")
+
+    def _insert(self, asin: str, timestamp: float) -> None:
+        """File an ASIN into its time bucket"""
+        # Entries older than the newest bucket are filed into it; they are only
+        # evicted later, lookups still use their own timestamp
+        index = int(timestamp // self.bucket_seconds)
+        if self._buckets and self._buckets[-1][0] >= index:
+            self._buckets[-1][1].append(asin)
+        else:
+            self._buckets.append((index, [asin]))
+
+        self._timestamps[asin] = timestamp
+
+    def clear(self) -> None:
+        """Clear all cached entries"""
+        self._timestamps.clear()
+        self._buckets.clear()
+        self.posted.clear()
+        logger.info("Cache cleared")
+
+    def get_stats(self) -> dict:
+        """Get cache statistics"""
+        self._clean_expired()
+        return {
+            "total_entries": len(self._timestamps),
+            "buckets": len(self._buckets),
+            "posted_messages": len(self.posted),
+            "cache_duration_hours": self.cache_duration_seconds / 3600
+        }
+
+
+ASIN_SPACE = 36 ** 10  # 10 base-36 characters, fits in 52 bits
+_PACKABLE_ASIN = re.compile(r'(?:(\d+)-)?([0-9A-Z]{10})')
+_EMPTY = -1
+_DELETED = -2
+_HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+
+
+def pack_asin(asin: str) -> int:
+    """
+    Pack an ASIN into a 64-bit integer
+
+    An optional Keepa domain prefix ("4-B08L5VR6C3") is stored in the bits
+    above the 52 used by the ASIN, so several marketplaces share one cache.
+    Surrounding whitespace and lowercase letters are normalized first.
+
+    Args:
+        asin: ASIN, optionally prefixed with "<domain>-"
+
+    Returns:
+        Non-negative integer key
+
+    Raises:
+        ValueError: If the ASIN is not 10 letters and digits
+    """
+    match = _PACKABLE_ASIN.fullmatch(asin.strip().upper())
+    if not match:
+        raise ValueError(f"Invalid ASIN: {asin!r}")
+    domain, code = match.groups()
+    return (int(domain) if domain else 0) * ASIN_SPACE + int(code, 36)
+
+
+def unpack_asin(key: int) -> str:
+    """Reverse pack_asin"""
+    domain, value = divmod(key, ASIN_SPACE)
+    chars = []
+    for _ in range(10):
+        value, digit = divmod(value, 36)
+        chars.append('0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'[digit])
+    code = ''.join(reversed(chars))
+    return f"{domain}-{code}" if domain else code
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over packed integer keys"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        """
+        Initialize the filter
+
+        Args:
+            capacity: Expected number of keys
+            error_rate: Target false positive rate at capacity
+        """
+        self.size = max(64, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / max(capacity, 1) * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: int) -> Iterator[int]:
+        """Double hashing: h1 + i * h2"""
+        h1 = (key * _HASH_MULTIPLIER) & 0xFFFFFFFFFFFFFFFF
+        h2 = (h1 >> 32) | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key: int) -> None:
+        """Add a key"""
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: int) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._bits)
+
+
+class PackedDealCache:
+    """
+    Memory-compact deal cache for very large dedup windows
+
+    ASINs are packed into 64-bit integers and stored in an open-addressing
+    hash table made of two parallel arrays (keys and timestamps). A FIFO of
+    insertions, also array-backed, drives bulk expiry once per tick. An
+    optional Bloom filter answers most misses without probing the table.
+
+    Same interface as DealCache.
+    """
+
+    def __init__(
+        self,
+        cache_duration_hours: int = 24,
+        bucket_seconds: float = 60.0,
+        initial_capacity: int = 1024,
+        bloom_capacity: int = 0
+    ):
+        """
+        Initialize the packed cache
+
+        Args:
+            cache_duration_hours: How long to keep deals in cache (default 24h)
+            bucket_seconds: Eviction tick in seconds
+            initial_capacity: Initial hash table slots (rounded up to a power of two)
+            bloom_capacity: Expected entries for the Bloom filter front, 0 to disable
         """
         self.cache_duration_seconds = cache_duration_hours * 3600
-        self._cache: deque = deque()  # Stores (asin, timestamp) tuples
-        self._asin_set: Set[str] = set()  # Fast lookup
+        self.bucket_seconds = bucket_seconds
+        self.bloom_capacity = bloom_capacity
+
+        capacity = 8
+        while capacity < initial_capacity:
+            capacity *= 2
+        self._allocate(capacity)
+
+        self._fifo_keys = array('q')
+        self._fifo_times = array('d')
+        self._fifo_head = 0
+        self._next_eviction = 0.0
+        self._bloom: Optional[BloomFilter] = BloomFilter(bloom_capacity) if bloom_capacity else None
+        self.posted = PostedDeals()
+
+    def _allocate(self, capacity: int) -> None:
+        """Allocate an empty table"""
+        self._mask = capacity - 1
+        self._keys = array('q', [_EMPTY]) * capacity
+        self._times = array('d', [0.0]) * capacity
+        self._count = 0
+        self._deleted = 0
+
+    def _slot(self, key: int) -> int:
+        """Find the slot holding key, or -1"""
+        mask = self._mask
+        keys = self._keys
+        i = ((key * _HASH_MULTIPLIER) >> 16) & mask
+        while True:
+            k = keys[i]
+            if k == key:
+                return i
+            if k == _EMPTY:
+                return -1
+            i = (i + 1) & mask
+
+    def _put(self, key: int, timestamp: float) -> None:
+        """Insert or update key, reusing the first deleted slot on the probe path"""
+        mask = self._mask
+        keys = self._keys
+        i = ((key * _HASH_MULTIPLIER) >> 16) & mask
+        target = -1
+        while True:
+            k = keys[i]
+            if k == key:
+                self._times[i] = timestamp
+                return
+            if k == _DELETED and target < 0:
+                target = i
+            elif k == _EMPTY:
+                break
+            i = (i + 1) & mask
+
+        if target >= 0:
+            self._deleted -= 1
+        else:
+            target = i
+        keys[target] = key
+        self._times[target] = timestamp
+        self._count += 1
+
+        if (self._count + self._deleted) * 10 > (mask + 1) * 7:
+            self._resize()
+
+    def _resize(self) -> None:
+        """Rehash into a table sized for the live entries, dropping tombstones"""
+        old_keys, old_times = self._keys, self._times
+        capacity = 8
+        while capacity < self._count * 2:  # At most 50% load after rehash
+            capacity *= 2
+        self._allocate(capacity)
+
+        for key, timestamp in zip(old_keys, old_times):
+            if key >= 0:
+                self._put(key, timestamp)
+
+    def _is_fresh(self, key: int, current_time: float) -> bool:
+        """Check a packed key against its timestamp"""
+        if self._bloom is not None and key not in self._bloom:
+            return False
+        i = self._slot(key)
+        return i >= 0 and (current_time - self._times[i]) <= self.cache_duration_seconds
 
     def _clean_expired(self) -> None:
-        """Remove expired entries from cache"""
+        """Remove expired entries from the head of the FIFO, at most once per tick"""
         current_time = time.time()
+        if current_time < self._next_eviction:
+            return
+        self._next_eviction = current_time + self.bucket_seconds
+
+        cutoff = current_time - self.cache_duration_seconds
+        head = self._fifo_head
+        fifo_keys, fifo_times = self._fifo_keys, self._fifo_times
+        removed = 0
 
-        while self._cache and (current_time - self._cache[0][1]) > self.cache_duration_seconds:
-            asin, _ = self._cache.popleft()
-            self._asin_set.discard(asin)
-            logger.debug(f"Removed expired ASIN from cache: {asin}")
+        while head < len(fifo_keys) and fifo_times[head] < cutoff:
+            i = self._slot(fifo_keys[head])
+            # Skip keys re-added after expiring, their table time is newer
+            if i >= 0 and self._times[i] == fifo_times[head]:
+                self._keys[i] = _DELETED
+                self._count -= 1
+                self._deleted += 1
+                removed += 1
+            head += 1
+
+        self._fifo_head = head
+        if head and head * 2 >= len(fifo_keys):
+            self._compact()
+
+        if removed:
+            self.posted.retain(lambda asin: self._is_fresh(pack_asin(asin), current_time))
+            logger.debug(f"Removed {removed} expired ASINs from cache")
+
+    def _compact(self) -> None:
+        """Drop consumed FIFO entries and rebuild the Bloom filter"""
+        head = self._fifo_head
+        self._fifo_keys = self._fifo_keys[head:]
+        self._fifo_times = self._fifo_times[head:]
+        self._fifo_head = 0
+
+        if self._bloom is not None:
+            self._bloom = BloomFilter(max(self.bloom_capacity, self._count))
+            for key in self._keys:
+                if key >= 0:
+                    self._bloom.add(key)
 
     def is_cached(self, asin: str) -> bool:
         """
@@ -45,33 +487,264 @@ class DealCache:
             True if ASIN is in cache, False otherwise
         """
         self._clean_expired()
-        return asin in self._asin_set
+        return self._is_fresh(pack_asin(asin), time.time())
 
-    def add(self, asin: str) -> None:
+    def filter_new(self, asins: Iterable[str]) -> List[str]:
+        """
+        Get the ASINs that are not in cache, in one pass
+
+        Args:
+            asins: ASINs found during a cycle
+
+        Returns:
+            ASINs not in cache, in input order and without duplicates
+            (malformed ASINs are logged and left out)
+        """
+        self._clean_expired()
+        current_time = time.time()
+
+        new_asins = []
+        seen: Set[int] = set()
+        for asin in asins:
+            try:
+                key = pack_asin(asin)
+            except ValueError:
+                logger.warning(f"Skipping malformed ASIN {asin!r}")
+                continue
+            if key not in seen and not self._is_fresh(key, current_time):
+                new_asins.append(asin)
+            seen.add(key)
+        return new_asins
+
+    def add(self, asin: str, timestamp: Optional[float] = None) -> None:
         """
         Add an ASIN to the cache
 
         Args:
             asin: Amazon Standard Identification Number
+            timestamp: Time the deal was posted (defaults to now)
         """
         self._clean_expired()
 
-        if asin not in self._asin_set:
-            current_time = time.time()
-            self._cache.append((asin, current_time))
-            self._asin_set.add(asin)
-            logger.debug(f"Added ASIN to cache: {asin}")
+        key = pack_asin(asin)
+        current_time = time.time()
+        if self._is_fresh(key, current_time):
+            return
+
+        if timestamp is None:
+            timestamp = current_time
+        self._put(key, timestamp)
+        self._fifo_keys.append(key)
+        self._fifo_times.append(timestamp)
+        if self._bloom is not None:
+            self._bloom.add(key)
+        entry_logger.debug(f"Added ASIN to cache: {asin}")
 
     def clear(self) -> None:
         """Clear all cached entries"""
-        self._cache.clear()
-        self._asin_set.clear()
+        self._allocate(8)
+        self._fifo_keys = array('q')
+        self._fifo_times = array('d')
+        self._fifo_head = 0
+        if self._bloom is not None:
+            self._bloom = BloomFilter(self.bloom_capacity)
+        self.posted.clear()
         logger.info("Cache cleared")
 
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory used by the table, FIFO and Bloom filter buffers"""
+        total = sum(
+            buf.itemsize * len(buf)
+            for buf in (self._keys, self._times, self._fifo_keys, self._fifo_times)
+        )
+        if self._bloom is not None:
+            total += self._bloom.nbytes
+        return total
+
     def get_stats(self) -> dict:
         """Get cache statistics"""
         self._clean_expired()
         return {
-            "total_entries": len(self._cache),
+            "total_entries": self._count,
+            "capacity": self._mask + 1,
+            "posted_messages": len(self.posted),
+            "bytes": self.nbytes,
             "cache_duration_hours": self.cache_duration_seconds / 3600
         }
+
+
+class PersistentDealCache(DealCache):
+    """
+    Deal cache backed by SQLite so posted deals survive restarts
+
+    Lookups are served from the in-memory structures of DealCache, which are
+    warm-loaded from disk at startup. New entries are written in batches
+    (WAL mode, one commit per batch, at most flush_interval seconds after
+    the first pending write) and expired rows are removed through the
+    indexed timestamp column.
+    """
+
+    def __init__(
+        self,
+        db_path: str = "deal_cache.db",
+        cache_duration_hours: int = 24,
+        bucket_seconds: float = 60.0,
+        batch_size: int = 10,
+        flush_interval: float = 5.0,
+        purge_interval: float = 600.0
+    ):
+        """
+        Initialize the persistent cache and load unexpired entries
+
+        Args:
+            db_path: Path to the SQLite database file
+            cache_duration_hours: How long to keep deals in cache (default 24h)
+            bucket_seconds: Width of an expiry bucket, also the eviction tick
+            batch_size: Number of new entries written per commit
+            flush_interval: Maximum seconds before pending entries are committed
+            purge_interval: Seconds between expired row deletions on disk
+        """
+        super().__init__(cache_duration_hours, bucket_seconds)
+
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.purge_interval = purge_interval
+
+        self._pending: List[Tuple[str, float]] = []
+        self._pending_posted: Dict[str, PostedDeal] = {}
+        self._last_flush = time.monotonic()
+        self._last_purge = 0.0
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+        self._conn = sqlite3.connect(db_path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS deals (asin TEXT PRIMARY KEY, ts REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_deals_ts ON deals (ts)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS posted (asin TEXT NOT NULL, route TEXT NOT NULL, "
+            "message_id INTEGER NOT NULL, price REAL NOT NULL, in_stock INTEGER NOT NULL DEFAULT 1, "
+            "PRIMARY KEY (asin, route))"
+        )
+        self._conn.commit()
+
+        self._load()
+        self.posted.on_change = self._queue_posted
+
+    def _load(self) -> None:
+        """Warm-load unexpired entries from disk in insertion order"""
+        cutoff = time.time() - self.cache_duration_seconds
+        rows = self._conn.execute(
+            "SELECT asin, ts FROM deals WHERE ts >= ? ORDER BY ts", (cutoff,)
+        ).fetchall()
+
+        for asin, timestamp in rows:
+            self._insert(asin, timestamp)
+
+        posted_rows = self._conn.execute(
+            "SELECT asin, route, message_id, price, in_stock FROM posted"
+        ).fetchall()
+        for asin, route, message_id, price, in_stock in posted_rows:
+            if asin in self._timestamps:
+                self.posted.record(asin, route, message_id, price)
+                self.posted.update(asin, price, bool(in_stock))
+
+        logger.info(f"Loaded {len(rows)} cached deals ({len(self.posted)} with messages) from {self.db_path}")
+
+    def _queue_posted(self, asin: str, posted: PostedDeal) -> None:
+        """Queue the messages of a deal for writing"""
+        self._pending_posted[asin] = posted
+        if len(self._pending_posted) >= self.batch_size:
+            self.flush()
+        else:
+            self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        """Commit pending writes within flush_interval, even if the cache is not used again"""
+        if self._flush_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (scripts): written by the next cache call or close()
+            return
+        self._flush_handle = loop.call_later(self.flush_interval, self.flush)
+
+    def _clean_expired(self) -> None:
+        """Remove expired entries, and commit or purge on disk when due"""
+        super()._clean_expired()
+
+        now = time.monotonic()
+        if (self._pending or self._pending_posted) and now - self._last_flush >= self.flush_interval:
+            self.flush()
+
+        if now - self._last_purge >= self.purge_interval:
+            self._last_purge = now
+            cutoff = time.time() - self.cache_duration_seconds
+            self._conn.execute("DELETE FROM deals WHERE ts < ?", (cutoff,))
+            self._conn.execute("DELETE FROM posted WHERE asin NOT IN (SELECT asin FROM deals)")
+            self._conn.commit()
+
+    def add(self, asin: str, timestamp: Optional[float] = None) -> None:
+        """
+        Add an ASIN to the cache and queue it for writing
+
+        Args:
+            asin: Amazon Standard Identification Number
+            timestamp: Time the deal was posted (defaults to now)
+        """
+        is_new = not self.is_cached(asin)
+        super().add(asin, timestamp)
+
+        if is_new:
+            self._pending.append((asin, self._timestamps[asin]))
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+            else:
+                self._schedule_flush()
+
+    def flush(self) -> None:
+        """Write pending entries and message records to disk in a single transaction"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._pending or self._pending_posted:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO deals (asin, ts) VALUES (?, ?)", self._pending
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO posted (asin, route, message_id, price, in_stock) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (asin, route, message_id, posted.price, int(posted.in_stock))
+                    for asin, posted in self._pending_posted.items()
+                    for route, message_id in posted.messages.items()
+                ]
+            )
+            self._conn.commit()
+            logger.debug(
+                f"Flushed {len(self._pending)} cache entries and {len(self._pending_posted)} message records to disk"
+            )
+            self._pending.clear()
+            self._pending_posted.clear()
+        self._last_flush = time.monotonic()
+
+    def clear(self) -> None:
+        """Clear all cached entries, in memory and on disk"""
+        self._pending.clear()
+        self._pending_posted.clear()
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._conn.execute("DELETE FROM deals")
+        self._conn.execute("DELETE FROM posted")
+        self._conn.commit()
+        super().clear()
+
+    def close(self) -> None:
+        """Flush pending entries and close the database"""
+        try:
+            self.flush()
+        finally:
+            self._conn.close()
@@ -0,0 +1,234 @@
+"""
+Network capture of Keepa deal payloads
+Decodes the XHR/WebSocket data the deals page receives instead of scraping the DOM
+"""
+import asyncio
+import json
+import logging
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from playwright.async_api import Page, Response, WebSocket
+
+logger = logging.getLogger(__name__)
+
+# Keepa price history types (index into "current" / "avg" arrays)
+PRICE_TYPE_AMAZON = 0
+PRICE_TYPE_NEW = 1
+
+AMAZON_IMAGE_BASE = "https://m.media-amazon.com/images/I/"
+
+# zlib window sizes to try: raw deflate, zlib header, gzip header
+_WBITS = (-zlib.MAX_WBITS, zlib.MAX_WBITS, zlib.MAX_WBITS | 16)
+
+
+def _decode_payload(payload: Union[str, bytes]) -> Optional[Any]:
+    """
+    Decode a WebSocket frame or response body into JSON
+
+    Keepa sends deflate-compressed JSON over its WebSocket, so binary
+    payloads are inflated before parsing.
+
+    Args:
+        payload: Raw frame text or bytes
+
+    Returns:
+        Parsed JSON, or None if the payload is not JSON
+    """
+    if isinstance(payload, bytes):
+        for wbits in _WBITS:
+            try:
+                payload = zlib.decompress(payload, wbits)
+                break
+            except zlib.error:
+                continue
+        try:
+            payload = payload.decode('utf-8')
+        except UnicodeDecodeError:
+            return None
+
+    payload = payload.strip()
+    if not payload or payload[0] not in '{[':
+        return None
+
+    try:
+        return json.loads(payload)
+    except ValueError:
+        return None
+
+
+def _iter_deal_objects(data: Any) -> Iterator[dict]:
+    """Walk a decoded payload and yield every object that looks like a Keepa deal"""
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            asin = node.get('asin')
+            if isinstance(asin, str) and len(asin) == 10 and 'current' in node:
+                yield node
+                continue
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+
+
+def _price_at(values: Any, index: int) -> float:
+    """Read a Keepa price in cents at index, returning euros (0 when missing)"""
+    if isinstance(values, list) and len(values) > index:
+        value = values[index]
+        if isinstance(value, (int, float)) and value > 0:
+            return value / 100
+    return 0.0
+
+
+def _decode_image(image: Any) -> str:
+    """Keepa encodes image file names as arrays of character codes"""
+    if isinstance(image, list):
+        try:
+            image = ''.join(chr(c) for c in image)
+        except (TypeError, ValueError):
+            return ''
+    if not isinstance(image, str) or not image:
+        return ''
+    if image.startswith('http'):
+        return image
+    return AMAZON_IMAGE_BASE + image
+
+
+def parse_deal_object(obj: dict) -> Optional[Dict]:
+    """
+    Convert a Keepa deal object into the row format used by the DOM extractor
+
+    Prices are taken from the Amazon offer when present, otherwise from the
+    lowest new offer. The reference price is the longest average window
+    (90 days when available) for the same price type.
+
+    Args:
+        obj: Decoded Keepa deal object
+
+    Returns:
+        Row dict, or None if the object has no usable price
+    """
+    current = obj.get('current')
+    price_type = PRICE_TYPE_AMAZON
+    current_price = _price_at(current, PRICE_TYPE_AMAZON)
+    if current_price == 0:
+        price_type = PRICE_TYPE_NEW
+        current_price = _price_at(current, PRICE_TYPE_NEW)
+    if current_price == 0:
+        return None
+
+    average_price = 0.0
+    averages = obj.get('avg')
+    if isinstance(averages, list):
+        for window in reversed(averages):
+            average_price = _price_at(window, price_type)
+            if average_price > 0:
+                break
+
+    discount_percent = 0.0
+    if average_price > 0:
+        discount_percent = ((average_price - current_price) / average_price) * 100
+
+    asin = obj['asin']
+    return {
+        'asin': asin,
+        'title': obj.get('title') or '',
+        'currentPrice': current_price,
+        'averagePrice': average_price,
+        'discountPercent': discount_percent,
+        'productUrl': f"https://www.amazon.fr/dp/{asin}",
+        'imageUrl': _decode_image(obj.get('image')),
+    }
+
+
+class DealCapture:
+    """
+    Listens to a page's XHR responses and WebSocket frames and collects deals
+    """
+
+    def __init__(self):
+        """Initialize the capture buffer"""
+        self._rows: Dict[str, Dict] = {}
+        self.captured = asyncio.Event()
+
+    def attach(self, page: Page) -> None:
+        """
+        Register response and WebSocket listeners on a page
+
+        Args:
+            page: Playwright page to listen on
+        """
+        page.on('response', self._on_response)
+        page.on('websocket', self._on_websocket)
+
+    def reset(self) -> None:
+        """Forget rows captured during the previous cycle"""
+        self._rows.clear()
+        self.captured.clear()
+
+    @property
+    def rows(self) -> List[Dict]:
+        """Rows captured since the last reset, one per ASIN"""
+        return list(self._rows.values())
+
+    async def wait(self, timeout: float, settle: float = 1.0) -> bool:
+        """
+        Wait for deal payloads to arrive
+
+        Args:
+            timeout: Maximum seconds to wait for the first payload
+            settle: Seconds without new rows before the list is considered complete
+
+        Returns:
+            True if any deal was captured
+        """
+        try:
+            await asyncio.wait_for(self.captured.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+
+        # Keepa may stream the list in several frames; wait until it stops growing
+        count = -1
+        while count != len(self._rows):
+            count = len(self._rows)
+            await asyncio.sleep(settle)
+
+        return True
+
+    def _ingest(self, data: Any, source: str) -> None:
+        """Extract deal objects from a decoded payload"""
+        added = 0
+        for obj in _iter_deal_objects(data):
+            row = parse_deal_object(obj)
+            if row:
+                self._rows[row['asin']] = row
+                added += 1
+
+        if added:
+            logger.debug(f"Captured {added} deals from {source}")
+            self.captured.set()
+
+    async def _on_response(self, response: Response) -> None:
+        """Handle an XHR/fetch response"""
+        if response.request.resource_type not in ('xhr', 'fetch'):
+            return
+        if 'json' not in response.headers.get('content-type', ''):
+            return
+
+        try:
+            self._ingest(_decode_payload(await response.body()), response.url)
+        except Exception as e:
+            # Bodies are unavailable for redirects and closed pages
+            logger.debug(f"Could not read response {response.url}: {e}")
+
+    def _on_websocket(self, websocket: WebSocket) -> None:
+        """Subscribe to frames of a new WebSocket"""
+        logger.debug(f"WebSocket opened: {websocket.url}")
+
+        def on_frame(payload: Union[str, bytes]) -> None:
+            data = _decode_payload(payload)
+            if data is not None:
+                self._ingest(data, websocket.url)
+
+        websocket.on('framereceived', on_frame)
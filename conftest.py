@@ -0,0 +1,28 @@
+"""
+pytest configuration and helpers shared by the tests
+test_scraper.py and test_discord.py are manual scripts that need a browser
+and a Discord token: run them with python, not pytest
+"""
+from typing import Optional
+
+from scraper import Deal
+
+collect_ignore = ["test_scraper.py", "test_discord.py"]
+
+
+def make_deal(
+    asin: str = "B000000001",
+    discount: float = 50.0,
+    price: Optional[float] = None,
+    title: Optional[str] = None
+) -> Deal:
+    """Deal averaging 100 EUR, priced at its discount unless price is given"""
+    return Deal(
+        asin=asin,
+        title=f"Deal {asin}" if title is None else title,
+        current_price=100 - discount if price is None else price,
+        average_price=100.0,
+        discount_percent=discount,
+        product_url=f"https://www.amazon.fr/dp/{asin}",
+        image_url="",
+    )
@@ -0,0 +1,232 @@
+"""
+Local per-ASIN price history with vectorized anomaly scoring
+Cross-checks Keepa's discount against prices we observed ourselves
+"""
+import logging
+import os
+import time
+from array import array
+from dataclasses import dataclass
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Scale factor between the median absolute deviation and the standard deviation
+_MAD_SCALE = 0.6745
+
+
+@dataclass
+class HistoryScores:
+    """Anomaly scores for a batch of observations, one entry per ASIN"""
+    observations: np.ndarray  # Past observations used for scoring
+    rolling_median: np.ndarray  # Median of the last window prices (NaN without history)
+    robust_z: np.ndarray  # (price - median) / scaled MAD, negative = cheaper than usual
+    drop_percent: np.ndarray  # Drop relative to the rolling median, in percent
+    all_time_low: np.ndarray  # Price below every previously observed price
+
+    def confirms(
+        self,
+        discount_percent: np.ndarray,
+        min_observations: int = 5,
+        confirm_ratio: float = 0.5,
+        z_threshold: float = 3.5
+    ) -> np.ndarray:
+        """
+        Check Keepa's discount against our own history
+
+        A deal is confirmed when we have too little history to judge, when our
+        own drop reaches confirm_ratio of Keepa's discount, or when the price is
+        a strong outlier (robust z-score below -z_threshold).
+
+        Args:
+            discount_percent: Discount reported by Keepa for each ASIN
+            min_observations: Observations required before history can reject a deal
+            confirm_ratio: Fraction of Keepa's discount our drop must reach
+            z_threshold: Robust z-score that confirms a deal on its own
+
+        Returns:
+            Boolean mask of confirmed deals
+        """
+        with np.errstate(invalid='ignore'):
+            return (
+                (self.observations < min_observations)
+                | (self.drop_percent >= discount_percent * confirm_ratio)
+                | (self.robust_z <= -z_threshold)
+            )
+
+
+class PriceHistory:
+    """
+    Columnar store of observed (timestamp, price) series, one per ASIN
+
+    Each ASIN gets a pair of compact arrays. Consecutive identical prices
+    are collapsed unless min_gap seconds passed, and series are trimmed to
+    max_points, so memory stays bounded for hundreds of thousands of ASINs.
+    """
+
+    def __init__(self, window: int = 32, max_points: int = 256, min_gap: float = 3600.0):
+        """
+        Initialize the price history
+
+        Args:
+            window: Number of recent observations used for scoring
+            max_points: Maximum observations kept per ASIN
+            min_gap: Seconds before an unchanged price is recorded again
+        """
+        self.window = window
+        self.max_points = max_points
+        self.min_gap = min_gap
+
+        self._index: Dict[str, int] = {}
+        self._asins: List[str] = []
+        self._times: List[array] = []
+        self._prices: List[array] = []
+        self._lows = array('f')  # All-time low, kept when series are trimmed
+
+    def __len__(self) -> int:
+        return len(self._asins)
+
+    def record(self, asins: Sequence[str], prices: Sequence[float], timestamp: float = None) -> None:
+        """
+        Record one observation per ASIN
+
+        Args:
+            asins: Observed ASINs
+            prices: Current price of each ASIN
+            timestamp: Observation time (defaults to now)
+        """
+        if timestamp is None:
+            timestamp = time.time()
+
+        for asin, price in zip(asins, prices):
+            if not price or price <= 0:
+                continue
+
+            i = self._index.get(asin)
+            if i is None:
+                i = len(self._asins)
+                self._index[asin] = i
+                self._asins.append(asin)
+                self._times.append(array('d'))
+                self._prices.append(array('f'))
+                self._lows.append(price)
+
+            times, series = self._times[i], self._prices[i]
+            if series and series[-1] == np.float32(price) and timestamp - times[-1] < self.min_gap:
+                continue
+
+            times.append(timestamp)
+            series.append(price)
+            if price < self._lows[i]:
+                self._lows[i] = price
+
+            if len(series) > self.max_points:
+                del times[:len(times) - self.max_points]
+                del series[:len(series) - self.max_points]
+
+    def score(self, asins: Sequence[str], prices: Sequence[float]) -> HistoryScores:
+        """
+        Score current prices against recorded history, as one NumPy batch
+
+        Call this before record() so the current observation is not part of
+        its own baseline.
+
+        Args:
+            asins: ASINs to score
+            prices: Current price of each ASIN
+
+        Returns:
+            HistoryScores with one entry per ASIN
+        """
+        count = len(asins)
+        current = np.asarray(prices, dtype=np.float64)
+        matrix = np.full((count, self.window), np.nan, dtype=np.float64)
+        lows = np.full(count, np.nan, dtype=np.float64)
+        observations = np.zeros(count, dtype=np.int64)
+
+        # Gather the last window observations of each ASIN into a padded matrix
+        for row, asin in enumerate(asins):
+            i = self._index.get(asin)
+            if i is None:
+                continue
+            recent = self._prices[i][-self.window:]
+            matrix[row, :len(recent)] = recent
+            lows[row] = self._lows[i]
+            observations[row] = len(recent)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            has_history = observations > 0
+            median = np.full(count, np.nan)
+            mad = np.full(count, np.nan)
+            if has_history.any():
+                known = matrix[has_history]
+                median[has_history] = np.nanmedian(known, axis=1)
+                mad[has_history] = np.nanmedian(np.abs(known - median[has_history, None]), axis=1)
+
+            # Floor the MAD at 1% of the median so a flat history does not turn
+            # a few cents of change into an infinite score
+            mad = np.maximum(mad, median * 0.01)
+            robust_z = np.nan_to_num(_MAD_SCALE * (current - median) / mad, nan=0.0)
+
+            drop_percent = np.nan_to_num((1 - current / median) * 100, nan=0.0)
+            all_time_low = has_history & (current < lows)
+
+        return HistoryScores(
+            observations=observations,
+            rolling_median=median,
+            robust_z=robust_z,
+            drop_percent=drop_percent,
+            all_time_low=all_time_low,
+        )
+
+    def save(self, path: str) -> None:
+        """
+        Save the history to a NumPy .npz file
+
+        Args:
+            path: Destination file
+        """
+        lengths = np.fromiter((len(s) for s in self._prices), dtype=np.int64, count=len(self._prices))
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                asins=np.array(self._asins, dtype=str),
+                lengths=lengths,
+                times=np.concatenate([np.frombuffer(t, dtype=np.float64) for t in self._times])
+                if self._times else np.empty(0),
+                prices=np.concatenate([np.frombuffer(p, dtype=np.float32) for p in self._prices])
+                if self._prices else np.empty(0, dtype=np.float32),
+                lows=np.frombuffer(self._lows, dtype=np.float32),
+            )
+        os.replace(tmp_path, path)
+        logger.info(f"Saved price history for {len(self)} ASINs to {path}")
+
+    def load(self, path: str) -> None:
+        """
+        Load a history saved with save(), replacing the current content
+
+        Args:
+            path: Source file
+        """
+        with np.load(path) as data:
+            asins = data['asins'].tolist()
+            offsets = np.concatenate(([0], np.cumsum(data['lengths'])))
+            times, prices = data['times'], data['prices']
+
+            self._index = {asin: i for i, asin in enumerate(asins)}
+            self._asins = asins
+            self._times = [array('d', times[a:b].tobytes()) for a, b in zip(offsets[:-1], offsets[1:])]
+            self._prices = [array('f', prices[a:b].tobytes()) for a, b in zip(offsets[:-1], offsets[1:])]
+            self._lows = array('f', data['lows'].astype(np.float32).tobytes())
+
+        logger.info(f"Loaded price history for {len(self)} ASINs from {path}")
+
+    def get_stats(self) -> dict:
+        """Get price history statistics"""
+        return {
+            "asins": len(self),
+            "observations": sum(len(s) for s in self._prices),
+        }
@@ -0,0 +1,309 @@
+"""
+Non-blocking logging setup
+Records are queued on the calling thread and written to the console and a
+rotating log file by a background listener thread
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from tracing import current_cycle
+
+TEXT_FORMAT = '%(asctime)s [%(levelname)s] %(name)s: %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Per-deal debug lines go to these loggers, which are sampled
+SAMPLED_LOGGERS = ('scraper.deals', 'cache.entries', 'pipeline.deals')
+
+# Logger of the tracing spans, written by its own handler only
+TRACE_LOGGER = 'trace'
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.Handler] = None
+_trace_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _is_trace(record: logging.LogRecord) -> bool:
+    return record.name == TRACE_LOGGER
+
+
+def _is_not_trace(record: logging.LogRecord) -> bool:
+    return record.name != TRACE_LOGGER
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        cycle = getattr(record, 'cycle', None)
+        if cycle:
+            entry["cycle"] = cycle
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Rate-limits records per call site
+
+    Each logging call (file and line) gets a token bucket of `rate` records
+    per second. Records beyond it are dropped before they are queued, and
+    the next record let through says how many were suppressed.
+    """
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        """
+        Initialize the filter
+
+        Args:
+            rate: Records per second allowed for each call site
+            burst: Records allowed at once (defaults to one second's worth)
+        """
+        super().__init__()
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, int(rate))
+        self._buckets: Dict[Tuple[str, int], list] = {}  # Call site -> [tokens, last refill, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.burst), now, 0]
+            else:
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            suppressed, bucket[2] = bucket[2], 0
+
+        if suppressed:
+            record.msg = f"{record.msg} ({suppressed} similar lines suppressed)"
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Queues records ready to be written by the listener
+
+    Unlike the stock QueueHandler, the traceback is kept apart from the
+    message so the JSON formatter can report it in its own field, and the
+    record is stamped with the scraping cycle of the logging task.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _traceback_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        record.cycle = current_cycle()
+        return record
+
+
+_traceback_formatter = logging.Formatter()
+
+
+class _WorkerQueueHandler(_QueueHandler):
+    """Queues records of a worker process, named after the process"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = super().prepare(record)
+        record.name = f"{record.processName}/{record.name}"
+        return record
+
+
+def _install_sampling(sample_rate: float) -> None:
+    """Sample the per-deal debug loggers, before their records are queued"""
+    for name in SAMPLED_LOGGERS:
+        sampled = logging.getLogger(name)
+        for old in [f for f in sampled.filters if isinstance(f, SamplingFilter)]:
+            sampled.removeFilter(old)
+        if sample_rate > 0:
+            sampled.addFilter(SamplingFilter(sample_rate))
+
+
+def _quiet_libraries() -> None:
+    """Reduce noise from discord.py and playwright"""
+    logging.getLogger('discord').setLevel(logging.WARNING)
+    logging.getLogger('discord.http').setLevel(logging.WARNING)
+    logging.getLogger('playwright').setLevel(logging.WARNING)
+
+
+def _replace_root_handler(handler: logging.Handler, level: int) -> None:
+    root = logging.getLogger()
+    for old in root.handlers[:]:
+        root.removeHandler(old)
+        old.close()
+    root.addHandler(handler)
+    root.setLevel(level)
+
+
+def _file_handler(path: str, rotation: str, max_bytes: int, backup_count: int, when: str) -> logging.Handler:
+    """Create the log file handler for a rotation mode (size, time or none)"""
+    if rotation == 'size':
+        return logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+        )
+    if rotation == 'time':
+        return logging.handlers.TimedRotatingFileHandler(
+            path, when=when, backupCount=backup_count, encoding='utf-8'
+        )
+    if rotation == 'none':
+        return logging.FileHandler(path, encoding='utf-8')
+    raise ValueError(f"Unknown log rotation: {rotation}")
+
+
+def setup_logging(
+    debug: bool = False,
+    path: str = 'price_monitor.log',
+    rotation: str = 'size',
+    max_bytes: int = 10 * 1024 * 1024,
+    backup_count: int = 5,
+    when: str = 'midnight',
+    json_format: bool = False,
+    sample_rate: float = 5.0
+) -> logging.handlers.QueueListener:
+    """
+    Setup logging configuration
+
+    The root logger only puts records on a queue; a listener thread formats
+    them and writes them, so a slow disk never blocks the event loop.
+
+    Args:
+        debug: Log DEBUG records
+        path: Log file, empty to log to the console only
+        rotation: 'size', 'time' or 'none'
+        max_bytes: File size that triggers a rotation (size rotation)
+        backup_count: Rotated files kept
+        when: Rotation interval (time rotation), as TimedRotatingFileHandler
+        json_format: Write the log file as JSON lines
+        sample_rate: Per-deal debug lines allowed per second and call site (0 = all)
+
+    Returns:
+        The running listener, stopped at exit
+    """
+    global _listener, _queue_handler
+    level = logging.DEBUG if debug else logging.INFO
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT))
+    handlers = [console]
+    if path:
+        file_handler = _file_handler(path, rotation, max_bytes, backup_count, when)
+        file_handler.setFormatter(
+            JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT)
+        )
+        handlers.append(file_handler)
+    for handler in handlers:
+        # Spans share the queue but have a file of their own, see route_trace()
+        handler.addFilter(_is_not_trace)
+
+    stop_logging()
+    log_queue = queue.SimpleQueue()
+    _queue_handler = _QueueHandler(log_queue)
+    _replace_root_handler(_queue_handler, level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    _install_sampling(sample_rate)
+    _quiet_libraries()
+
+    return _listener
+
+
+def setup_worker_logging(log_queue, debug: bool = False, sample_rate: float = 5.0) -> None:
+    """
+    Send the logs of a worker process to the publisher process
+
+    Args:
+        log_queue: Multiprocessing queue read by listen_to_workers()
+        debug: Log DEBUG records
+        sample_rate: Per-deal debug lines allowed per second and call site (0 = all)
+    """
+    _replace_root_handler(_WorkerQueueHandler(log_queue), logging.DEBUG if debug else logging.INFO)
+    _install_sampling(sample_rate)
+    _quiet_libraries()
+
+
+def listen_to_workers(log_queue) -> logging.handlers.QueueListener:
+    """
+    Write the records of worker processes with the handlers set up by setup_logging()
+
+    Args:
+        log_queue: Multiprocessing queue given to the workers
+
+    Returns:
+        The running listener, to stop once the workers have exited
+    """
+    handlers = _listener.handlers if _listener else logging.getLogger().handlers
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def route_trace(handler: logging.Handler) -> None:
+    """
+    Write the records of the trace logger with a handler, off the calling thread
+
+    After setup_logging(), spans go through its queue and listener thread,
+    and only this handler writes them. Without it (worker processes,
+    scripts) they get a queue and listener of their own.
+
+    Args:
+        handler: Handler of the span file
+    """
+    global _trace_listener
+    trace_logger = logging.getLogger(TRACE_LOGGER)
+    for old in trace_logger.handlers[:]:
+        trace_logger.removeHandler(old)
+    handler.addFilter(_is_trace)
+
+    if _listener and _queue_handler:
+        _listener.handlers = _listener.handlers + (handler,)
+        trace_logger.addHandler(_queue_handler)
+        return
+
+    if _trace_listener:
+        _trace_listener.stop()
+    trace_queue = queue.SimpleQueue()
+    trace_logger.addHandler(logging.handlers.QueueHandler(trace_queue))
+    _trace_listener = logging.handlers.QueueListener(trace_queue, handler)
+    _trace_listener.start()
+
+
+def stop_logging() -> None:
+    """Write the queued records and stop the listener threads"""
+    global _listener, _trace_listener
+    for listener in (_listener, _trace_listener):
+        if listener:
+            listener.stop()
+            for handler in listener.handlers:
+                handler.close()
+    _listener = _trace_listener = None
+
+
+atexit.register(stop_logging)
@@ -6,37 +6,64 @@ import asyncio
 import logging
 import os
 import sys
-from typing import Optional
+import time
+from functools import partial
+from typing import Dict, List, Optional, Tuple
 
 from dotenv import load_dotenv
 
 from scraper import KeepaScraperEngine, Deal
+from scheduler import AdaptiveScheduler, parse_hours
+from network import DEFAULT_BLOCKED_RESOURCE_TYPES, DEFAULT_BLOCKED_HOSTS
 from bot import PriceMonitorBot, create_bot
-from cache import DealCache
+from cache import DealCache, PackedDealCache, PersistentDealCache
+from history import PriceHistory
+from posting import MAX_EMBEDS_PER_MESSAGE, PostingQueue, RateLimiter
+from pipeline import DealPipeline
+from webhook import WebhookPublisher
+from routing import DealRouter, Route
+from metrics import CYCLE_DEALS, CYCLE_SECONDS, QUEUE_DEPTH, MetricsServer
+from tracing import CycleProfiler, bind_cycle, configure_tracing, current_cycle, span, trace_cycle
+from logs import setup_logging
+from worker import CYCLE, DEALS, ScraperSettings, WorkerSupervisor, create_scraper
 
 
-# Configure logging
-def setup_logging(debug: bool = False):
-    """Setup logging configuration"""
-    level = logging.DEBUG if debug else logging.INFO
+logger = logging.getLogger(__name__)
 
-    logging.basicConfig(
-        level=level,
-        format='%(asctime)s [%(levelname)s] %(name)s: %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S',
-        handlers=[
-            logging.StreamHandler(sys.stdout),
-            logging.FileHandler('price_monitor.log', encoding='utf-8')
-        ]
-    )
 
-    # Reduce noise from discord.py and playwright
-    logging.getLogger('discord').setLevel(logging.WARNING)
-    logging.getLogger('discord.http').setLevel(logging.WARNING)
-    logging.getLogger('playwright').setLevel(logging.WARNING)
+def parse_keepa_urls(
+    value: str,
+    default_interval: Optional[float] = None
+) -> Tuple[List[str], Dict[str, Optional[float]]]:
+    """
+    Parse a comma-separated list of Keepa URLs with optional per-URL intervals
 
+    Each entry is either "<url>" or "<url>|<seconds>".
 
-logger = logging.getLogger(__name__)
+    Args:
+        value: Raw KEEPA_URLS value
+        default_interval: Interval for entries without an explicit one (None = every cycle)
+
+    Returns:
+        Tuple of (urls, intervals by url)
+    """
+    urls: List[str] = []
+    intervals: Dict[str, Optional[float]] = {}
+
+    for entry in value.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+
+        url, _, interval = entry.partition('|')
+        url = url.strip()
+        if url in intervals:
+            continue
+
+        urls.append(url)
+        intervals[url] = float(interval) if interval.strip() else default_interval
+
+    return urls, intervals
 
 
 class PriceMonitorApp:
@@ -50,67 +77,406 @@ class PriceMonitorApp:
         # Discord configuration
         self.discord_token = os.getenv('DISCORD_TOKEN')
         self.channel_id = int(os.getenv('DISCORD_CHANNEL_ID', 0))
+        self.publisher = os.getenv('PUBLISHER', 'bot').lower()
+        self.webhook_urls = [u.strip() for u in os.getenv('DISCORD_WEBHOOK_URLS', '').split(',') if u.strip()]
+        self.routes_file = os.getenv('ROUTES_FILE', '')
+        # Status messages never go to routed webhooks, only to an explicit one
+        # (or to DISCORD_WEBHOOK_URLS when they are the deal destinations)
+        status_webhook_url = os.getenv('STATUS_WEBHOOK_URL', '').strip()
+        if status_webhook_url:
+            self.status_webhook_urls = [status_webhook_url]
+        else:
+            self.status_webhook_urls = [] if self.routes_file else self.webhook_urls
+        self.post_concurrency = int(os.getenv('POST_CONCURRENCY', 3))
+        self.post_max_retries = int(os.getenv('POST_MAX_RETRIES', 3))
+        self.burst_threshold = int(os.getenv('BURST_THRESHOLD', 0))
+        self.burst_solo_discount = float(os.getenv('BURST_SOLO_DISCOUNT', 70))
+        self.pipeline_outbox_size = int(os.getenv('PIPELINE_OUTBOX_SIZE', 500))
+        self.post_backlog = int(os.getenv('POST_BACKLOG', 20))
+        self.edit_posted_deals = os.getenv('EDIT_POSTED_DEALS', 'true').lower() == 'true'
+        self.edit_min_drop = float(os.getenv('EDIT_MIN_DROP', 5))
 
         # Scraper configuration
         self.keepa_url = os.getenv('KEEPA_URL', 'https://keepa.com/#!deals/4')
         self.scraper_interval = int(os.getenv('SCRAPER_INTERVAL', 300))
+        # URLs without their own "|seconds" interval follow the adaptive cycle cadence
+        self.keepa_urls, self.url_intervals = parse_keepa_urls(os.getenv('KEEPA_URLS', self.keepa_url))
+        scheduler_args = dict(
+            base_interval=self.scraper_interval,
+            min_interval=float(os.getenv('SCRAPER_MIN_INTERVAL', 60)),
+            max_interval=float(os.getenv('SCRAPER_MAX_INTERVAL', 1800)),
+            jitter=float(os.getenv('SCRAPER_JITTER', 0.1)),
+            quiet_hours=parse_hours(os.getenv('SCRAPER_QUIET_HOURS', '')),
+            quiet_factor=float(os.getenv('SCRAPER_QUIET_FACTOR', 3))
+        )
+        self.scheduler = AdaptiveScheduler(**scheduler_args)
+        # Scraper processes, each with its own browser and a shard of the URLs (1 = scrape in-process)
+        self.scraper_workers = int(os.getenv('SCRAPER_WORKERS', 1))
+        self.max_browser_contexts = int(os.getenv('MAX_BROWSER_CONTEXTS', 2))
+        self.max_concurrent_pages = int(os.getenv('MAX_CONCURRENT_PAGES', 2))
+        self.extract_chunk_size = int(os.getenv('EXTRACT_CHUNK_SIZE', 25))
+
+        # Live mode keeps the pages open and reloads only when they go quiet
+        self.live_mode = os.getenv('LIVE_MODE', 'false').lower() == 'true'
+        self.live_stale_seconds = int(os.getenv('LIVE_STALE_SECONDS', 900))
         self.headless = os.getenv('HEADLESS_MODE', 'true').lower() == 'true'
+        self.extraction_mode = os.getenv('EXTRACTION_MODE', 'dom').lower()
 
         # Filter configuration
         self.min_discount = float(os.getenv('MIN_DISCOUNT_PERCENT', 40))
         self.cache_duration = int(os.getenv('CACHE_DURATION_HOURS', 24))
+        self.rules_file = os.getenv('RULES_FILE', '')
+        self.cache_backend = os.getenv('CACHE_BACKEND', 'sqlite').lower()
+        self.cache_file = os.getenv('CACHE_FILE', 'deal_cache.db')
+        self.cache_bloom_capacity = int(os.getenv('CACHE_BLOOM_CAPACITY', 0))
+
+        # Local price history
+        self.price_history_enabled = os.getenv('PRICE_HISTORY', 'false').lower() == 'true'
+        self.price_history_file = os.getenv('PRICE_HISTORY_FILE', 'price_history.npz')
+        self.price_history_save_interval = int(os.getenv('PRICE_HISTORY_SAVE_INTERVAL', 3600))
+        self.history_min_observations = int(os.getenv('HISTORY_MIN_OBSERVATIONS', 5))
 
         # Browser configuration
         self.use_cookies = os.getenv('USE_COOKIES', 'false').lower() == 'true'
         self.cookies_file = os.getenv('COOKIES_FILE', 'cookies.json')
-
-        # Debug mode
+        self.cookies_auto_save = os.getenv('COOKIES_AUTO_SAVE', 'true').lower() == 'true'
+        self.browser_profile_dir = os.getenv('BROWSER_PROFILE_DIR', '')
+
+        # Network filter configuration (enabled by default in headless mode)
+        self.block_resources = os.getenv('BLOCK_RESOURCES', str(self.headless)).lower() == 'true'
+        self.blocked_resource_types = os.getenv('BLOCKED_RESOURCE_TYPES', ','.join(DEFAULT_BLOCKED_RESOURCE_TYPES))
+        self.blocked_hosts = os.getenv('BLOCKED_HOSTS', ','.join(DEFAULT_BLOCKED_HOSTS))
+        self.allowed_hosts = os.getenv('ALLOWED_HOSTS', '')
+
+        # Metrics endpoint (0 = disabled)
+        self.metrics_port = int(os.getenv('METRICS_PORT', 0))
+        self.metrics_host = os.getenv('METRICS_HOST', '127.0.0.1')
+
+        # Tracing spans (JSON lines) and cProfile dumps of the next N cycles
+        self.trace_file = os.getenv('TRACE_FILE', '')
+        self.trace_max_bytes = int(os.getenv('TRACE_MAX_MB', 50)) * 1024 * 1024
+        self.profile_cycles = int(os.getenv('PROFILE_CYCLES', 0))
+        self.profile_dir = os.getenv('PROFILE_DIR', 'profiles')
+
+        # Debug mode and log file (written by a background thread)
         debug = os.getenv('DEBUG', 'false').lower() == 'true'
-        setup_logging(debug)
+        log_sample_rate = float(os.getenv('LOG_SAMPLE_RATE', 5))
+        log_backup_count = int(os.getenv('LOG_BACKUP_COUNT', 5))
+        setup_logging(
+            debug,
+            path=os.getenv('LOG_FILE', 'price_monitor.log'),
+            rotation=os.getenv('LOG_ROTATION', 'size').lower(),
+            max_bytes=int(os.getenv('LOG_MAX_MB', 10)) * 1024 * 1024,
+            backup_count=log_backup_count,
+            when=os.getenv('LOG_ROTATE_WHEN', 'midnight'),
+            json_format=os.getenv('LOG_FORMAT', 'text').lower() == 'json',
+            sample_rate=log_sample_rate
+        )
+        if self.trace_file:
+            configure_tracing(self.trace_file, self.trace_max_bytes, log_backup_count)
+        self.profiler = CycleProfiler(self.profile_cycles, self.profile_dir) if self.profile_cycles else None
+
+        # Everything needed to build the scraper, here or in worker processes
+        self.scraper_settings = ScraperSettings(
+            headless=self.headless,
+            use_cookies=self.use_cookies,
+            cookies_file=self.cookies_file,
+            save_cookies=self.cookies_auto_save,
+            profile_dir=self.browser_profile_dir,
+            extraction_mode=self.extraction_mode,
+            max_contexts=self.max_browser_contexts,
+            max_concurrency=self.max_concurrent_pages,
+            block_resources=self.block_resources,
+            blocked_resource_types=self.blocked_resource_types,
+            blocked_hosts=self.blocked_hosts,
+            allowed_hosts=self.allowed_hosts,
+            rules_file=self.rules_file,
+            history_min_observations=self.history_min_observations,
+            keep_posted=self.edit_posted_deals,
+            min_discount=self.min_discount,
+            chunk_size=self.extract_chunk_size,
+            live_mode=self.live_mode,
+            live_stale_seconds=self.live_stale_seconds,
+            cache_duration_hours=self.cache_duration,
+            scheduler=scheduler_args,
+            history_file=self.price_history_file if self.price_history_enabled else '',
+            history_save_interval=self.price_history_save_interval,
+            debug=debug,
+            log_sample_rate=log_sample_rate,
+            trace_file=self.trace_file,
+            trace_max_bytes=self.trace_max_bytes,
+            trace_backup_count=log_backup_count
+        )
+
+        # Routing table (defaults to the configured channel and webhooks)
+        self.router = DealRouter.from_file(self.routes_file) if self.routes_file else self._default_router()
 
         # Validate configuration
         self._validate_config()
 
         # Initialize components
         self.bot: Optional[PriceMonitorBot] = None
+        self.rate_limiter = RateLimiter()
+        self.webhook: Optional[WebhookPublisher] = None
+        self.posting_queues: Dict[str, PostingQueue] = {}
+        self.pipeline: Optional[DealPipeline] = None
         self.scraper: Optional[KeepaScraperEngine] = None
-        self.cache = DealCache(cache_duration_hours=self.cache_duration)
+        self.workers: Optional[WorkerSupervisor] = None
+        self.metrics: Optional[MetricsServer] = None
+        if self.cache_backend == 'sqlite':
+            self.cache = PersistentDealCache(
+                db_path=self.cache_file,
+                cache_duration_hours=self.cache_duration
+            )
+        elif self.cache_backend == 'packed':
+            self.cache = PackedDealCache(
+                cache_duration_hours=self.cache_duration,
+                bloom_capacity=self.cache_bloom_capacity
+            )
+        else:
+            self.cache = DealCache(cache_duration_hours=self.cache_duration)
+
+        self.price_history: Optional[PriceHistory] = None
+        self._history_saved_at = time.monotonic()
+        # Workers keep their own history
+        if self.price_history_enabled and self.scraper_workers <= 1:
+            self.price_history = PriceHistory()
+            if os.path.exists(self.price_history_file):
+                try:
+                    self.price_history.load(self.price_history_file)
+                except Exception as e:
+                    logger.error(f"Failed to load price history: {e}")
 
         self.running = False
         self.scraper_task: Optional[asyncio.Task] = None
 
     def _validate_config(self):
         """Validate required configuration"""
-        if not self.discord_token:
-            raise ValueError("DISCORD_TOKEN is required in .env file")
-        if not self.channel_id:
-            raise ValueError("DISCORD_CHANNEL_ID is required in .env file")
+        if self.publisher not in ('bot', 'webhook', 'both'):
+            raise ValueError("PUBLISHER must be 'bot', 'webhook' or 'both'")
+        if self.routes_file:
+            if not self.router.routes:
+                raise ValueError("ROUTES_FILE must define at least one route")
+            if self.router.channel_ids and not self.discord_token:
+                raise ValueError("DISCORD_TOKEN is required for channel routes")
+        else:
+            if self.publisher != 'webhook':
+                if not self.discord_token:
+                    raise ValueError("DISCORD_TOKEN is required in .env file")
+                if not self.channel_id:
+                    raise ValueError("DISCORD_CHANNEL_ID is required in .env file")
+            if self.publisher != 'bot' and not self.webhook_urls:
+                raise ValueError("DISCORD_WEBHOOK_URLS is required when PUBLISHER uses webhooks")
+        if self.cache_backend not in ('memory', 'sqlite', 'packed'):
+            raise ValueError("CACHE_BACKEND must be 'memory', 'sqlite' or 'packed'")
+        if not self.keepa_urls:
+            raise ValueError("KEEPA_URLS must contain at least one URL")
+        if self.extraction_mode not in ('dom', 'network'):
+            raise ValueError("EXTRACTION_MODE must be 'dom' or 'network'")
 
         logger.info("Configuration validated successfully")
-        logger.info(f"Keepa URL: {self.keepa_url}")
-        logger.info(f"Scraper interval: {self.scraper_interval}s")
+        for url in self.keepa_urls:
+            interval = self.url_intervals[url]
+            logger.info(f"Keepa URL: {url} ({f'every {interval:.0f}s' if interval else 'every cycle'})")
+        logger.info(
+            f"Scraper interval: {self.scraper_interval}s "
+            f"(adaptive, {self.scheduler.min_interval:.0f}-{self.scheduler.max_interval:.0f}s)"
+        )
         logger.info(f"Min discount: {self.min_discount}%")
-        logger.info(f"Cache duration: {self.cache_duration}h")
+        logger.info(f"Publisher: {self.publisher}")
+        for route in self.router.routes:
+            logger.info(f"Route {route.name}: {'channel ' + str(route.channel_id) if route.channel_id else 'webhook'}")
+        logger.info(f"Posting concurrency: {self.post_concurrency}")
+        if self.burst_threshold:
+            logger.info(f"Burst digest: from {self.burst_threshold} queued deals, solo from {self.burst_solo_discount}%")
+        if self.rules_file:
+            logger.info(f"Rules file: {self.rules_file}")
+        logger.info(f"Cache duration: {self.cache_duration}h ({self.cache_backend})")
         logger.info(f"Headless mode: {self.headless}")
+        logger.info(f"Extraction mode: {self.extraction_mode}")
+        logger.info(f"Live mode: {self.live_mode}")
+        if self.scraper_workers > 1:
+            logger.info(f"Scraper workers: {min(self.scraper_workers, len(self.keepa_urls))}")
         logger.info(f"Use cookies: {self.use_cookies}")
+        if self.browser_profile_dir:
+            logger.info(f"Browser profile: {self.browser_profile_dir} (single context)")
+        logger.info(f"Price history: {self.price_history_enabled}")
+        logger.info(f"Block resources: {self.block_resources}")
 
     async def initialize(self):
         """Initialize bot and scraper"""
         logger.info("Initializing Price Monitor...")
 
-        # Create bot instance
-        self.bot = await create_bot(self.discord_token, self.channel_id)
+        # Create publishers needed by the routing table
+        if self.router.channel_ids:
+            self.bot = await create_bot(
+                self.discord_token,
+                self.channel_id,
+                http_trace=self.rate_limiter.trace_config()
+            )
 
-        # Create scraper instance
-        self.scraper = KeepaScraperEngine(
-            keepa_url=self.keepa_url,
-            headless=self.headless,
-            use_cookies=self.use_cookies,
-            cookies_file=self.cookies_file
+        if self.router.webhook_urls or self.status_webhook_urls:
+            self.webhook = WebhookPublisher(
+                webhook_urls=self.router.webhook_urls or self.status_webhook_urls,
+                rate_limiter=self.rate_limiter,
+                max_retries=self.post_max_retries
+            )
+
+        # One posting queue per route, so destinations are posted to in parallel
+        for route in self.router.routes:
+            if route.channel_id:
+                self.posting_queues[route.name] = self._create_posting_queue(
+                    partial(self.bot.post_deal, channel_id=route.channel_id),
+                    partial(self.bot.post_digest, channel_id=route.channel_id),
+                    partial(self.bot.edit_deal, channel_id=route.channel_id),
+                    route=f"channels/{route.channel_id}",
+                    name=route.name
+                )
+            else:
+                # The publisher paces each webhook itself
+                self.posting_queues[route.name] = self._create_posting_queue(
+                    partial(self.webhook.post_deal, webhook_urls=[route.webhook_url]),
+                    partial(self.webhook.post_digest, webhook_urls=[route.webhook_url]),
+                    partial(self.webhook.edit_deal, webhook_urls=[route.webhook_url]),
+                    route=None,
+                    name=route.name
+                )
+
+        # Scrape -> dedup -> publish stages; the posting backlog leaves room for a full digest
+        self.pipeline = DealPipeline(
+            cache=self.cache,
+            router=self.router,
+            posting_queues=self.posting_queues,
+            outbox_size=self.pipeline_outbox_size,
+            posting_backlog=max(self.post_backlog, self.burst_threshold + MAX_EMBEDS_PER_MESSAGE),
+            edit_min_drop=self.edit_min_drop if self.edit_posted_deals else None
         )
 
+        # Queue depths are read when metrics are collected
+        QUEUE_DEPTH.set_function(self.pipeline.scraped.qsize, queue="scraped")
+        QUEUE_DEPTH.set_function(self.pipeline.outbox.qsize, queue="outbox")
+        for name, posting in self.posting_queues.items():
+            QUEUE_DEPTH.set_function(lambda posting=posting: posting.depth, queue=f"posting:{name}")
+
+        if self.scraper_workers > 1:
+            # Scraper processes stream their deals to this one, which dedups and posts
+            self.workers = WorkerSupervisor(
+                self.scraper_settings,
+                self.keepa_urls,
+                self.url_intervals,
+                workers=self.scraper_workers,
+                posted_asins=self.cache.posted.asins if self.edit_posted_deals else None
+            )
+        else:
+            self.scraper = create_scraper(
+                self.scraper_settings,
+                self.keepa_urls,
+                self.url_intervals,
+                price_history=self.price_history,
+                # Keep posted deals that lost their price, to mark their messages out of stock
+                is_posted=(lambda asin: self.cache.posted.get(asin) is not None) if self.edit_posted_deals else None
+            )
+
         logger.info("Initialization complete")
 
+    def _default_router(self) -> DealRouter:
+        """
+        Build the routing table used without ROUTES_FILE
+
+        Every deal goes to the configured channel and/or each webhook,
+        depending on PUBLISHER.
+
+        Returns:
+            DealRouter instance
+        """
+        routes = []
+        if self.publisher in ('bot', 'both') and self.channel_id:
+            routes.append(Route(name='channel', channel_id=self.channel_id))
+        if self.publisher in ('webhook', 'both'):
+            routes.extend(
+                Route(name=f'webhook-{i}', webhook_url=url)
+                for i, url in enumerate(self.webhook_urls, start=1)
+            )
+        return DealRouter(routes)
+
+    def _create_posting_queue(self, post, post_batch, edit, route: Optional[str], name: str) -> PostingQueue:
+        """
+        Create a posting queue for one route
+
+        Args:
+            post: Coroutine function posting one deal
+            post_batch: Coroutine function posting a digest
+            edit: Coroutine function editing a posted deal's message
+            route: Rate limit route taken by the queue (None if the publisher paces itself)
+            name: Route name, used to label metrics
+
+        Returns:
+            PostingQueue instance
+        """
+        return PostingQueue(
+            post=post,
+            route=route,
+            rate_limiter=self.rate_limiter,
+            concurrency=self.post_concurrency,
+            max_retries=self.post_max_retries,
+            on_posted=self._on_deal_posted,
+            post_batch=post_batch,
+            burst_threshold=self.burst_threshold,
+            solo_discount=self.burst_solo_discount,
+            name=name,
+            edit=edit
+        )
+
+    async def send_status_message(self, message: str) -> None:
+        """
+        Send a status message through every publisher
+
+        Args:
+            message: Status message to send
+        """
+        if self.bot:
+            await self.bot.send_status_message(message)
+        if self.webhook and self.status_webhook_urls:
+            await self.webhook.send_status_message(message, webhook_urls=self.status_webhook_urls)
+
+    def _on_deal_posted(self, deal: Deal, route: str, message_id: Optional[int]) -> None:
+        """
+        Remember a deal once it has been posted
+
+        Args:
+            deal: Posted deal
+            route: Name of the route it was posted to
+            message_id: ID of the message, None if it went out in a digest
+        """
+        with span("cache.add"):
+            first_post = not self.cache.is_cached(deal.asin)
+            if first_post:
+                self.cache.add(deal.asin)
+            if message_id:
+                self.cache.posted.record(deal.asin, route, message_id, deal.current_price)
+        if not first_post:
+            # Already posted to another route
+            return
+        logger.info(f"Posted new deal: {deal.title[:50]}... ({deal.discount_percent:.1f}% off)")
+
+    def save_price_history(self, force: bool = False) -> None:
+        """
+        Save the price history to disk when the save interval has elapsed
+
+        Args:
+            force: Save regardless of the interval
+        """
+        if not self.price_history:
+            return
+        if not force and time.monotonic() - self._history_saved_at < self.price_history_save_interval:
+            return
+
+        try:
+            self.price_history.save(self.price_history_file)
+        except Exception as e:
+            logger.error(f"Failed to save price history: {e}")
+        self._history_saved_at = time.monotonic()
+
     async def scraper_loop(self):
         """Background task that continuously scrapes for deals"""
         logger.info("Starting scraper loop...")
@@ -118,60 +484,161 @@ class PriceMonitorApp:
         await asyncio.sleep(10)  # Wait for bot to be ready
 
         while self.running:
+            # URLs without their own interval follow the scheduler; an early
+            # wake-up for a URL with its own interval scrapes only that URL
+            full_cycle = self.scheduler.seconds_until_next() <= 0
             try:
-                logger.info("Starting scraping cycle...")
+                if full_cycle:
+                    logger.info("Starting scraping cycle...")
+                    self.scheduler.cycle_started()
+                else:
+                    logger.info("Scraping URLs with their own interval...")
+                cycle_started = time.perf_counter()
+
+                with trace_cycle(self.profiler, full_cycle=full_cycle) as cycle_span:
+                    # Stream deals into the pipeline, which never makes the scraper wait
+                    found = 0
+                    new_before = self.pipeline.new_deals
+                    async for chunk in self.scraper.scrape_deals_stream(
+                        min_discount=self.min_discount,
+                        chunk_size=self.extract_chunk_size,
+                        full_cycle=full_cycle
+                    ):
+                        found += len(chunk)
+                        self.pipeline.submit(chunk)
+
+                        if not self.running:
+                            break
+
+                    # Dedup is a cache lookup, so this only waits for the last chunk
+                    await self.pipeline.drain_scraped()
+                    self.pipeline.flush_edits()
+                    new_deals = self.pipeline.new_deals - new_before
+                    cycle_span.set(found=found, new=new_deals)
+                    logger.info(f"Scraping cycle {current_cycle()} complete. Found {found} deals ({new_deals} new).")
+                CYCLE_SECONDS.observe(time.perf_counter() - cycle_started)
+                CYCLE_DEALS.set(found, stage="found")
+                CYCLE_DEALS.set(new_deals, stage="new")
+
+                if full_cycle:
+                    cycle = self.scraper.cycle_stats
+                    self.scheduler.record(
+                        new_deals,
+                        errors=cycle.get('failures', 0),
+                        challenges=cycle.get('challenges', 0)
+                    )
 
-                # Scrape deals
-                deals = await self.scraper.scrape_deals(min_discount=self.min_discount)
+                # Log cache stats
+                stats = self.cache.get_stats()
+                logger.debug(f"Cache stats: {stats}")
+                logger.debug(f"Routing stats: {self.router.get_stats()}")
+                logger.info(f"Pipeline stats: {self.pipeline.get_stats()}")
+                logger.debug(f"Recovery stats: {self.scraper.recovery_stats}")
+                for name, posting in self.posting_queues.items():
+                    logger.info(f"Posting stats ({name}): {posting.get_stats()}")
+
+                self.save_price_history()
+
+                # Wait until the next cycle start, or earlier if a URL with its own interval is due
+                wait = self.scheduler.seconds_until_next()
+                due = self.scraper.seconds_until_due()
+                if due is not None:
+                    wait = min(wait, due)
+                logger.info(f"Waiting {wait:.0f}s until next scan...")
+                await asyncio.sleep(wait)
 
-                # Process each deal
-                for deal in deals:
-                    if not self.running:
-                        break
+            except asyncio.CancelledError:
+                logger.info("Scraper loop cancelled")
+                break
 
-                    # Check if already posted
-                    if self.cache.is_cached(deal.asin):
-                        logger.debug(f"Skipping cached deal: {deal.asin}")
-                        continue
+            except Exception as e:
+                logger.error(f"Error in scraper loop: {e}", exc_info=True)
 
-                    # Post to Discord
-                    success = await self.bot.post_deal(deal)
+                # Try to recover
+                if full_cycle:
+                    self.scheduler.record(0, errors=1)
+                try:
+                    logger.info("Attempting to recover scraper...")
+                    await self.scraper.recover()
+                    await asyncio.sleep(max(self.scheduler.seconds_until_next(), 30))  # Wait before retry
+                except Exception as recover_error:
+                    logger.error(f"Failed to recover scraper: {recover_error}")
+                    await asyncio.sleep(max(self.scheduler.seconds_until_next(), 60))  # Longer wait on failure
 
-                    if success:
-                        # Add to cache
-                        self.cache.add(deal.asin)
-                        logger.info(f"Posted new deal: {deal.title[:50]}... ({deal.discount_percent:.1f}% off)")
+        logger.info("Scraper loop stopped")
 
-                        # Small delay between posts to avoid rate limits
-                        await asyncio.sleep(2)
+    async def live_loop(self):
+        """Background task that keeps the deal pages open and posts deals as they appear"""
+        logger.info("Starting live loop...")
 
-                logger.info(f"Scraping cycle complete. Found {len(deals)} deals.")
+        await asyncio.sleep(10)  # Wait for bot to be ready
 
-                # Log cache stats
-                stats = self.cache.get_stats()
-                logger.debug(f"Cache stats: {stats}")
+        while self.running:
+            try:
+                async for chunk in self.scraper.live_deals_stream(
+                    min_discount=self.min_discount,
+                    stale_after=self.live_stale_seconds
+                ):
+                    self.pipeline.submit(chunk)
+                    self.pipeline.flush_edits()
+                    self.save_price_history()
 
-                # Wait before next cycle
-                logger.info(f"Waiting {self.scraper_interval}s until next scan...")
-                await asyncio.sleep(self.scraper_interval)
+                    if not self.running:
+                        break
 
             except asyncio.CancelledError:
-                logger.info("Scraper loop cancelled")
+                logger.info("Live loop cancelled")
                 break
 
             except Exception as e:
-                logger.error(f"Error in scraper loop: {e}", exc_info=True)
+                logger.error(f"Error in live loop: {e}", exc_info=True)
 
                 # Try to recover
                 try:
-                    logger.info("Attempting to restart scraper...")
-                    await self.scraper.restart()
+                    logger.info("Attempting to recover scraper...")
+                    await self.scraper.recover()
                     await asyncio.sleep(30)  # Wait before retry
-                except Exception as restart_error:
-                    logger.error(f"Failed to restart scraper: {restart_error}")
+                except Exception as recover_error:
+                    logger.error(f"Failed to recover scraper: {recover_error}")
                     await asyncio.sleep(60)  # Longer wait on failure
 
-        logger.info("Scraper loop stopped")
+        logger.info("Live loop stopped")
+
+    async def worker_loop(self):
+        """Background task that feeds the pipeline with the deals of the scraper processes"""
+        logger.info("Starting worker loop...")
+
+        try:
+            async for message in self.workers.messages():
+                try:
+                    if message[0] == DEALS:
+                        _, worker, cycle_id, deals = message
+                        with bind_cycle(cycle_id):
+                            self.pipeline.submit(deals)
+                        self.pipeline.flush_edits()
+
+                    elif message[0] == CYCLE:
+                        _, worker, cycle_id, seconds, found, new_deals = message
+                        CYCLE_SECONDS.observe(seconds)
+                        CYCLE_DEALS.set(found, stage="found")
+                        logger.info(f"Worker {worker + 1} cycle {cycle_id}: {found} deals ({new_deals} new to it)")
+
+                        logger.debug(f"Cache stats: {self.cache.get_stats()}")
+                        logger.debug(f"Worker stats: {self.workers.get_stats()}")
+                        logger.info(f"Pipeline stats: {self.pipeline.get_stats()}")
+                        for name, posting in self.posting_queues.items():
+                            logger.info(f"Posting stats ({name}): {posting.get_stats()}")
+
+                except Exception as e:
+                    logger.error(f"Error handling worker message: {e}", exc_info=True)
+
+                if not self.running:
+                    break
+
+        except asyncio.CancelledError:
+            logger.info("Worker loop cancelled")
+
+        logger.info("Worker loop stopped")
 
     async def start(self):
         """Start the application"""
@@ -182,19 +649,42 @@ class PriceMonitorApp:
             # Initialize components
             await self.initialize()
 
-            # Initialize the scraper browser
-            await self.scraper.initialize()
+            # Expose metrics before the first cycle
+            if self.metrics_port:
+                self.metrics = MetricsServer(host=self.metrics_host, port=self.metrics_port)
+                await self.metrics.start()
+
+            # Initialize the scraper browser, or start the scraper processes
+            if self.workers:
+                self.workers.start()
+            else:
+                await self.scraper.initialize()
+
+            # Start publishers and posting workers
+            if self.webhook:
+                await self.webhook.start()
+            for posting in self.posting_queues.values():
+                posting.start()
+            self.pipeline.start()
 
             # Start scraper background task
-            self.scraper_task = asyncio.create_task(self.scraper_loop())
+            if self.workers:
+                loop = self.worker_loop()
+            else:
+                loop = self.live_loop() if self.live_mode else self.scraper_loop()
+            self.scraper_task = asyncio.create_task(loop)
 
             # Send startup message
-            await self.bot.send_status_message(
+            await self.send_status_message(
                 "✅ Price Monitor is now online and scanning for deals!"
             )
 
-            # Start Discord bot (this blocks until bot is stopped)
-            await self.bot.start(self.discord_token)
+            if self.bot:
+                # Start Discord bot (this blocks until bot is stopped)
+                await self.bot.start(self.discord_token)
+            else:
+                # Webhook only: no gateway, run until the scraper stops
+                await self.scraper_task
 
         except KeyboardInterrupt:
             logger.info("Received keyboard interrupt")
@@ -216,20 +706,41 @@ class PriceMonitorApp:
             except asyncio.CancelledError:
                 pass
 
+        # Stop scraper processes
+        if self.workers:
+            await asyncio.to_thread(self.workers.stop)
+
+        # Stop pipeline stages and posting workers
+        if self.pipeline:
+            await self.pipeline.stop()
+        for posting in self.posting_queues.values():
+            await posting.stop()
+
+        # Persist the deals posted so far before the slower shutdown steps
+        if isinstance(self.cache, PersistentDealCache):
+            self.cache.flush()
+
         # Cleanup scraper
         if self.scraper:
             await self.scraper.cleanup()
 
-        # Close bot
-        if self.bot:
-            try:
-                await self.bot.send_status_message(
-                    "🔴 Price Monitor is shutting down..."
-                )
-            except:
-                pass
+        # Close publishers
+        try:
+            await self.send_status_message("🔴 Price Monitor is shutting down...")
+        except:
+            pass
 
+        if self.bot:
             await self.bot.close()
+        if self.webhook:
+            await self.webhook.close()
+        if self.metrics:
+            await self.metrics.stop()
+
+        # Persist pending cache entries and price history
+        if isinstance(self.cache, PersistentDealCache):
+            self.cache.close()
+        self.save_price_history(force=True)
 
         logger.info("Application stopped")
 
@@ -0,0 +1,375 @@
+"""
+Prometheus metrics for scrape and post performance
+Small self-contained registry exposed over HTTP by an aiohttp server
+"""
+import asyncio
+import copy
+import logging
+import math
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from a fast evaluate() to a slow navigation
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the text exposition format"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """Render a Prometheus label set"""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    """Base class of a metric family with optional labels"""
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def state(self) -> dict:
+        """Picklable copy of the values, for merge() in another process"""
+        raise NotImplementedError
+
+    def merge(self, state: dict) -> None:
+        """Add the values of another process to this metric"""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        """Increase the counter"""
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+    def state(self) -> dict:
+        return dict(self._values)
+
+    def merge(self, state: dict) -> None:
+        for key, value in state.items():
+            self._values[key] = self._values.get(key, 0.0) + value
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, or is read from a function at scrape time"""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._functions: Dict[LabelValues, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels) -> None:
+        """Set the gauge"""
+        self._values[self._key(labels)] = value
+
+    def set_function(self, function: Callable[[], float], **labels) -> None:
+        """Read the gauge from function when metrics are collected"""
+        self._functions[self._key(labels)] = function
+
+    def get(self, **labels) -> float:
+        key = self._key(labels)
+        if key in self._functions:
+            return self._functions[key]()
+        return self._values.get(key, 0.0)
+
+    def samples(self) -> List[str]:
+        values = dict(self._values)
+        for key, function in self._functions.items():
+            try:
+                values[key] = float(function())
+            except Exception as e:
+                logger.debug(f"Gauge {self.name} function failed: {e}")
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets"""
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        """Record one observation"""
+        key = self._key(labels)
+        counts = self._counts.get(key)
+        if counts is None:
+            counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+            self._sums[key] = 0.0
+        # Buckets are stored non-cumulative and summed when rendered
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+        self._sums[key] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the duration of the with block, in seconds"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key in sorted(self._counts):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), self._counts[key]):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(self._sums[key])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+    def state(self) -> dict:
+        return {key: (list(counts), self._sums[key]) for key, counts in self._counts.items()}
+
+    def merge(self, state: dict) -> None:
+        for key, (counts, total) in state.items():
+            mine = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            for i, count in enumerate(counts):
+                mine[i] += count
+            self._sums[key] = self._sums.get(key, 0.0) + total
+
+
+class Registry:
+    """
+    Collection of metrics rendered together
+
+    Counters and histograms of other processes (scraper workers) can be
+    added with set_remote(): the last snapshot of each process is summed
+    into the rendered values, and retire_remote() keeps the totals of a
+    process that exited so they never go backwards.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._remote: Dict[str, Dict[str, dict]] = {}  # Last snapshot of each process
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self, names: Sequence[str]) -> Dict[str, dict]:
+        """
+        Copy the values of some counters and histograms
+
+        Args:
+            names: Metric names
+
+        Returns:
+            Picklable values by metric name, for set_remote() in another process
+        """
+        return {name: self._metrics[name].state() for name in names}
+
+    def set_remote(self, source: str, snapshot: Dict[str, dict]) -> None:
+        """
+        Replace the values reported by another process
+
+        Args:
+            source: Name of the process
+            snapshot: Result of snapshot() in that process
+        """
+        self._remote[source] = snapshot
+
+    def retire_remote(self, source: str) -> None:
+        """Fold the last values of a process that exited into the local metrics"""
+        for name, state in self._remote.pop(source, {}).items():
+            self._metrics[name].merge(state)
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text format"""
+        blocks = []
+        for name, metric in self._metrics.items():
+            states = [snapshot[name] for snapshot in self._remote.values() if name in snapshot]
+            if states:
+                metric = copy.deepcopy(metric)
+                for state in states:
+                    metric.merge(state)
+            blocks.append(metric.render())
+        return "\n".join(blocks) + "\n"
+
+
+REGISTRY = Registry()
+
+# Scraper
+NAVIGATION_SECONDS = REGISTRY.register(Histogram(
+    "spybot_navigation_seconds", "Time to load a Keepa deals page"))
+SELECTOR_WAIT_SECONDS = REGISTRY.register(Histogram(
+    "spybot_selector_wait_seconds", "Time waiting for deal data (table selectors or network payload)"))
+EVALUATE_SECONDS = REGISTRY.register(Histogram(
+    "spybot_evaluate_seconds", "Duration of page.evaluate extraction calls"))
+DEALS_EXTRACTED = REGISTRY.register(Counter(
+    "spybot_deals_extracted_total", "Deal rows read from Keepa"))
+DEALS_FILTERED = REGISTRY.register(Counter(
+    "spybot_deals_filtered_total", "Deals that passed the filtering rules"))
+CYCLE_DEALS = REGISTRY.register(Gauge(
+    "spybot_cycle_deals", "Deals of the last scraping cycle", ("stage",)))
+CYCLE_SECONDS = REGISTRY.register(Histogram(
+    "spybot_cycle_seconds", "Duration of a scraping cycle"))
+BROWSER_RECOVERIES = REGISTRY.register(Counter(
+    "spybot_browser_recoveries_total", "Successful browser recoveries by tier", ("tier",)))
+BROWSER_RESTARTS = REGISTRY.register(Counter(
+    "spybot_browser_restarts_total", "Chromium relaunches"))
+
+# Recorded in the process that runs the browser, sent to the publisher by scraper workers
+SCRAPER_METRICS = (
+    NAVIGATION_SECONDS.name, SELECTOR_WAIT_SECONDS.name, EVALUATE_SECONDS.name,
+    DEALS_EXTRACTED.name, DEALS_FILTERED.name, BROWSER_RECOVERIES.name, BROWSER_RESTARTS.name,
+)
+
+# Deduplication and posting
+CACHE_HITS = REGISTRY.register(Counter(
+    "spybot_cache_hits_total", "Deals skipped because they were already posted"))
+CACHE_MISSES = REGISTRY.register(Counter(
+    "spybot_cache_misses_total", "Deals not found in the cache"))
+POST_SECONDS = REGISTRY.register(Histogram(
+    "spybot_post_seconds", "Time to post a message to Discord", ("route",)))
+DEALS_POSTED = REGISTRY.register(Counter(
+    "spybot_deals_posted_total", "Deals posted to Discord", ("route",)))
+POST_FAILURES = REGISTRY.register(Counter(
+    "spybot_post_failures_total", "Deals that could not be posted", ("route",)))
+QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "spybot_queue_depth", "Items waiting in a queue", ("queue",)))
+
+# Runtime
+EVENT_LOOP_LAG = REGISTRY.register(Histogram(
+    "spybot_event_loop_lag_seconds", "Delay of the event loop in waking up a sleeping task",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)))
+
+
+class MetricsServer:
+    """
+    aiohttp server exposing the registry on /metrics
+
+    Also runs a task that measures event loop lag: how late a short sleep
+    wakes up, which grows when a callback blocks the loop.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 9100,
+        registry: Registry = REGISTRY,
+        lag_interval: float = 0.5
+    ):
+        """
+        Initialize the metrics server
+
+        Args:
+            host: Interface to listen on
+            port: Port to listen on
+            registry: Metrics to expose
+            lag_interval: Seconds between event loop lag measurements
+        """
+        self.host = host
+        self.port = port
+        self.registry = registry
+        self.lag_interval = lag_interval
+
+        self._runner: Optional[web.AppRunner] = None
+        self._lag_task: Optional[asyncio.Task] = None
+
+    async def _handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(
+            text=self.registry.render(),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+        )
+
+    async def _measure_lag(self) -> None:
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.lag_interval)
+            EVENT_LOOP_LAG.observe(max(0.0, time.monotonic() - started - self.lag_interval))
+
+    async def start(self) -> None:
+        """Start serving metrics"""
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle_metrics)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self._lag_task = asyncio.create_task(self._measure_lag(), name="event-loop-lag")
+        logger.info(f"Metrics available on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self) -> None:
+        """Stop the server"""
+        if self._lag_task:
+            self._lag_task.cancel()
+            await asyncio.gather(self._lag_task, return_exceptions=True)
+            self._lag_task = None
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
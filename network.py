@@ -0,0 +1,146 @@
+"""
+Request interception layer for the Keepa browser context
+Blocks resources the deal extractor never reads (images, fonts, trackers)
+"""
+import logging
+from collections import Counter
+from typing import Iterable, Optional
+from urllib.parse import urlparse
+
+from playwright.async_api import BrowserContext, Request, Response, Route
+
+logger = logging.getLogger(__name__)
+
+# Resource types the DOM extractor never needs (img.src is still readable when blocked)
+DEFAULT_BLOCKED_RESOURCE_TYPES = ("image", "media", "font")
+
+# Analytics and ad beacons loaded by Keepa and Amazon widgets
+DEFAULT_BLOCKED_HOSTS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "amazon-adsystem.com",
+    "facebook.net",
+    "facebook.com",
+    "hotjar.com",
+    "scorecardresearch.com",
+)
+
+
+def _parse_list(value: Optional[Iterable[str]]) -> set:
+    """Normalize an iterable or comma-separated string into a lowercase set"""
+    if value is None:
+        return set()
+    if isinstance(value, str):
+        value = value.split(",")
+    return {item.strip().lower() for item in value if item and item.strip()}
+
+
+def _host_matches(host: str, hosts: set) -> bool:
+    """Check if host is one of hosts or a subdomain of one of them"""
+    return any(host == h or host.endswith("." + h) for h in hosts)
+
+
+class NetworkFilter:
+    """
+    Allow/deny rules applied to every request of a BrowserContext
+
+    Rules are evaluated in order:
+        1. Host in allowed_hosts -> allowed
+        2. Host in blocked_hosts -> blocked
+        3. Resource type in blocked_resource_types -> blocked
+        4. Otherwise allowed
+    """
+
+    def __init__(
+        self,
+        blocked_resource_types: Optional[Iterable[str]] = DEFAULT_BLOCKED_RESOURCE_TYPES,
+        blocked_hosts: Optional[Iterable[str]] = DEFAULT_BLOCKED_HOSTS,
+        allowed_hosts: Optional[Iterable[str]] = None
+    ):
+        """
+        Initialize the network filter
+
+        Args:
+            blocked_resource_types: Playwright resource types to abort (image, font, media...)
+            blocked_hosts: Hosts (and their subdomains) to abort
+            allowed_hosts: Hosts that are always allowed, overriding the deny rules
+        """
+        self.blocked_resource_types = _parse_list(blocked_resource_types)
+        self.blocked_hosts = _parse_list(blocked_hosts)
+        self.allowed_hosts = _parse_list(allowed_hosts)
+
+        self.reset_stats()
+
+    def should_block(self, url: str, resource_type: str) -> bool:
+        """
+        Decide whether a request should be aborted
+
+        Args:
+            url: Request URL
+            resource_type: Playwright resource type
+
+        Returns:
+            True if the request should be blocked
+        """
+        host = (urlparse(url).hostname or "").lower()
+
+        if host and _host_matches(host, self.allowed_hosts):
+            return False
+        if host and _host_matches(host, self.blocked_hosts):
+            return True
+        return resource_type in self.blocked_resource_types
+
+    async def attach(self, context: BrowserContext) -> None:
+        """
+        Install the interception handlers on a browser context
+
+        Args:
+            context: Playwright browser context
+        """
+        await context.route("**/*", self._handle_route)
+        context.on("response", self._on_response)
+        logger.info(
+            f"Network filter attached (blocked types: {sorted(self.blocked_resource_types)}, "
+            f"blocked hosts: {len(self.blocked_hosts)}, allowed hosts: {len(self.allowed_hosts)})"
+        )
+
+    async def _handle_route(self, route: Route, request: Request) -> None:
+        """Abort or continue a single intercepted request"""
+        self.requests_total += 1
+
+        try:
+            if self.should_block(request.url, request.resource_type):
+                self.requests_blocked += 1
+                self.blocked_by_type[request.resource_type] += 1
+                await route.abort()
+            else:
+                await route.continue_()
+        except Exception as e:
+            # The page may have navigated away or closed while the request was pending
+            logger.debug(f"Route handling failed for {request.url}: {e}")
+
+    def _on_response(self, response: Response) -> None:
+        """Account bytes received for requests that were let through"""
+        content_length = response.headers.get("content-length")
+        if content_length and content_length.isdigit():
+            self.bytes_received += int(content_length)
+
+    def reset_stats(self) -> None:
+        """Reset per-cycle counters"""
+        self.requests_total = 0
+        self.requests_blocked = 0
+        self.bytes_received = 0
+        self.blocked_by_type: Counter = Counter()
+
+    def get_stats(self) -> dict:
+        """Get network filter statistics for the current cycle"""
+        return {
+            "requests_total": self.requests_total,
+            "requests_blocked": self.requests_blocked,
+            "requests_allowed": self.requests_total - self.requests_blocked,
+            "bytes_received": self.bytes_received,
+            "blocked_by_type": dict(self.blocked_by_type),
+        }
@@ -0,0 +1,386 @@
+"""
+Decoupled scrape -> dedup -> publish pipeline
+Stages run as independent tasks connected by bounded queues
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from metrics import CACHE_HITS, CACHE_MISSES
+from posting import PostingQueue
+from routing import DealRouter, Route
+from tracing import bind_cycle, current_cycle, span
+from scraper import OUT_OF_STOCK, Deal
+
+logger = logging.getLogger(__name__)
+# Per-deal debug lines, sampled by the logging setup
+deal_logger = logging.getLogger(f"{__name__}.deals")
+
+# Overflow policies of BoundedQueue
+DROP_OLDEST = "drop_oldest"
+DROP_LOWEST = "drop_lowest"
+
+# Seconds a deal that matched no route is not offered again
+UNROUTED_TTL = 900.0
+
+
+class BoundedQueue(asyncio.Queue):
+    """
+    asyncio.Queue whose producers never wait
+
+    offer() always returns immediately. When the queue is full it either
+    drops the oldest item (drop_oldest) or the item with the lowest
+    priority, which may be the new one (drop_lowest).
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        policy: str = DROP_OLDEST,
+        priority: Optional[Callable] = None,
+        on_drop: Optional[Callable] = None
+    ):
+        """
+        Initialize the queue
+
+        Args:
+            maxsize: Maximum number of queued items
+            policy: DROP_OLDEST or DROP_LOWEST
+            priority: Key function for DROP_LOWEST, higher is kept
+            on_drop: Called with each dropped item
+        """
+        if policy not in (DROP_OLDEST, DROP_LOWEST):
+            raise ValueError(f"Unknown queue policy: {policy}")
+        if policy == DROP_LOWEST and priority is None:
+            raise ValueError("DROP_LOWEST needs a priority function")
+
+        super().__init__(maxsize=max(1, maxsize))
+        self.policy = policy
+        self.priority = priority
+        self.on_drop = on_drop
+        self.dropped = 0
+        self.max_depth = 0
+
+    def offer(self, item) -> bool:
+        """
+        Queue an item without waiting, applying the overflow policy
+
+        Args:
+            item: Item to queue
+
+        Returns:
+            False if the new item itself was dropped
+        """
+        if self.full():
+            if self.policy == DROP_OLDEST:
+                victim = self._queue.popleft()
+            else:
+                victim = min(self._queue, key=self.priority)
+                if self.priority(item) <= self.priority(victim):
+                    victim = item
+                else:
+                    self._queue.remove(victim)
+
+            self.dropped += 1
+            if self.on_drop:
+                self.on_drop(victim)
+            if victim is item:
+                return False
+            # Balance the put() of the removed item for join()
+            self.task_done()
+
+        self.put_nowait(item)
+        self.max_depth = max(self.max_depth, self.qsize())
+        return True
+
+
+@dataclass
+class StageStats:
+    """Throughput and latency counters of one pipeline stage"""
+    processed: int = 0
+    total_latency: float = 0.0
+    max_latency: float = 0.0
+
+    def observe(self, enqueued_at: float) -> None:
+        """Record an item taken from the stage's input queue"""
+        latency = time.monotonic() - enqueued_at
+        self.processed += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+
+    def snapshot(self, queue: BoundedQueue) -> dict:
+        """Counters of the stage together with its input queue"""
+        return {
+            "queue_depth": queue.qsize(),
+            "max_depth": queue.max_depth,
+            "dropped": queue.dropped,
+            "processed": self.processed,
+            "avg_latency_ms": round(self.total_latency / self.processed * 1000, 1) if self.processed else 0.0,
+            "max_latency_ms": round(self.max_latency * 1000, 1),
+        }
+
+
+class DealPipeline:
+    """
+    Scrape -> dedup -> publish pipeline
+
+    The producer hands deal chunks to submit(), which never waits, so the
+    scraper keeps its cadence while Discord throttles us. The dedup stage
+    drops deals already posted and queues the new ones in the outbox,
+    where the lowest discounts are dropped first when it overflows. The
+    publish stage moves deals from the outbox to the posting queue of each
+    matching route, only when that queue has room. A deal counts as new
+    once it is routed and not already waiting in a posting queue; deals
+    that match no route are not offered again for unrouted_ttl seconds.
+
+    Deals already posted are not reposted. When edits are enabled, a
+    posted deal whose price dropped further or that went out of stock is
+    queued for an edit of its messages instead; edits are coalesced by
+    ASIN and applied once per cycle by flush_edits().
+    """
+
+    def __init__(
+        self,
+        cache,
+        router: DealRouter,
+        posting_queues: Dict[str, PostingQueue],
+        scraped_size: int = 16,
+        outbox_size: int = 500,
+        posting_backlog: int = 20,
+        edit_min_drop: Optional[float] = None,
+        unrouted_ttl: float = UNROUTED_TTL
+    ):
+        """
+        Initialize the pipeline
+
+        Args:
+            cache: Deal cache with filter_new()
+            router: Routes deals to posting queues
+            posting_queues: Posting queue of each route, by route name
+            scraped_size: Deal chunks buffered between the scraper and dedup
+            outbox_size: New deals buffered between dedup and publishing
+            posting_backlog: Deals allowed to wait in each posting queue
+            edit_min_drop: Further price drop (percent of the posted price) that
+                edits a posted deal's messages, None to never edit
+            unrouted_ttl: Seconds a deal that matched no route is skipped
+        """
+        self.cache = cache
+        self.router = router
+        self.posting_queues = posting_queues
+        self.posting_backlog = max(1, posting_backlog)
+        self.edit_min_drop = edit_min_drop
+        self.unrouted_ttl = unrouted_ttl
+
+        self._outbox_asins: set = set()  # New deals waiting in the outbox
+        self._unrouted: Dict[str, float] = {}  # Expiry of deals that matched no route, by ASIN
+        self.scraped = BoundedQueue(scraped_size, DROP_OLDEST, on_drop=self._on_chunk_dropped)
+        self.outbox = BoundedQueue(
+            outbox_size,
+            DROP_LOWEST,
+            priority=lambda item: item[1].discount_percent,
+            on_drop=self._on_deal_dropped
+        )
+
+        self.dedup_stats = StageStats()
+        self.publish_stats = StageStats()
+        self.chunks_submitted = 0
+        self.new_deals = 0
+
+        self._edits: Dict[str, Deal] = {}  # Latest version of each deal to edit, by ASIN
+        self._edit_task: Optional[asyncio.Task] = None
+        self.edits_queued = 0
+        self.edits_applied = 0
+
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        """Start the dedup and publish stages"""
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._dedup_stage(), name="pipeline-dedup"),
+            asyncio.create_task(self._publish_stage(), name="pipeline-publish"),
+        ]
+
+    async def stop(self) -> None:
+        """Cancel the stages and pending edits, dropping buffered deals"""
+        if self._edit_task:
+            self._tasks.append(self._edit_task)
+            self._edit_task = None
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, deals: List[Deal]) -> bool:
+        """
+        Hand a chunk of scraped deals to the pipeline without waiting
+
+        Args:
+            deals: Deals found by the scraper
+
+        Returns:
+            False if the chunk was dropped
+        """
+        if not deals:
+            return True
+        self.chunks_submitted += 1
+        return self.scraped.offer((time.monotonic(), deals, current_cycle()))
+
+    async def drain_scraped(self) -> None:
+        """Wait until the dedup stage has handled every submitted chunk"""
+        await self.scraped.join()
+
+    def _on_chunk_dropped(self, item) -> None:
+        logger.warning(f"Pipeline behind, dropped a chunk of {len(item[1])} scraped deals")
+
+    def _on_deal_dropped(self, item) -> None:
+        deal = item[1]
+        self._outbox_asins.discard(deal.asin)
+        logger.warning(f"Outbox full, dropped deal {deal.asin} ({deal.discount_percent:.1f}% off)")
+
+    async def _dedup_stage(self) -> None:
+        """Drop deals already posted, waiting or unrouted, queue the new ones in the outbox"""
+        while True:
+            enqueued_at, deals, cycle_id = await self.scraped.get()
+            try:
+                self.dedup_stats.observe(enqueued_at)
+
+                # Check which deals were already posted, in one pass
+                with bind_cycle(cycle_id), span("cache.filter_new", deals=len(deals)):
+                    new_asins = set(self.cache.filter_new(deal.asin for deal in deals))
+                CACHE_MISSES.inc(len(new_asins))
+                CACHE_HITS.inc(len(deals) - len(new_asins))
+                new_asins -= self._outbox_asins
+                now = time.monotonic()
+                self._expire_unrouted(now)
+                for deal in deals:
+                    if deal.asin not in new_asins:
+                        self._check_posted(deal)
+                        continue
+                    new_asins.discard(deal.asin)
+
+                    if deal.availability == OUT_OF_STOCK:
+                        # Only kept by the scraper to update its message, which expired
+                        continue
+
+                    routes = self._route_new(deal, now)
+                    if not routes:
+                        continue
+                    self.new_deals += 1
+                    if self.outbox.offer((now, deal, routes)):
+                        self._outbox_asins.add(deal.asin)
+
+            except Exception as e:
+                logger.error(f"Dedup stage error: {e}", exc_info=True)
+            finally:
+                self.scraped.task_done()
+
+    def _expire_unrouted(self, now: float) -> None:
+        """Forget unrouted deals whose skip delay is over"""
+        if self._unrouted:
+            self._unrouted = {asin: expiry for asin, expiry in self._unrouted.items() if expiry > now}
+
+    def _route_new(self, deal: Deal, now: float) -> List[Route]:
+        """
+        Get the routes a deal not yet posted must go to
+
+        Args:
+            deal: Deal missing from the cache
+            now: Monotonic time of the chunk
+
+        Returns:
+            Routes whose posting queue does not hold the deal yet (empty to skip it)
+        """
+        if deal.asin in self._unrouted:
+            deal_logger.debug(f"Skipping unrouted deal: {deal.asin}")
+            return []
+        # Deals are posted to all their routes at once, so any posting queue holding it is enough
+        if any(posting.is_pending(deal.asin) for posting in self.posting_queues.values()):
+            deal_logger.debug(f"Skipping deal waiting to be posted: {deal.asin}")
+            return []
+
+        routes = self.router.route(deal)
+        if not routes:
+            self._unrouted[deal.asin] = now + self.unrouted_ttl
+        return routes
+
+    def _check_posted(self, deal: Deal) -> None:
+        """Queue an edit of a posted deal whose price dropped further or that went out of stock"""
+        posted = self.cache.posted.get(deal.asin) if self.edit_min_drop is not None else None
+        if not posted or not posted.messages:
+            deal_logger.debug(f"Skipping cached deal: {deal.asin}")
+            return
+
+        if deal.availability == OUT_OF_STOCK:
+            changed = posted.in_stock
+        else:
+            changed = deal.current_price <= posted.price * (1 - self.edit_min_drop / 100)
+        if changed:
+            if deal.asin not in self._edits:
+                self.edits_queued += 1
+            self._edits[deal.asin] = deal
+
+    def flush_edits(self) -> None:
+        """
+        Apply the edits queued since the last flush, in the background
+
+        If the previous flush is still running, edits keep accumulating
+        and go out with the next one.
+        """
+        if not self._edits or (self._edit_task and not self._edit_task.done()):
+            return
+        edits, self._edits = self._edits, {}
+        self._edit_task = asyncio.create_task(self._apply_edits(edits), name="pipeline-edits")
+
+    async def _apply_edits(self, edits: Dict[str, Deal]) -> None:
+        """Edit every message of each changed deal"""
+        for asin, deal in edits.items():
+            posted = self.cache.posted.get(asin)
+            if not posted:
+                continue
+            try:
+                results = await asyncio.gather(*(
+                    self.posting_queues[route].edit_deal(deal, message_id, posted.price)
+                    for route, message_id in posted.messages.items()
+                    if route in self.posting_queues
+                ))
+                if any(results):
+                    self.edits_applied += 1
+                    in_stock = deal.availability != OUT_OF_STOCK
+                    self.cache.posted.update(asin, deal.current_price if in_stock else posted.price, in_stock)
+
+            except Exception as e:
+                logger.error(f"Failed to edit deal {asin}: {e}", exc_info=True)
+
+    async def _publish_stage(self) -> None:
+        """Move outbox deals to the posting queue of every matching route"""
+        while True:
+            enqueued_at, deal, routes = await self.outbox.get()
+            try:
+                # Backpressure: deals wait in the outbox, not in the posting queues
+                for route in routes:
+                    await self.posting_queues[route.name].wait_for_room(self.posting_backlog)
+                self._outbox_asins.discard(deal.asin)
+                self.publish_stats.observe(enqueued_at)
+
+                for route in routes:
+                    self.posting_queues[route.name].submit(deal)
+
+            except Exception as e:
+                logger.error(f"Publish stage error for {deal.asin}: {e}", exc_info=True)
+                self._outbox_asins.discard(deal.asin)
+            finally:
+                self.outbox.task_done()
+
+    def get_stats(self) -> dict:
+        """Get per-stage pipeline statistics"""
+        return {
+            "produced_chunks": self.chunks_submitted,
+            "new_deals": self.new_deals,
+            "edits": {"queued": self.edits_queued, "applied": self.edits_applied, "pending": len(self._edits)},
+            "dedup": self.dedup_stats.snapshot(self.scraped),
+            "publish": self.publish_stats.snapshot(self.outbox),
+        }
@@ -0,0 +1,487 @@
+"""
+Rate-limit-aware posting queue for Discord
+Posts as fast as Discord's per-route rate-limit headers allow
+"""
+import asyncio
+import logging
+import re
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import aiohttp
+import discord
+
+from metrics import DEALS_POSTED, POST_FAILURES, POST_SECONDS
+from scraper import Deal
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Discord's documented limits for message creation, used until headers are seen
+DEFAULT_ROUTE_LIMIT = 5
+DEFAULT_ROUTE_WINDOW = 5.0
+GLOBAL_LIMIT = 50
+GLOBAL_WINDOW = 1.0
+
+# Discord rejects messages with more embeds than this
+MAX_EMBEDS_PER_MESSAGE = 10
+
+# Top-level resources that get their own rate limit bucket
+_ROUTE_PATTERN = re.compile(r"/(channels|guilds|webhooks)/(\d+)(?:/([\w-]+))?")
+
+
+@dataclass
+class TokenBucket:
+    """Requests left in the current window of one Discord rate limit bucket"""
+    limit: int
+    remaining: int
+    window: float
+    reset_at: float
+
+    def refill(self, now: float) -> None:
+        """Start a new window once the previous one has expired"""
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + self.window
+
+
+class RateLimiter:
+    """
+    Token buckets keyed by route, kept in sync with Discord's headers
+
+    acquire() takes a token before each request and sleeps until the
+    bucket resets when none are left. update() replaces the local guess
+    with X-RateLimit-Limit/Remaining/Reset-After from each response, and
+    429 responses block the route (or every route) for Retry-After seconds.
+    """
+
+    def __init__(self, default_limit: int = DEFAULT_ROUTE_LIMIT, default_window: float = DEFAULT_ROUTE_WINDOW):
+        """
+        Initialize the rate limiter
+
+        Args:
+            default_limit: Requests per window before headers are known
+            default_window: Window length in seconds before headers are known
+        """
+        self.default_limit = default_limit
+        self.default_window = default_window
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._global = TokenBucket(GLOBAL_LIMIT, GLOBAL_LIMIT, GLOBAL_WINDOW, 0.0)
+        self._global_blocked_until = 0.0
+        self.rate_limited = 0
+
+    @staticmethod
+    def route_for(url: str) -> Optional[str]:
+        """
+        Get the rate limit route of a Discord API URL
+
+        Args:
+            url: Request URL
+
+        Returns:
+            Route key such as "channels/123", or None for other URLs
+        """
+        match = _ROUTE_PATTERN.search(url)
+        if not match:
+            return None
+        resource, major, token = match.groups()
+        if resource == 'webhooks' and token:
+            return f"webhooks/{major}/{token}"
+        return f"{resource}/{major}"
+
+    def _bucket(self, route: str) -> TokenBucket:
+        bucket = self._buckets.get(route)
+        if bucket is None:
+            bucket = TokenBucket(self.default_limit, self.default_limit, self.default_window, 0.0)
+            self._buckets[route] = bucket
+        return bucket
+
+    async def acquire(self, route: str) -> None:
+        """
+        Wait until a request on the route is allowed, then take a token
+
+        Args:
+            route: Route key from route_for()
+        """
+        bucket = self._bucket(route)
+        while True:
+            now = time.monotonic()
+            wait = self._global_blocked_until - now
+
+            if wait <= 0:
+                bucket.refill(now)
+                self._global.refill(now)
+                if bucket.remaining > 0 and self._global.remaining > 0:
+                    bucket.remaining -= 1
+                    self._global.remaining -= 1
+                    return
+                wait = min(
+                    bucket.reset_at if bucket.remaining <= 0 else float('inf'),
+                    self._global.reset_at if self._global.remaining <= 0 else float('inf')
+                ) - now
+
+            await asyncio.sleep(max(wait, 0.01))
+
+    def update(self, route: str, headers, status: int = 200) -> None:
+        """
+        Sync a route's bucket with the rate limit headers of a response
+
+        Args:
+            route: Route key from route_for()
+            headers: Response headers
+            status: Response status code
+        """
+        now = time.monotonic()
+
+        if status == 429:
+            retry_after = float(headers.get('Retry-After') or headers.get('X-RateLimit-Reset-After') or 1.0)
+            self.block(route, retry_after, headers.get('X-RateLimit-Global', '').lower() == 'true')
+            return
+
+        if 'X-RateLimit-Remaining' not in headers:
+            return
+
+        try:
+            bucket = self._bucket(route)
+            bucket.limit = int(headers.get('X-RateLimit-Limit', bucket.limit))
+            reset_after = float(headers.get('X-RateLimit-Reset-After', bucket.window))
+            # Headers describe the state after this request; never give back tokens
+            # taken by requests still in flight
+            bucket.remaining = min(bucket.remaining, int(headers['X-RateLimit-Remaining']))
+            bucket.reset_at = now + reset_after
+            bucket.window = max(bucket.window, reset_after)
+        except ValueError as e:
+            logger.debug(f"Ignoring malformed rate limit headers for {route}: {e}")
+
+    def block(self, route: str, retry_after: float, is_global: bool = False) -> None:
+        """
+        Stop requests after a 429 response
+
+        Args:
+            route: Route key that was rate limited
+            retry_after: Seconds to wait before retrying
+            is_global: Whether the limit applies to every route
+        """
+        self.rate_limited += 1
+        until = time.monotonic() + retry_after
+        if is_global:
+            self._global_blocked_until = max(self._global_blocked_until, until)
+        else:
+            bucket = self._bucket(route)
+            bucket.remaining = 0
+            bucket.reset_at = max(bucket.reset_at, until)
+        logger.warning(f"Rate limited on {'all routes' if is_global else route}, retrying in {retry_after:.2f}s")
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """
+        Build an aiohttp trace config that feeds every response into update()
+
+        Pass it as http_trace to the Discord client or as trace_configs to a
+        ClientSession so the buckets follow Discord's headers.
+
+        Returns:
+            aiohttp TraceConfig
+        """
+        trace = aiohttp.TraceConfig()
+
+        async def on_request_end(session, context, params):
+            route = self.route_for(str(params.url))
+            if route:
+                self.update(route, params.response.headers, params.response.status)
+
+        trace.on_request_end.append(on_request_end)
+        return trace
+
+
+class PostingQueue:
+    """
+    Bounded-concurrency queue that posts deals under a RateLimiter
+
+    Workers take a token from the route's bucket before each post, so a
+    burst of deals is posted at the rate Discord allows instead of a fixed
+    delay per message. Posts that hit a rate limit are retried after the
+    Retry-After delay.
+
+    When post_batch is set and burst_threshold deals are waiting, deals
+    below solo_discount are coalesced into multi-embed digest messages,
+    while the best deals keep their own message.
+
+    Edits of posted messages bypass the queue but take tokens from the
+    same route, so they never push posts past the rate limit.
+    """
+
+    def __init__(
+        self,
+        post: Callable[[Deal], Awaitable[Optional[int]]],
+        route: Optional[str],
+        rate_limiter: RateLimiter,
+        concurrency: int = 3,
+        max_retries: int = 3,
+        on_posted: Optional[Callable[[Deal, str, Optional[int]], None]] = None,
+        post_batch: Optional[Callable[[List[Deal]], Awaitable[bool]]] = None,
+        burst_threshold: int = 0,
+        solo_discount: float = 70.0,
+        name: Optional[str] = None,
+        edit: Optional[Callable[[Deal, int, float], Awaitable[bool]]] = None
+    ):
+        """
+        Initialize the posting queue
+
+        Args:
+            post: Coroutine function posting one deal, returns the message ID (None on failure)
+            route: Rate limit route the posts go to (None if post paces itself)
+            rate_limiter: Shared rate limiter
+            concurrency: Maximum posts in flight
+            max_retries: Retries for a rate-limited post before it is dropped
+            on_posted: Called with each posted deal, the queue name and the
+                message ID (None for deals posted in a digest)
+            post_batch: Coroutine function posting several deals in one message
+            burst_threshold: Queue depth that switches to digest messages (0 = never)
+            solo_discount: Discount from which a deal is always posted on its own
+            name: Name of the queue in metrics (defaults to the route)
+            edit: Coroutine function editing a posted deal's message, called
+                with the deal, the message ID and the price shown until now
+        """
+        self.post = post
+        self.route = route
+        self.rate_limiter = rate_limiter
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.on_posted = on_posted
+        self.post_batch = post_batch
+        self.burst_threshold = burst_threshold
+        self.solo_discount = solo_discount
+        self.name = name or route or "default"
+        self.edit = edit
+
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._room = asyncio.Condition()  # Notified whenever a worker takes a deal
+        self._pending: set = set()
+        self._workers = []
+        self._in_flight = 0
+
+        self.posted = 0
+        self.failed = 0
+        self.retried = 0
+        self.digests = 0
+        self.max_depth = 0
+        self.edited = 0
+        self.edit_failed = 0
+
+    @property
+    def depth(self) -> int:
+        """Deals waiting to be posted"""
+        return self._queue.qsize()
+
+    def is_pending(self, asin: str) -> bool:
+        """Whether a deal is waiting or being posted"""
+        return asin in self._pending
+
+    def start(self) -> None:
+        """Start the worker tasks"""
+        if self._workers:
+            return
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"posting-worker-{i}")
+            for i in range(self.concurrency)
+        ]
+
+    def submit(self, deal: Deal) -> bool:
+        """
+        Queue a deal for posting
+
+        Args:
+            deal: Deal to post
+
+        Returns:
+            False if the deal is already waiting or being posted
+        """
+        if deal.asin in self._pending:
+            return False
+        self._pending.add(deal.asin)
+        self._queue.put_nowait((deal, 0))
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+        return True
+
+    async def wait_for_room(self, limit: int) -> None:
+        """
+        Wait until fewer than limit deals are waiting
+
+        Args:
+            limit: Maximum number of waiting deals
+        """
+        async with self._room:
+            await self._room.wait_for(lambda: self._queue.qsize() < limit)
+
+    async def join(self) -> None:
+        """Wait until every queued deal has been handled"""
+        await self._queue.join()
+
+    async def stop(self) -> None:
+        """Cancel the workers, dropping deals still queued"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def _is_solo(self, deal: Deal) -> bool:
+        """Whether a deal must be posted in its own message"""
+        return self.post_batch is None or deal.discount_percent >= self.solo_discount
+
+    def _take_batch(self, first: Deal, attempt: int) -> Tuple[List[Deal], int]:
+        """
+        Coalesce queued deals with first into one digest during a burst
+
+        Solo deals are queued again ahead of the remaining deals so the
+        best deals are not delayed by the digest.
+
+        Args:
+            first: Deal just taken from the queue
+            attempt: Rate-limited attempts of first so far
+
+        Returns:
+            Deals to post together (just first outside of a burst) and the
+            highest attempt count among them, so retries are never reset
+        """
+        if (
+            self._is_solo(first)
+            or not self.burst_threshold
+            or self._queue.qsize() + 1 < self.burst_threshold
+        ):
+            return [first], attempt
+
+        waiting = []
+        while not self._queue.empty():
+            waiting.append(self._queue.get_nowait())
+            self._queue.task_done()
+
+        batch = [first]
+        solo, rest = [], []
+        for item in waiting:
+            deal, deal_attempt = item
+            if self._is_solo(deal):
+                solo.append(item)
+            elif len(batch) < MAX_EMBEDS_PER_MESSAGE:
+                batch.append(deal)
+                attempt = max(attempt, deal_attempt)
+            else:
+                rest.append(item)
+
+        for item in solo + rest:
+            self._queue.put_nowait(item)
+        return batch, attempt
+
+    async def _worker(self) -> None:
+        """Post queued deals, one message at a time per worker"""
+        while True:
+            deal, attempt = await self._queue.get()
+            async with self._room:
+                self._room.notify_all()
+
+            batch = [deal]
+            try:
+                batch, attempt = self._take_batch(deal, attempt)
+                await self._post(batch, attempt)
+            except Exception as e:
+                logger.error(f"Unexpected error posting {len(batch)} deal(s): {e}", exc_info=True)
+                for failed in batch:
+                    self._pending.discard(failed.asin)
+            finally:
+                self._queue.task_done()
+
+    async def _post(self, batch: List[Deal], attempt: int) -> None:
+        """Post one message, requeueing its deals when it was rate limited"""
+        if self.route:
+            await self.rate_limiter.acquire(self.route)
+
+        self._in_flight += 1
+        try:
+            with POST_SECONDS.time(route=self.name), span("posting.post", route=self.name, deals=len(batch)):
+                if len(batch) == 1:
+                    message_id = await self.post(batch[0])
+                    success = bool(message_id)
+                else:
+                    # Digest messages hold several deals and are never edited
+                    message_id = None
+                    success = await self.post_batch(batch)
+        except discord.RateLimited as e:
+            if self.route:
+                self.rate_limiter.block(self.route, e.retry_after)
+            if attempt < self.max_retries:
+                self.retried += 1
+                for deal in batch:
+                    self._queue.put_nowait((deal, attempt + 1))
+                return
+            logger.error(f"Giving up on {len(batch)} deal(s) after {attempt + 1} rate-limited attempts")
+            success = False
+            message_id = None
+        finally:
+            self._in_flight -= 1
+
+        for deal in batch:
+            self._pending.discard(deal.asin)
+        if success:
+            self.posted += len(batch)
+            DEALS_POSTED.inc(len(batch), route=self.name)
+            if len(batch) > 1:
+                self.digests += 1
+            if self.on_posted:
+                for deal in batch:
+                    self.on_posted(deal, self.name, message_id)
+        else:
+            self.failed += len(batch)
+            POST_FAILURES.inc(len(batch), route=self.name)
+
+    async def edit_deal(self, deal: Deal, message_id: int, previous_price: float) -> bool:
+        """
+        Edit the message of a posted deal, waiting out rate limits
+
+        Args:
+            deal: Deal as seen in the latest cycle
+            message_id: ID of the message posted for the deal
+            previous_price: Price shown in the message until now
+
+        Returns:
+            True if the message was edited
+        """
+        if not self.edit:
+            return False
+
+        for attempt in range(self.max_retries + 1):
+            if self.route:
+                await self.rate_limiter.acquire(self.route)
+            try:
+                with span("posting.edit", route=self.name):
+                    success = await self.edit(deal, message_id, previous_price)
+            except discord.RateLimited as e:
+                if self.route:
+                    self.rate_limiter.block(self.route, e.retry_after)
+                else:
+                    await asyncio.sleep(e.retry_after)
+                continue
+
+            if success:
+                self.edited += 1
+            else:
+                self.edit_failed += 1
+            return success
+
+        logger.error(f"Giving up on editing {deal.asin} after {self.max_retries + 1} rate-limited attempts")
+        self.edit_failed += 1
+        return False
+
+    def get_stats(self) -> dict:
+        """Get posting queue statistics"""
+        return {
+            "queue_depth": self.depth,
+            "max_depth": self.max_depth,
+            "in_flight": self._in_flight,
+            "posted": self.posted,
+            "failed": self.failed,
+            "retried": self.retried,
+            "digests": self.digests,
+            "edited": self.edited,
+            "edit_failed": self.edit_failed,
+            "rate_limited": self.rate_limiter.rate_limited,
+        }
@@ -0,0 +1,141 @@
+"""
+Deal routing to several Discord channels and webhooks
+"""
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+from scraper import Deal
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Route:
+    """
+    One destination and the deals it receives
+
+    A route posts either to a channel through the bot (channel_id) or to a
+    webhook (webhook_url). Every criterion must match; a route without
+    criteria receives every deal.
+    """
+    name: str
+    channel_id: Optional[int] = None
+    webhook_url: Optional[str] = None
+    min_discount: float = 0.0
+    max_discount: float = 100.0  # Exclusive below 100, so bands like 50-70 and 70-100 never overlap
+    min_price: float = 0.0
+    max_price: float = 0.0  # 0 = no maximum
+    keywords: List[str] = field(default_factory=list)
+    exclude_keywords: List[str] = field(default_factory=list)
+
+    def __post_init__(self):
+        """Validate the destination and normalize keywords"""
+        if bool(self.channel_id) == bool(self.webhook_url):
+            raise ValueError(f"Route '{self.name}' needs exactly one of channel_id or webhook_url")
+        if self.channel_id:
+            self.channel_id = int(self.channel_id)
+        self.keywords = [k.lower() for k in self.keywords if k]
+        self.exclude_keywords = [k.lower() for k in self.exclude_keywords if k]
+
+    def matches(self, deal: Deal) -> bool:
+        """
+        Check whether a deal should be posted to this route
+
+        Args:
+            deal: Deal to check
+
+        Returns:
+            True if every criterion matches
+        """
+        if deal.discount_percent < self.min_discount:
+            return False
+        if self.max_discount < 100 and deal.discount_percent >= self.max_discount:
+            return False
+        if deal.current_price < self.min_price:
+            return False
+        if self.max_price and deal.current_price > self.max_price:
+            return False
+
+        if self.keywords or self.exclude_keywords:
+            title = deal.title.lower()
+            if self.keywords and not any(k in title for k in self.keywords):
+                return False
+            if any(k in title for k in self.exclude_keywords):
+                return False
+
+        return True
+
+
+class DealRouter:
+    """Dispatches each deal to every route it matches"""
+
+    def __init__(self, routes: Sequence[Route]):
+        """
+        Initialize the router
+
+        Args:
+            routes: Routing table
+        """
+        names = [route.name for route in routes]
+        if len(set(names)) != len(names):
+            raise ValueError("Route names must be unique")
+
+        self.routes = list(routes)
+        self.matched: Dict[str, int] = {route.name: 0 for route in self.routes}
+        self.unrouted = 0
+
+    @classmethod
+    def from_file(cls, path: str) -> 'DealRouter':
+        """
+        Load a routing table from a JSON file
+
+        Args:
+            path: Path to a JSON file with a "routes" list
+
+        Returns:
+            DealRouter instance
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        router = cls([Route(**route) for route in data.get('routes', [])])
+        logger.info(f"Loaded {len(router.routes)} routes from {path}")
+        return router
+
+    @property
+    def channel_ids(self) -> List[int]:
+        """Channels posted to through the bot"""
+        return [route.channel_id for route in self.routes if route.channel_id]
+
+    @property
+    def webhook_urls(self) -> List[str]:
+        """Webhooks posted to directly"""
+        return [route.webhook_url for route in self.routes if route.webhook_url]
+
+    def route(self, deal: Deal) -> List[Route]:
+        """
+        Get the routes a deal must be posted to
+
+        Args:
+            deal: Deal to route
+
+        Returns:
+            Matching routes (empty if the deal goes nowhere)
+        """
+        routes = [route for route in self.routes if route.matches(deal)]
+        for route in routes:
+            self.matched[route.name] += 1
+        if not routes:
+            self.unrouted += 1
+            logger.debug(f"No route for deal {deal.asin} ({deal.discount_percent:.1f}% off)")
+        return routes
+
+    def get_stats(self) -> dict:
+        """Get routing statistics"""
+        return {
+            "routes": len(self.routes),
+            "matched": dict(self.matched),
+            "unrouted": self.unrouted,
+        }
@@ -0,0 +1,180 @@
+"""
+Declarative deal filtering rules evaluated over columnar arrays
+"""
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Row keys produced by the extractors, mapped to column names
+_NUMERIC_COLUMNS = {
+    'current_price': 'currentPrice',
+    'average_price': 'averagePrice',
+    'discount_percent': 'discountPercent',
+}
+_TEXT_COLUMNS = {
+    'asin': 'asin',
+    'title': 'title',
+    'product_url': 'productUrl',
+    'image_url': 'imageUrl',
+}
+
+
+def rows_to_columns(rows: Sequence[Dict]) -> Dict[str, np.ndarray]:
+    """
+    Convert extractor rows into columnar arrays
+
+    Args:
+        rows: Row dicts (asin, title, currentPrice, averagePrice, ...)
+
+    Returns:
+        Dict of column name to array, numeric columns as float64 (0 when missing)
+    """
+    columns = {}
+    for name, key in _NUMERIC_COLUMNS.items():
+        columns[name] = np.array([row.get(key) or 0 for row in rows], dtype=np.float64)
+    for name, key in _TEXT_COLUMNS.items():
+        columns[name] = np.array([row.get(key) or '' for row in rows], dtype=object)
+    return columns
+
+
+def arrays_to_columns(arrays: Dict[str, Sequence]) -> Dict[str, np.ndarray]:
+    """
+    Convert the compact arrays of the DOM extractor into columnar arrays
+
+    The extractor sends one array per field and leaves out what can be
+    derived here: the discount, and product URLs that are the canonical
+    /dp/ link (sent as empty strings).
+
+    Args:
+        arrays: Field name (asin, title, currentPrice, ...) to list of values
+
+    Returns:
+        Dict of column name to array, in the layout of rows_to_columns
+    """
+    asins = arrays.get('asin') or []
+    current = np.array(arrays.get('currentPrice') or [], dtype=np.float64)
+    average = np.array(arrays.get('averagePrice') or [], dtype=np.float64)
+
+    discount = np.zeros(len(asins), dtype=np.float64)
+    priced = (current > 0) & (average > 0)
+    discount[priced] = (average[priced] - current[priced]) / average[priced] * 100
+
+    urls = arrays.get('productUrl') or [''] * len(asins)
+    return {
+        'current_price': current,
+        'average_price': average,
+        'discount_percent': discount,
+        'asin': np.array(asins, dtype=object),
+        'title': np.array(arrays.get('title') or [], dtype=object),
+        'product_url': np.array(
+            [url or f"https://www.amazon.fr/dp/{asin}" for asin, url in zip(asins, urls)],
+            dtype=object
+        ),
+        'image_url': np.array(arrays.get('imageUrl') or [''] * len(asins), dtype=object),
+    }
+
+
+@dataclass
+class DiscountTier:
+    """Minimum discount required for deals priced up to max_price"""
+    max_price: float
+    min_discount: float
+
+
+@dataclass
+class RuleSet:
+    """
+    Filtering rules applied to every deal of a cycle at once
+
+    All rules must pass. Discount tiers are checked in ascending max_price
+    order and replace the base minimum discount for prices in their band.
+    """
+    min_discount: Optional[float] = None  # None = use the scraper's min_discount
+    min_price: float = 0.0
+    max_price: float = 0.0  # 0 = no maximum
+    min_savings: float = 0.0
+    discount_tiers: List[DiscountTier] = field(default_factory=list)
+    include_keywords: List[str] = field(default_factory=list)
+    exclude_keywords: List[str] = field(default_factory=list)
+    blocked_asins: List[str] = field(default_factory=list)
+
+    def __post_init__(self):
+        """Normalize rule values once so evaluation only does array work"""
+        self.discount_tiers = sorted(
+            (t if isinstance(t, DiscountTier) else DiscountTier(**t) for t in self.discount_tiers),
+            key=lambda t: t.max_price
+        )
+        self.include_keywords = [k.lower() for k in self.include_keywords if k]
+        self.exclude_keywords = [k.lower() for k in self.exclude_keywords if k]
+        self._blocked = np.array(sorted({a.upper() for a in self.blocked_asins}), dtype=object)
+
+    @classmethod
+    def from_file(cls, path: str) -> 'RuleSet':
+        """
+        Load rules from a JSON file
+
+        Args:
+            path: Path to the rules JSON file
+
+        Returns:
+            RuleSet instance
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            rules = cls(**json.load(f))
+        logger.info(f"Loaded filtering rules from {path}")
+        return rules
+
+    def evaluate(self, columns: Dict[str, np.ndarray], min_discount: float) -> np.ndarray:
+        """
+        Compute the mask of deals that pass every rule
+
+        Args:
+            columns: Columnar deal data from rows_to_columns
+            min_discount: Base minimum discount when the rules do not set one
+
+        Returns:
+            Boolean mask, one entry per deal
+        """
+        price = columns['current_price']
+        discount = columns['discount_percent']
+
+        # Required discount per deal: base value, replaced by the first matching tier
+        base = self.min_discount if self.min_discount is not None else min_discount
+        required = np.full(len(price), base, dtype=np.float64)
+        assigned = np.zeros(len(price), dtype=bool)
+        for tier in self.discount_tiers:
+            in_tier = ~assigned & (price <= tier.max_price)
+            required[in_tier] = tier.min_discount
+            assigned |= in_tier
+
+        mask = discount >= required
+
+        if self.min_price:
+            mask &= price >= self.min_price
+        if self.max_price:
+            mask &= price <= self.max_price
+        if self.min_savings:
+            mask &= (columns['average_price'] - price) >= self.min_savings
+        if len(self._blocked):
+            mask &= ~np.isin(columns['asin'], self._blocked)
+
+        if (self.include_keywords or self.exclude_keywords) and mask.any():
+            # Only lowercase and scan titles of deals still in the running
+            index = np.flatnonzero(mask)
+            titles = np.char.lower(columns['title'][index].astype(str))
+            keep = np.ones(len(index), dtype=bool)
+            if self.include_keywords:
+                included = np.zeros(len(index), dtype=bool)
+                for keyword in self.include_keywords:
+                    included |= np.char.find(titles, keyword) >= 0
+                keep &= included
+            for keyword in self.exclude_keywords:
+                keep &= np.char.find(titles, keyword) < 0
+            mask[index] = keep
+
+        return mask
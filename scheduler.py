@@ -0,0 +1,178 @@
+"""
+Adaptive scrape scheduler
+Keeps a fixed cycle start cadence and adapts it to deal yield, time of day and errors
+"""
+import logging
+import random
+import time
+from datetime import datetime
+from typing import Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+def parse_hours(value: str) -> Set[int]:
+    """
+    Parse a list of hours such as "1-6,23"
+
+    Args:
+        value: Comma-separated hours or inclusive ranges (ranges may wrap past midnight)
+
+    Returns:
+        Set of hours (0-23)
+    """
+    hours: Set[int] = set()
+    for part in value.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        start, _, end = part.partition('-')
+        start = int(start) % 24
+        end = int(end) % 24 if end else start
+        hour = start
+        hours.add(hour)
+        while hour != end:
+            hour = (hour + 1) % 24
+            hours.add(hour)
+    return hours
+
+
+class AdaptiveScheduler:
+    """
+    Computes when the next scraping cycle should start
+
+    The interval is measured from cycle start to cycle start, so a slow
+    cycle does not push every later cycle back. It shrinks while recent
+    cycles find new deals (price errors tend to cluster), grows during
+    hours that historically yield little and during quiet hours, backs off
+    exponentially after errors and challenge pages, gets random jitter, and
+    always stays within [min_interval, max_interval].
+    """
+
+    def __init__(
+        self,
+        base_interval: float = 300.0,
+        min_interval: float = 60.0,
+        max_interval: float = 1800.0,
+        jitter: float = 0.1,
+        yield_alpha: float = 0.3,
+        yield_target: float = 1.0,
+        quiet_hours: Optional[Set[int]] = None,
+        quiet_factor: float = 3.0,
+        max_backoff_steps: int = 5
+    ):
+        """
+        Initialize the scheduler
+
+        Args:
+            base_interval: Seconds between cycle starts under normal activity
+            min_interval: Shortest allowed interval
+            max_interval: Longest allowed interval
+            jitter: Random variation as a fraction of the interval
+            yield_alpha: Smoothing factor of the new-deal yield average
+            yield_target: New deals per cycle that halve the interval
+            quiet_hours: Local hours scanned less often
+            quiet_factor: Interval multiplier during quiet hours
+            max_backoff_steps: Cap on the number of interval doublings after errors
+        """
+        self.base_interval = base_interval
+        self.min_interval = min(min_interval, max_interval)
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.yield_alpha = yield_alpha
+        self.yield_target = max(yield_target, 0.01)
+        self.quiet_hours = quiet_hours or set()
+        self.quiet_factor = quiet_factor
+        self.max_backoff_steps = max_backoff_steps
+
+        self.yield_ewma = 0.0
+        self._hourly_yield = [0.0] * 24  # Average new deals per cycle for each hour
+        self._hourly_cycles = [0] * 24
+        self._backoff_steps = 0
+
+        self._cycle_started: Optional[float] = None
+        self.interval = base_interval
+
+    def cycle_started(self) -> None:
+        """Mark the start of a scraping cycle"""
+        self._cycle_started = time.monotonic()
+
+    def record(self, new_deals: int, errors: int = 0, challenges: int = 0, now: Optional[datetime] = None) -> float:
+        """
+        Record the outcome of a cycle and compute the next interval
+
+        Args:
+            new_deals: Deals found that were not posted before
+            errors: Failed page scrapes
+            challenges: Challenge or captcha pages met
+            now: Local time of the cycle (defaults to now)
+
+        Returns:
+            Interval to the next cycle start, in seconds
+        """
+        now = now or datetime.now()
+
+        self.yield_ewma += self.yield_alpha * (new_deals - self.yield_ewma)
+        hour = now.hour
+        self._hourly_cycles[hour] += 1
+        # Running mean, switching to a slow moving average once an hour has enough cycles
+        weight = max(1.0 / self._hourly_cycles[hour], 0.05)
+        self._hourly_yield[hour] += weight * (new_deals - self._hourly_yield[hour])
+
+        if challenges:
+            # Challenges mean we are scanning too often, back off twice as fast
+            self._backoff_steps = min(self._backoff_steps + 2, self.max_backoff_steps)
+        elif errors:
+            self._backoff_steps = min(self._backoff_steps + 1, self.max_backoff_steps)
+        else:
+            self._backoff_steps = 0
+
+        self.interval = self._compute_interval(hour)
+        logger.debug(
+            f"Scheduler: yield {self.yield_ewma:.2f}, hour {hour} activity {self._hour_activity(hour):.2f}, "
+            f"backoff {self._backoff_steps}, next interval {self.interval:.0f}s"
+        )
+        return self.interval
+
+    def _hour_activity(self, hour: int) -> float:
+        """Yield of an hour relative to the average hour, between 0.5 and 2"""
+        seen = [y for y, n in zip(self._hourly_yield, self._hourly_cycles) if n]
+        if len(seen) < 12 or not self._hourly_cycles[hour]:
+            # Not enough history to compare hours yet
+            return 1.0
+        mean = sum(seen) / len(seen)
+        if mean <= 0:
+            return 1.0
+        return min(max(self._hourly_yield[hour] / mean, 0.5), 2.0)
+
+    def _compute_interval(self, hour: int) -> float:
+        """Combine yield, time of day, backoff and jitter into an interval"""
+        interval = self.base_interval / (1.0 + self.yield_ewma / self.yield_target)
+        interval /= self._hour_activity(hour)
+        if hour in self.quiet_hours:
+            interval *= self.quiet_factor
+        interval *= 2 ** self._backoff_steps
+
+        if self.jitter:
+            interval *= 1.0 + random.uniform(-self.jitter, self.jitter)
+
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def seconds_until_next(self) -> float:
+        """
+        Get the time until the next cycle should start
+
+        Returns:
+            Seconds to wait (0 if the cycle ran longer than the interval)
+        """
+        if self._cycle_started is None:
+            return 0.0
+        return max(0.0, self._cycle_started + self.interval - time.monotonic())
+
+    def get_stats(self) -> dict:
+        """Get scheduler statistics"""
+        return {
+            "interval": round(self.interval, 1),
+            "yield_ewma": round(self.yield_ewma, 3),
+            "backoff_steps": self._backoff_steps,
+        }
@@ -5,13 +5,27 @@ import asyncio
 import json
 import logging
 import os
+import time
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import AsyncIterator, Callable, List, Dict, Optional, Sequence, Set, Union
 from dataclasses import dataclass
 
+import numpy as np
 from playwright.async_api import async_playwright, Browser, BrowserContext, Page, TimeoutError as PlaywrightTimeout
 
+from capture import DealCapture
+from history import PriceHistory
+from rules import RuleSet, arrays_to_columns, rows_to_columns
+from network import NetworkFilter
+from metrics import (
+    BROWSER_RECOVERIES, BROWSER_RESTARTS, DEALS_EXTRACTED, DEALS_FILTERED,
+    EVALUATE_SECONDS, NAVIGATION_SECONDS, SELECTOR_WAIT_SECONDS
+)
+from tracing import span, traced
+
 logger = logging.getLogger(__name__)
+# Per-deal debug lines, sampled by the logging setup
+deal_logger = logging.getLogger(f"{__name__}.deals")
 
 # Try to import playwright-stealth, but make it optional
 try:
@@ -22,6 +36,40 @@ except ImportError:
     logger.warning("playwright-stealth not available, using native stealth configuration")
 
 
+# Interstitials shown instead of the deals page when the scraper is challenged
+_CHALLENGE_SELECTORS = (
+    '#challenge-form, #challenge-running, #cf-challenge-running, '
+    'iframe[src*="challenges.cloudflare.com"], iframe[src*="captcha"]'
+)
+_CHALLENGE_TITLES = ('just a moment', 'attention required', 'un instant', 'captcha')
+
+
+# Chromium flags and context settings shared by both launch modes
+_LAUNCH_ARGS = [
+    '--disable-blink-features=AutomationControlled',
+    '--disable-dev-shm-usage',
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+]
+_CONTEXT_OPTIONS = {
+    'viewport': {'width': 1920, 'height': 1080},
+    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'locale': 'fr-FR',
+    'timezone_id': 'Europe/Paris',
+}
+
+# Recovery steps, from cheapest to a full Chromium relaunch
+RECOVERY_TIERS = ("reload", "page", "context", "browser")
+
+
+class ChallengeDetected(Exception):
+    """Raised when a challenge or captcha page is served instead of the deals"""
+
+
+# Availability of a posted deal whose row no longer shows a price
+OUT_OF_STOCK = "Out of Stock"
+
+
 @dataclass
 class Deal:
     """Represents a product deal from Keepa"""
@@ -55,108 +103,538 @@ class Deal:
         return f"https://graph.keepa.com/pricehistory.png?asin={self.asin}&domain=4"
 
 
+# Deal row selectors, most specific first - adjust based on actual Keepa DOM
+_DOM_ROW_SELECTOR = 'div.dealRow, tr.dealRow'
+# Last resort for products with neither a row class nor data-asin; also matches cells like div.dealPrice
+_DOM_LOOSE_ROW_SELECTOR = 'div[class*="deal"]'
+
+# Elements that identify a product: ASIN attributes and Amazon or Keepa product links
+_DOM_ANCHOR_SELECTOR = '[data-asin], a[href*="/dp/"], a[href*="/gp/product/"], a[href*="#!product/"]'
+
+# Defines the row helpers shared by the chunked extractor and the live MutationObserver:
+#   __spybotFindRows(scope)  row roots under scope, each once, found from their product anchors
+#   __spybotReadRow(root)    [asin, title, currentPrice, averagePrice, productUrl, imageUrl] or null
+#   __spybotExtractRow(root) the same row as an object, with the discount
+# The ASIN is read from data-asin or a product link href, never by serializing the row's HTML.
+# This is a generic implementation - adjust selectors based on actual Keepa DOM
+_DOM_EXTRACT_ROW_JS = """
+    const ROW_SELECTOR = '""" + _DOM_ROW_SELECTOR + """';
+    const LOOSE_ROW_SELECTOR = '""" + _DOM_LOOSE_ROW_SELECTOR + """';
+    const ANCHOR_SELECTOR = '""" + _DOM_ANCHOR_SELECTOR + """';
+    const ASIN_RE = /^[A-Z0-9]{10}$/;
+    const ASIN_IN_URL_RE = /(?:\\/dp\\/|\\/gp\\/product\\/|#!product\\/\\d+-)([A-Z0-9]{10})/;
+
+    // The row around an anchor: a row class, then data-asin, and only then the loose selector,
+    // which would otherwise stop at a cell (div.dealPrice) inside the row
+    window.__spybotRowOf = (node) =>
+        node.closest(ROW_SELECTOR) || node.closest('[data-asin]') || node.closest(LOOSE_ROW_SELECTOR);
+
+    window.__spybotFindRows = (scope) => {
+        const roots = [];
+        const visited = new Set();
+        const visit = (anchor) => {
+            const root = window.__spybotRowOf(anchor);
+            if (root && !visited.has(root)) {
+                visited.add(root);
+                roots.push(root);
+            }
+        };
+        if (scope.nodeType === 1 && scope.matches(ANCHOR_SELECTOR)) visit(scope);
+        scope.querySelectorAll(ANCHOR_SELECTOR).forEach(visit);
+        return roots;
+    };
+
+    window.__spybotAsinOf = (root) => {
+        const tagged = root.hasAttribute('data-asin') ? root : root.querySelector('[data-asin]');
+        const value = tagged ? tagged.getAttribute('data-asin') : null;
+        if (value && ASIN_RE.test(value)) return value;
+
+        for (const link of root.querySelectorAll('a[href]')) {
+            const match = link.href.match(ASIN_IN_URL_RE);
+            if (match) return match[1];
+        }
+        return null;
+    };
+
+    window.__spybotReadRow = (root, asin) => {
+        asin = asin || window.__spybotAsinOf(root);
+        if (!asin) return null;
+
+        // Extract title
+        const titleElement = root.querySelector('a[href*="amazon"], .productTitle, .title, h3, h4');
+        const title = titleElement ? titleElement.textContent.trim() : '';
+        if (!title) return null;
+
+        // First two parsable prices are the current and average price
+        let currentPrice = 0;
+        let averagePrice = 0;
+        for (const priceEl of root.querySelectorAll('[class*="price"], .priceValue, span[class*="Price"]')) {
+            const price = parseFloat(priceEl.textContent.replace(/[^0-9.,]/g, '').replace(',', '.'));
+            if (isNaN(price)) continue;
+            if (currentPrice === 0) {
+                currentPrice = price;
+            } else if (averagePrice === 0) {
+                averagePrice = price;
+                break;
+            }
+        }
+
+        const imgElement = root.querySelector('img');
+        const linkElement = root.querySelector('a[href*="amazon"]');
+        return [
+            asin,
+            title,
+            currentPrice,
+            averagePrice,
+            linkElement ? linkElement.href : '',
+            imgElement ? imgElement.src : ''
+        ];
+    };
+
+    window.__spybotExtractRow = (root) => {
+        const row = window.__spybotReadRow(root);
+        if (!row) return null;
+        const [asin, title, currentPrice, averagePrice, productUrl, imageUrl] = row;
+
+        // Calculate discount if we have both prices
+        let discountPercent = 0;
+        if (averagePrice > 0 && currentPrice > 0) {
+            discountPercent = ((averagePrice - currentPrice) / averagePrice) * 100;
+        }
+        return {
+            asin,
+            title,
+            currentPrice,
+            averagePrice,
+            discountPercent,
+            productUrl: productUrl || `https://www.amazon.fr/dp/${asin}`,
+            imageUrl
+        };
+    };
+
+    // Rows [start, end) of the collected rows as one array per field. The
+    // discount and canonical /dp/ links are left out, Python derives them.
+    window.__spybotExtractRange = (start, end) => {
+        const columns = { asin: [], title: [], currentPrice: [], averagePrice: [], productUrl: [], imageUrl: [] };
+        for (const [root, asin] of window.__spybotRows.slice(start, end)) {
+            try {
+                const row = window.__spybotReadRow(root, asin);
+                if (!row) continue;
+                columns.asin.push(asin);
+                columns.title.push(row[1]);
+                columns.currentPrice.push(row[2]);
+                columns.averagePrice.push(row[3]);
+                columns.productUrl.push(row[4] === `https://www.amazon.fr/dp/${asin}` ? '' : row[4]);
+                columns.imageUrl.push(row[5]);
+            } catch (err) {
+                console.error('Error extracting deal:', err);
+            }
+        }
+        return columns;
+    };
+"""
+
+# Installs the row helpers in the page and collects the row roots, once per
+# ASIN. Rows are then read in index ranges so Python can start on the first
+# chunk while later rows are still being evaluated.
+_DOM_COLLECT_SCRIPT = """
+    () => {
+""" + _DOM_EXTRACT_ROW_JS + """
+        const rows = [];
+        const seen = new Set();
+        for (const root of window.__spybotFindRows(document)) {
+            const asin = window.__spybotAsinOf(root);
+            if (!asin || seen.has(asin)) continue;
+            seen.add(asin);
+            rows.push([root, asin]);
+        }
+        window.__spybotRows = rows;
+        return rows.length;
+    }
+"""
+
+# Extracts rows [start, end) collected by _DOM_COLLECT_SCRIPT, as compact arrays
+_DOM_EXTRACT_RANGE_SCRIPT = """
+    ([start, end]) => window.__spybotExtractRange(start, end)
+"""
+
+# Init script for live mode: watches the document for new or changed deal rows
+# and pushes them to Python through the exposed __spybotPush binding.
+# Mutations are batched for 250ms so a table re-render is one push.
+_LIVE_OBSERVER_SCRIPT = """
+(() => {
+""" + _DOM_EXTRACT_ROW_JS + """
+    const pending = new Set();
+    let timer = null;
+
+    const flush = () => {
+        timer = null;
+
+        // Resolve changed nodes to row roots, each row once
+        const roots = new Set();
+        pending.forEach(node => {
+            if (!node.isConnected) return;
+            // Rows inside the node (inserted rows or a re-rendered container)
+            window.__spybotFindRows(node).forEach(root => roots.add(root));
+            // The row around the node (a cell changed), unless that is a container
+            const row = window.__spybotRowOf(node);
+            if (row && !roots.has(row) && window.__spybotFindRows(row)[0] === row) roots.add(row);
+        });
+        pending.clear();
+
+        const rows = [];
+        const seen = new Set();
+        roots.forEach(root => {
+            try {
+                const row = window.__spybotExtractRow(root);
+                if (row && !seen.has(row.asin)) {
+                    seen.add(row.asin);
+                    rows.push(row);
+                }
+            } catch (err) {
+                console.error('Error extracting deal:', err);
+            }
+        });
+        if (rows.length && window.__spybotPush) window.__spybotPush(rows);
+    };
+
+    const schedule = node => {
+        pending.add(node);
+        if (!timer) timer = setTimeout(flush, 250);
+    };
+
+    const observer = new MutationObserver(mutations => {
+        for (const mutation of mutations) {
+            if (mutation.type === 'childList') {
+                // New rows, or new content inside a row
+                mutation.addedNodes.forEach(node => {
+                    const element = node.nodeType === 1 ? node : node.parentElement;
+                    if (element) schedule(element);
+                });
+            } else if (mutation.target.parentElement) {
+                // Text changed inside an existing row
+                schedule(mutation.target.parentElement);
+            }
+        }
+    });
+
+    observer.observe(document.documentElement, { childList: true, subtree: true, characterData: true });
+})();
+"""
+
+
+@dataclass
+class DealSource:
+    """A Keepa deals URL watched by the scraper, with its own page"""
+    url: str
+    interval: Optional[float] = None  # Seconds between scans, None = every cycle
+    next_due: float = 0.0
+    page: Optional[Page] = None
+    context: Optional[BrowserContext] = None
+    capture: Optional[DealCapture] = None
+    live_installed: bool = False
+    last_activity: float = 0.0  # Monotonic time of the last live push or reload
+
+    def is_due(self, now: float, full_cycle: bool = True) -> bool:
+        """
+        Check if the source should be scraped at the given monotonic time
+
+        Args:
+            now: Monotonic time
+            full_cycle: Whether this is a scheduler cycle, the only time
+                sources without their own interval are scraped
+        """
+        if self.interval is None:
+            return full_cycle
+        return now >= self.next_due
+
+
 class KeepaScraperEngine:
     """
-    Asynchronous web scraper for Keepa deals page
+    Asynchronous web scraper for Keepa deals pages
+
+    Several deal URLs can be watched from a single Chromium process. Each URL
+    gets its own page, spread over a bounded pool of browser contexts.
     """
 
     def __init__(
         self,
-        keepa_url: str,
+        keepa_url: Union[str, Sequence[str]],
         headless: bool = True,
         use_cookies: bool = False,
-        cookies_file: str = "cookies.json"
+        cookies_file: str = "cookies.json",
+        network_filter: Optional[NetworkFilter] = None,
+        extraction_mode: str = "dom",
+        url_intervals: Optional[Dict[str, float]] = None,
+        max_contexts: int = 2,
+        max_concurrency: int = 2,
+        price_history: Optional[PriceHistory] = None,
+        history_min_observations: int = 5,
+        rules: Optional[RuleSet] = None,
+        profile_dir: Optional[str] = None,
+        save_cookies: bool = True,
+        is_posted: Optional[Callable[[str], bool]] = None
     ):
         """
         Initialize the scraper engine
 
         Args:
-            keepa_url: URL to Keepa deals page
+            keepa_url: URL (or list of URLs) of Keepa deals pages
             headless: Run browser in headless mode
             use_cookies: Whether to load cookies from file
             cookies_file: Path to cookies JSON file
+            network_filter: Optional request filter to block unneeded resources
+            extraction_mode: "dom" to scrape the page, "network" to decode Keepa's
+                XHR/WebSocket payloads (falls back to the DOM when nothing is captured)
+            url_intervals: Optional per-URL scan interval in seconds
+            max_contexts: Maximum number of browser contexts shared by the pages
+            max_concurrency: Maximum number of pages scraped at the same time
+            price_history: Optional local price history; every observed price is
+                recorded and deals are cross-checked against it
+            history_min_observations: Observations required before history can reject a deal
+            rules: Filtering rules (defaults to the min_discount threshold only)
+            profile_dir: Optional persistent browser profile directory; keeps the disk
+                cache and cookies across restarts (uses a single context)
+            save_cookies: Write cookies refreshed during the session back to
+                cookies_file (when use_cookies is enabled)
+            is_posted: Optional check for ASINs already posted; their rows without
+                a price are kept as out-of-stock deals instead of being filtered, and
+                the price history never rejects them
         """
-        self.keepa_url = keepa_url
+        urls = [keepa_url] if isinstance(keepa_url, str) else list(keepa_url)
+        if not urls:
+            raise ValueError("At least one Keepa URL is required")
+
+        url_intervals = url_intervals or {}
+        self.sources: List[DealSource] = [
+            DealSource(url=url, interval=url_intervals.get(url)) for url in urls
+        ]
+
+        self.keepa_url = urls[0]
         self.headless = headless
         self.use_cookies = use_cookies
         self.cookies_file = cookies_file
+        self.network_filter = network_filter
+        self.extraction_mode = extraction_mode
+        self.profile_dir = profile_dir
+        self.save_cookies = save_cookies
+        self.is_posted = is_posted
+        # A persistent profile can only be opened by one context
+        self.max_contexts = 1 if profile_dir else max(1, min(max_contexts, len(self.sources)))
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        self.price_history = price_history
+        self.history_min_observations = history_min_observations
+        self.rules = rules or RuleSet()
+        self.cycle_stats: Dict[str, int] = {}  # Outcome of the last scrape_deals_stream cycle
+        self.recovery_stats: Dict[str, Dict[str, float]] = {
+            tier: {"attempts": 0, "successes": 0, "total_seconds": 0.0, "last_seconds": 0.0}
+            for tier in RECOVERY_TIERS
+        }
 
         self.playwright = None
         self.browser: Optional[Browser] = None
-        self.context: Optional[BrowserContext] = None
-        self.page: Optional[Page] = None
+        self._persistent_closed = False
+        self._saved_cookies: Optional[Set[tuple]] = None
+        self.contexts: List[BrowserContext] = []
+
+        # Read by the page bindings on every push, so a new live stream takes over pages installed by an older one
+        self._live_queue: Optional[asyncio.Queue] = None
+        self._live_min_discount = 40.0
+
+    @property
+    def context(self) -> Optional[BrowserContext]:
+        """Browser context of the first source"""
+        return self.sources[0].context
+
+    @property
+    def page(self) -> Optional[Page]:
+        """Page of the first source"""
+        return self.sources[0].page
+
+    @property
+    def capture(self) -> Optional[DealCapture]:
+        """Network capture of the first source"""
+        return self.sources[0].capture
 
     async def initialize(self) -> None:
-        """Initialize Playwright browser and context"""
+        """Initialize Playwright browser, the context pool and one page per source"""
         try:
             logger.info("Initializing Playwright browser...")
             self.playwright = await async_playwright().start()
 
-            # Launch browser with stealth configuration
-            self.browser = await self.playwright.chromium.launch(
-                headless=self.headless,
-                args=[
-                    '--disable-blink-features=AutomationControlled',
-                    '--disable-dev-shm-usage',
-                    '--no-sandbox',
-                    '--disable-setuid-sandbox',
-                ]
-            )
-
-            # Create context with realistic user agent
-            self.context = await self.browser.new_context(
-                viewport={'width': 1920, 'height': 1080},
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                locale='fr-FR',
-                timezone_id='Europe/Paris'
-            )
-
-            # Load cookies if enabled
-            if self.use_cookies and os.path.exists(self.cookies_file):
-                await self._load_cookies()
+            if self.profile_dir:
+                self.contexts.append(await self._launch_persistent_context())
+            else:
+                # Launch browser with stealth configuration
+                self.browser = await self.playwright.chromium.launch(
+                    headless=self.headless,
+                    args=_LAUNCH_ARGS
+                )
 
-            # Create page and apply stealth
-            self.page = await self.context.new_page()
+                for _ in range(self.max_contexts):
+                    self.contexts.append(await self._create_context())
 
-            # Apply stealth if available
-            if STEALTH_AVAILABLE:
-                await stealth_async(self.page)
-                logger.info("Applied playwright-stealth")
-            else:
-                # Use native stealth techniques
-                await self.page.add_init_script("""
-                    Object.defineProperty(navigator, 'webdriver', {
-                        get: () => undefined
-                    });
-                """)
-                logger.info("Applied native stealth configuration")
+            # Spread the pages over the context pool
+            for index, source in enumerate(self.sources):
+                source.context = self.contexts[index % len(self.contexts)]
+                await self._create_page(source)
 
-            logger.info("Browser initialized successfully")
+            logger.info(
+                f"Browser initialized successfully ({len(self.sources)} pages, "
+                f"{len(self.contexts)} contexts)"
+            )
 
         except Exception as e:
             logger.error(f"Failed to initialize browser: {e}")
             await self.cleanup()
             raise
 
-    async def _load_cookies(self) -> None:
-        """Load cookies from JSON file"""
+    async def _create_context(self) -> BrowserContext:
+        """Create a browser context with realistic settings, filter and cookies"""
+        # Create context with realistic user agent
+        context = await self.browser.new_context(**_CONTEXT_OPTIONS)
+        await self._setup_context(context)
+        return context
+
+    async def _launch_persistent_context(self) -> BrowserContext:
+        """Launch Chromium on the persistent profile, warm with its disk cache and cookies"""
+        Path(self.profile_dir).mkdir(parents=True, exist_ok=True)
+        context = await self.playwright.chromium.launch_persistent_context(
+            self.profile_dir,
+            headless=self.headless,
+            args=_LAUNCH_ARGS,
+            **_CONTEXT_OPTIONS
+        )
+
+        # A persistent context has no Browser object to ask whether it is still alive
+        self._persistent_closed = False
+        context.on("close", lambda _: setattr(self, "_persistent_closed", True))
+
+        await self._setup_context(context)
+        logger.info(f"Using persistent browser profile {self.profile_dir}")
+        return context
+
+    async def _setup_context(self, context: BrowserContext) -> None:
+        """Apply the network filter and cookies to a new context"""
+        # Block images, fonts and trackers the extractor never reads
+        if self.network_filter:
+            await self.network_filter.attach(context)
+
+        # Load cookies if enabled
+        if self.use_cookies and os.path.exists(self.cookies_file):
+            await self._load_cookies(context)
+
+    async def _create_page(self, source: DealSource) -> None:
+        """Create the page of a source and apply stealth"""
+        source.page = await source.context.new_page()
+
+        # Listen for deal payloads before the first navigation
+        if self.extraction_mode == "network":
+            source.capture = DealCapture()
+            source.capture.attach(source.page)
+
+        # Apply stealth if available
+        if STEALTH_AVAILABLE:
+            await stealth_async(source.page)
+            logger.debug("Applied playwright-stealth")
+        else:
+            # Use native stealth techniques
+            await source.page.add_init_script("""
+                Object.defineProperty(navigator, 'webdriver', {
+                    get: () => undefined
+                });
+            """)
+            logger.debug("Applied native stealth configuration")
+
+    async def _load_cookies(self, context: BrowserContext) -> None:
+        """Load cookies from JSON file into a context"""
         try:
             cookies_path = Path(self.cookies_file)
             if cookies_path.exists():
                 with open(cookies_path, 'r', encoding='utf-8') as f:
                     cookies = json.load(f)
-                    await self.context.add_cookies(cookies)
+                    await context.add_cookies(cookies)
+                    self._saved_cookies = self._cookie_state(cookies)
                     logger.info(f"Loaded {len(cookies)} cookies from {self.cookies_file}")
             else:
                 logger.warning(f"Cookies file not found: {self.cookies_file}")
         except Exception as e:
             logger.error(f"Failed to load cookies: {e}")
 
-    async def navigate_to_deals(self) -> None:
-        """Navigate to Keepa deals page and wait for content"""
+    @staticmethod
+    def _cookie_state(cookies: List[Dict]) -> Set[tuple]:
+        """Identity and value of each cookie, to detect refreshed cookies"""
+        return {(c.get('name'), c.get('domain'), c.get('path'), c.get('value')) for c in cookies}
+
+    async def persist_cookies(self) -> bool:
+        """
+        Write the session cookies back to the cookies file when they changed
+
+        Cloudflare refreshes its clearance cookie during a session; saving it
+        lets the next start skip the challenge. The file is replaced
+        atomically so a crash never leaves it half written.
+
+        Returns:
+            True if the file was written
+        """
+        if not (self.use_cookies and self.save_cookies) or not self._is_connected():
+            return False
+
         try:
-            logger.info(f"Navigating to {self.keepa_url}")
-            await self.page.goto(self.keepa_url, wait_until='networkidle', timeout=30000)
+            cookies = await self.contexts[0].cookies()
+            state = self._cookie_state(cookies)
+            if not cookies or state == self._saved_cookies:
+                return False
+
+            tmp_path = f"{self.cookies_file}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(cookies, f, indent=2)
+            os.replace(tmp_path, self.cookies_file)
+
+            self._saved_cookies = state
+            logger.info(f"Saved {len(cookies)} refreshed cookies to {self.cookies_file}")
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to save cookies: {e}")
+            return False
+
+    def _is_connected(self) -> bool:
+        """Whether the browser process is still usable"""
+        if self.profile_dir:
+            return bool(self.contexts) and not self._persistent_closed
+        return self.browser is not None and self.browser.is_connected()
+
+    @traced("scraper.navigate")
+    async def navigate_to_deals(self, source: Optional[DealSource] = None) -> None:
+        """
+        Navigate to a Keepa deals page and wait for content
+
+        Args:
+            source: Source to navigate (defaults to the first URL)
+        """
+        source = source or self.sources[0]
+        page = source.page
+
+        try:
+            logger.info(f"Navigating to {source.url}")
+
+            if source.capture:
+                # Deal data arrives over XHR/WebSocket, no need to wait for network idle
+                source.capture.reset()
+                with NAVIGATION_SECONDS.time():
+                    await page.goto(source.url, wait_until='domcontentloaded', timeout=30000)
+
+                with SELECTOR_WAIT_SECONDS.time():
+                    captured = await source.capture.wait(timeout=20)
+                if captured:
+                    logger.info(f"Deals captured from network ({len(source.capture.rows)} rows)")
+                    return
+
+                logger.warning("No deal payload captured, falling back to DOM extraction")
+            else:
+                with NAVIGATION_SECONDS.time():
+                    await page.goto(source.url, wait_until='networkidle', timeout=30000)
 
             # Wait for the deals table to load
             # Try multiple selectors in case the page structure varies
@@ -169,132 +647,207 @@ class KeepaScraperEngine:
             ]
 
             loaded = False
-            for selector in selectors_to_try:
-                try:
-                    await self.page.wait_for_selector(selector, timeout=10000)
-                    logger.info(f"Deals loaded (selector: {selector})")
-                    loaded = True
-                    break
-                except PlaywrightTimeout:
-                    continue
+            with SELECTOR_WAIT_SECONDS.time():
+                for selector in selectors_to_try:
+                    try:
+                        await page.wait_for_selector(selector, timeout=10000)
+                        logger.info(f"Deals loaded (selector: {selector})")
+                        loaded = True
+                        break
+                    except PlaywrightTimeout:
+                        continue
 
             if not loaded:
+                if await self._is_challenge_page(page):
+                    raise ChallengeDetected(f"Challenge page served for {source.url}")
                 logger.warning("Could not find standard deal selectors, page may still be loading")
                 await asyncio.sleep(5)  # Give extra time for dynamic content
 
         except PlaywrightTimeout:
-            logger.error("Timeout while loading Keepa deals page")
+            logger.error(f"Timeout while loading Keepa deals page {source.url}")
+            raise
+        except ChallengeDetected as e:
+            logger.warning(str(e))
             raise
         except Exception as e:
             logger.error(f"Navigation error: {e}")
             raise
 
-    async def extract_deals(self, min_discount: float = 40.0) -> List[Deal]:
+    @staticmethod
+    async def _is_challenge_page(page: Page) -> bool:
+        """Check whether the page is a challenge or captcha interstitial"""
+        try:
+            title = (await page.title()).lower()
+            if any(marker in title for marker in _CHALLENGE_TITLES):
+                return True
+            return await page.query_selector(_CHALLENGE_SELECTORS) is not None
+        except Exception as e:
+            logger.debug(f"Challenge check failed: {e}")
+            return False
+
+    def _check_history(self, columns: Dict[str, np.ndarray], mask: np.ndarray) -> np.ndarray:
+        """
+        Record every observed price and reject deals our own history contradicts
+
+        Args:
+            columns: Columnar deal data
+            mask: Deals that passed the filtering rules
+
+        Returns:
+            Updated mask without the rejected deals
+        """
+        asins = columns['asin']
+        prices = columns['current_price']
+        discounts = columns['discount_percent']
+
+        # Score only the candidates, against history recorded before this observation
+        candidates = np.flatnonzero(mask)
+        candidate_asins = asins[candidates].tolist()
+        scores = self.price_history.score(candidate_asins, prices[candidates])
+        self.price_history.record(asins.tolist(), prices)
+
+        confirmed = scores.confirms(discounts[candidates], self.history_min_observations)
+        if self.is_posted is not None:
+            # Our median has caught up with the posted price, so a further drop on a
+            # posted deal looks small against it: it was confirmed when first posted
+            confirmed |= np.fromiter(map(self.is_posted, candidate_asins), dtype=bool, count=len(candidate_asins))
+        for j in np.flatnonzero(~confirmed):
+            logger.info(
+                f"History rejects {candidate_asins[j]}: Keepa reports {discounts[candidates[j]]:.1f}% off, "
+                f"{scores.drop_percent[j]:.1f}% below our median of {scores.observations[j]} observations"
+            )
+        for j in np.flatnonzero(scores.all_time_low):
+            deal_logger.debug(f"All-time low in local history: {candidate_asins[j]}")
+
+        mask = mask.copy()
+        mask[candidates] = confirmed
+        return mask
+
+    @traced("scraper.build_deals")
+    def _build_deals(self, deals_data: Union[List[Dict], Dict[str, List]], min_discount: float) -> List[Deal]:
         """
-        Extract deal data from the current page
+        Filter raw rows with the rule engine and convert the survivors into Deal objects
+
+        Rules are evaluated over the whole batch as columnar arrays, so Deal
+        objects are only built for rows that pass.
 
         Args:
+            deals_data: Row dicts from the network extractor or live observer,
+                or compact arrays from the DOM extractor
             min_discount: Minimum discount percentage to filter deals
 
         Returns:
             List of Deal objects
         """
-        try:
+        if isinstance(deals_data, dict):
+            columns = arrays_to_columns(deals_data)
+        else:
+            columns = rows_to_columns(deals_data)
+        if not len(columns['asin']):
+            return []
+        DEALS_EXTRACTED.inc(len(columns['asin']))
+
+        mask = self.rules.evaluate(columns, min_discount)
+        if self.price_history is not None:
+            mask = self._check_history(columns, mask)
+
+        # Posted deals that lost their price are kept, so their message can be marked out of stock
+        out_of_stock = np.zeros_like(mask)
+        if self.is_posted is not None:
+            for i in np.flatnonzero(~mask & (columns['current_price'] <= 0)):
+                out_of_stock[i] = self.is_posted(columns['asin'][i])
+            mask = mask | out_of_stock
+
+        deals = []
+        for i in np.flatnonzero(mask):
+            try:
+                deal = Deal(
+                    asin=columns['asin'][i],
+                    title=columns['title'][i][:200],  # Truncate long titles
+                    current_price=float(columns['current_price'][i]),
+                    average_price=float(columns['average_price'][i]),
+                    discount_percent=float(columns['discount_percent'][i]),
+                    product_url=columns['product_url'][i],
+                    image_url=columns['image_url'][i]
+                )
+                if out_of_stock[i]:
+                    deal.availability = OUT_OF_STOCK
+                deals.append(deal)
+                deal_logger.debug(f"Found deal: {deal.asin} - {deal.discount_percent:.1f}% off")
+
+            except Exception as e:
+                logger.warning(f"Failed to create Deal object: {e}")
+                continue
+
+        DEALS_FILTERED.inc(len(deals))
+        return deals
+
+    async def extract_deals_stream(
+        self,
+        min_discount: float = 40.0,
+        source: Optional[DealSource] = None,
+        chunk_size: int = 25
+    ) -> AsyncIterator[List[Deal]]:
+        """
+        Extract deal data from the current page of a source, chunk by chunk
+
+        In network mode, deals captured from XHR/WebSocket payloads are used
+        when available; otherwise the DOM rows are evaluated in index ranges
+        of chunk_size so each chunk can be consumed before the next is read.
+
+        Args:
+            min_discount: Minimum discount percentage to filter deals
+            source: Source to extract from (defaults to the first URL)
+            chunk_size: Number of rows evaluated per chunk
+
+        Yields:
+            Non-empty lists of Deal objects
+        """
+        source = source or self.sources[0]
+        total = 0
+
+        if source.capture and source.capture.rows:
+            logger.info("Extracting deals from captured network payloads...")
+            rows = source.capture.rows
+            for start in range(0, len(rows), chunk_size):
+                deals = self._build_deals(rows[start:start + chunk_size], min_discount)
+                if deals:
+                    total += len(deals)
+                    yield deals
+        else:
             logger.info("Extracting deals from page...")
+            with EVALUATE_SECONDS.time(), span("scraper.evaluate", stage="collect"):
+                row_count = await source.page.evaluate(_DOM_COLLECT_SCRIPT)
+            logger.debug(f"Found {row_count} unique deal rows")
 
-            # Execute JavaScript to extract deal data from the DOM
-            # This is a generic implementation - adjust selectors based on actual Keepa DOM
-            deals_data = await self.page.evaluate("""
-                () => {
-                    const deals = [];
-
-                    // Try to find deal rows - adjust selectors based on actual DOM
-                    const dealElements = document.querySelectorAll('div.dealRow, tr.dealRow, div[class*="deal"]');
-
-                    dealElements.forEach(element => {
-                        try {
-                            // Extract ASIN (usually in data attributes or links)
-                            const asinMatch = element.innerHTML.match(/([A-Z0-9]{10})/);
-                            const asin = asinMatch ? asinMatch[1] : null;
-
-                            // Extract title
-                            const titleElement = element.querySelector('a[href*="amazon"], .productTitle, .title, h3, h4');
-                            const title = titleElement ? titleElement.textContent.trim() : '';
-
-                            // Extract prices (look for price elements)
-                            const priceElements = element.querySelectorAll('[class*="price"], .priceValue, span[class*="Price"]');
-                            let currentPrice = 0;
-                            let averagePrice = 0;
-
-                            // Try to parse prices from text
-                            priceElements.forEach(priceEl => {
-                                const priceText = priceEl.textContent.replace(/[^0-9.,]/g, '').replace(',', '.');
-                                const price = parseFloat(priceText);
-                                if (!isNaN(price)) {
-                                    if (currentPrice === 0) currentPrice = price;
-                                    else if (averagePrice === 0) averagePrice = price;
-                                }
-                            });
-
-                            // Extract image URL
-                            const imgElement = element.querySelector('img');
-                            const imageUrl = imgElement ? imgElement.src : '';
-
-                            // Extract product URL
-                            const linkElement = element.querySelector('a[href*="amazon"]');
-                            const productUrl = linkElement ? linkElement.href : `https://www.amazon.fr/dp/${asin}`;
-
-                            // Calculate discount if we have both prices
-                            let discountPercent = 0;
-                            if (averagePrice > 0 && currentPrice > 0) {
-                                discountPercent = ((averagePrice - currentPrice) / averagePrice) * 100;
-                            }
-
-                            if (asin && title) {
-                                deals.push({
-                                    asin,
-                                    title,
-                                    currentPrice,
-                                    averagePrice,
-                                    discountPercent,
-                                    productUrl,
-                                    imageUrl
-                                });
-                            }
-                        } catch (err) {
-                            console.error('Error extracting deal:', err);
-                        }
-                    });
-
-                    return deals;
-                }
-            """)
+            for start in range(0, row_count, chunk_size):
+                with EVALUATE_SECONDS.time(), span("scraper.evaluate", stage="range", start=start):
+                    rows = await source.page.evaluate(_DOM_EXTRACT_RANGE_SCRIPT, [start, start + chunk_size])
+                deals = self._build_deals(rows, min_discount)
+                if deals:
+                    total += len(deals)
+                    yield deals
 
-            # Convert to Deal objects and filter
-            deals = []
-            for data in deals_data:
-                try:
-                    deal = Deal(
-                        asin=data['asin'],
-                        title=data['title'][:200],  # Truncate long titles
-                        current_price=data['currentPrice'],
-                        average_price=data['averagePrice'],
-                        discount_percent=data['discountPercent'],
-                        product_url=data['productUrl'],
-                        image_url=data['imageUrl']
-                    )
+        logger.info(f"Extracted {total} deals (filtered by {min_discount}% discount)")
 
-                    # Filter by minimum discount
-                    if deal.discount_percent >= min_discount:
-                        deals.append(deal)
-                        logger.debug(f"Found deal: {deal.asin} - {deal.discount_percent:.1f}% off")
+    @traced("scraper.extract")
+    async def extract_deals(self, min_discount: float = 40.0, source: Optional[DealSource] = None) -> List[Deal]:
+        """
+        Extract deal data from the current page of a source
 
-                except Exception as e:
-                    logger.warning(f"Failed to create Deal object: {e}")
-                    continue
+        Args:
+            min_discount: Minimum discount percentage to filter deals
+            source: Source to extract from (defaults to the first URL)
 
-            logger.info(f"Extracted {len(deals)} deals (filtered by {min_discount}% discount)")
-            return deals
+        Returns:
+            List of Deal objects
+        """
+        try:
+            return [
+                deal
+                async for chunk in self.extract_deals_stream(min_discount, source)
+                for deal in chunk
+            ]
 
         except Exception as e:
             logger.error(f"Failed to extract deals: {e}")
@@ -302,11 +855,13 @@ class KeepaScraperEngine:
 
     async def cleanup(self) -> None:
         """Close browser and cleanup resources"""
+        await self.persist_cookies()
         try:
-            if self.page:
-                await self.page.close()
-            if self.context:
-                await self.context.close()
+            for source in self.sources:
+                if source.page:
+                    await source.page.close()
+            for context in self.contexts:
+                await context.close()
             if self.browser:
                 await self.browser.close()
             if self.playwright:
@@ -314,17 +869,265 @@ class KeepaScraperEngine:
             logger.info("Browser cleanup completed")
         except Exception as e:
             logger.error(f"Error during cleanup: {e}")
+        finally:
+            for source in self.sources:
+                source.page = None
+                source.context = None
+                source.capture = None
+                source.live_installed = False
+            self.contexts = []
+            self.browser = None
+            self.playwright = None
 
     async def restart(self) -> None:
         """Restart the browser (useful for recovery from crashes)"""
         logger.info("Restarting browser...")
+        BROWSER_RESTARTS.inc()
         await self.cleanup()
         await asyncio.sleep(2)
         await self.initialize()
 
+    async def _probe(self, source: DealSource) -> bool:
+        """Health probe: the browser is connected and the page answers a script"""
+        if not self._is_connected():
+            return False
+        if not source.page or source.page.is_closed():
+            return False
+        try:
+            await asyncio.wait_for(source.page.evaluate("document.readyState"), timeout=5)
+            return True
+        except Exception as e:
+            logger.debug(f"Health probe failed for {source.url}: {e}")
+            return False
+
+    async def _recover_reload(self, sources: Sequence[DealSource]) -> None:
+        """Tier 1: reload the pages in place"""
+        for source in sources:
+            await source.page.reload(wait_until='domcontentloaded', timeout=15000)
+
+    async def _recover_page(self, sources: Sequence[DealSource]) -> None:
+        """Tier 2: replace the pages, keeping their contexts"""
+        for source in sources:
+            if source.page:
+                try:
+                    await source.page.close()
+                except Exception:
+                    pass
+            source.capture = None
+            source.live_installed = False
+            await self._create_page(source)
+
+    async def _recover_context(self, sources: Sequence[DealSource]) -> None:
+        """Tier 3: replace the contexts of the pages, and every page sharing them"""
+        if self.profile_dir:
+            raise RuntimeError("The persistent profile context can only be replaced by a relaunch")
+        for context in {source.context for source in sources}:
+            if context is None or context not in self.contexts:
+                raise RuntimeError("Page has no browser context to replace")
+            try:
+                await context.close()
+            except Exception:
+                pass
+
+            new_context = await self._create_context()
+            self.contexts[self.contexts.index(context)] = new_context
+            for source in self.sources:
+                if source.context is context:
+                    source.context = new_context
+                    source.page = None
+                    source.capture = None
+                    source.live_installed = False
+                    await self._create_page(source)
+
+    async def _recover_browser(self, sources: Sequence[DealSource]) -> None:
+        """Tier 4: relaunch Chromium"""
+        await self.restart()
+
+    async def recover(self, sources: Optional[Sequence[DealSource]] = None) -> str:
+        """
+        Recover failed pages with the cheapest step that works
+
+        Tries reloading the pages, then recreating them, then recreating
+        their contexts (except on a persistent profile), and only then
+        relaunches the browser. Each step is followed by a health probe of
+        the pages and timed in recovery_stats.
+
+        Args:
+            sources: Sources whose page failed (defaults to every source)
+
+        Returns:
+            Name of the tier that recovered the pages
+        """
+        sources = list(sources or self.sources)
+        tiers = RECOVERY_TIERS
+        if not self._is_connected():
+            # Nothing below a relaunch can help a dead browser
+            tiers = ("browser",)
+        elif self.profile_dir:
+            # The persistent profile context can only be replaced by a relaunch
+            tiers = tuple(tier for tier in tiers if tier != "context")
+
+        for tier in tiers:
+            stats = self.recovery_stats[tier]
+            stats["attempts"] += 1
+            started = time.monotonic()
+            try:
+                await getattr(self, f"_recover_{tier}")(sources)
+                healthy = all(await asyncio.gather(*(self._probe(source) for source in sources)))
+            except Exception as e:
+                logger.warning(f"Recovery by {tier} failed: {e}")
+                healthy = False
+
+            elapsed = time.monotonic() - started
+            stats["total_seconds"] += elapsed
+            stats["last_seconds"] = elapsed
+            if healthy:
+                stats["successes"] += 1
+                BROWSER_RECOVERIES.inc(tier=tier)
+                logger.info(f"Recovered {len(sources)} page(s) by {tier} in {elapsed:.1f}s")
+                return tier
+            logger.info(f"Recovery by {tier} unhealthy after {elapsed:.1f}s, escalating")
+
+        raise RuntimeError("Browser recovery failed at every tier")
+
+    def seconds_until_due(self) -> Optional[float]:
+        """
+        Get the time until the next source with an interval is due
+
+        Returns:
+            Seconds to wait, or None if no source has its own interval
+        """
+        now = time.monotonic()
+        waits = [max(0.0, s.next_due - now) for s in self.sources if s.interval is not None]
+        return min(waits) if waits else None
+
+    async def _stream_source(
+        self,
+        source: DealSource,
+        min_discount: float,
+        chunk_size: int,
+        queue: asyncio.Queue
+    ) -> None:
+        """Navigate a single source and push its deal chunks to a queue"""
+        started = time.monotonic()
+        try:
+            async with self._semaphore:
+                with span("scraper.source", url=source.url) as source_span:
+                    deals = 0
+                    await self.navigate_to_deals(source)
+                    async for chunk in self.extract_deals_stream(min_discount, source, chunk_size):
+                        deals += len(chunk)
+                        await queue.put(chunk)
+                    source_span.set(deals=deals)
+        finally:
+            if source.interval is not None:
+                # Keep a fixed start cadence, however long the scrape took; a failed
+                # scrape waits its interval too instead of waking the loop at once
+                source.next_due = started + source.interval
+
+    async def scrape_deals_stream(
+        self,
+        min_discount: float = 40.0,
+        chunk_size: int = 25,
+        full_cycle: bool = True
+    ) -> AsyncIterator[List[Deal]]:
+        """
+        Streaming scraping method - yield deals from every due source as they are extracted
+
+        Sources are scraped concurrently. Chunks are passed through a bounded
+        queue, so extraction pauses while the consumer is busy instead of
+        buffering the whole page. An ASIN seen on several pages is yielded once.
+
+        Args:
+            min_discount: Minimum discount percentage to filter
+            chunk_size: Number of rows evaluated per chunk
+            full_cycle: Also scrape the sources without their own interval; False
+                when waking up early for a source with its own interval
+
+        Yields:
+            Non-empty lists of Deal objects
+        """
+        if not self.page:
+            await self.initialize()
+
+        if self.network_filter:
+            self.network_filter.reset_stats()
+
+        now = time.monotonic()
+        due = [source for source in self.sources if source.is_due(now, full_cycle)]
+        queue: asyncio.Queue = asyncio.Queue(maxsize=4)
+        tasks = [
+            asyncio.create_task(self._stream_source(source, min_discount, chunk_size, queue))
+            for source in due
+        ]
+
+        seen: Set[str] = set()
+        try:
+            pending = set(tasks)
+            while pending or not queue.empty():
+                if queue.empty():
+                    getter = asyncio.ensure_future(queue.get())
+                    done, pending = await asyncio.wait(
+                        pending | {getter}, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    pending.discard(getter)
+                    if getter not in done:
+                        getter.cancel()
+                        continue
+                    chunk = getter.result()
+                else:
+                    chunk = queue.get_nowait()
+
+                chunk = [deal for deal in chunk if deal.asin not in seen]
+                seen.update(deal.asin for deal in chunk)
+                if chunk:
+                    yield chunk
+
+        finally:
+            for task in tasks:
+                task.cancel()
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        if self.network_filter:
+            stats = self.network_filter.get_stats()
+            logger.info(
+                f"Network filter: blocked {stats['requests_blocked']}/{stats['requests_total']} requests, "
+                f"received {stats['bytes_received'] / 1024:.0f} KiB"
+            )
+            logger.debug(f"Network filter stats: {stats}")
+
+        if len(due) > 1:
+            logger.info(f"Scraped {len(due)} pages, {len(seen)} unique deals")
+
+        await self.persist_cookies()
+
+        failed: List[DealSource] = []
+        challenges = 0
+        for source, result in zip(due, results):
+            if isinstance(result, ChallengeDetected):
+                # Restarting does not help against a challenge, the scheduler backs off instead
+                challenges += 1
+            elif isinstance(result, BaseException) and not isinstance(result, asyncio.CancelledError):
+                logger.error(f"Scraping {source.url} failed: {result}")
+                failed.append(source)
+
+        self.cycle_stats = {
+            "sources": len(due),
+            "deals": len(seen),
+            "failures": len(failed),
+            "challenges": challenges,
+        }
+
+        if failed:
+            # Recover the failed pages, relaunching the browser only as a last resort
+            try:
+                await self.recover(failed)
+            except Exception as recover_error:
+                logger.error(f"Failed to recover browser: {recover_error}")
+
     async def scrape_deals(self, min_discount: float = 40.0) -> List[Deal]:
         """
-        Main scraping method - navigate and extract deals
+        Main scraping method - navigate and extract deals from every due source
 
         Args:
             min_discount: Minimum discount percentage to filter
@@ -333,18 +1136,103 @@ class KeepaScraperEngine:
             List of Deal objects
         """
         try:
-            if not self.page:
-                await self.initialize()
-
-            await self.navigate_to_deals()
-            deals = await self.extract_deals(min_discount)
-            return deals
+            return [
+                deal
+                async for chunk in self.scrape_deals_stream(min_discount)
+                for deal in chunk
+            ]
 
         except Exception as e:
             logger.error(f"Scraping failed: {e}")
-            # Attempt to restart browser on failure
+            # Attempt to recover the browser on failure
             try:
-                await self.restart()
-            except Exception as restart_error:
-                logger.error(f"Failed to restart browser: {restart_error}")
+                await self.recover()
+            except Exception as recover_error:
+                logger.error(f"Failed to recover browser: {recover_error}")
             return []
+
+    @staticmethod
+    def _offer_live(queue: asyncio.Queue, deals: List[Deal]) -> None:
+        """Queue a live batch without blocking, dropping the oldest batch when full"""
+        if not deals:
+            return
+        if queue.full():
+            # The consumer is behind, drop the oldest batch rather than block the page
+            queue.get_nowait()
+            logger.warning("Live queue full, dropped oldest batch")
+        queue.put_nowait(deals)
+
+    async def _start_live(self, source: DealSource, min_discount: float, queue: asyncio.Queue) -> None:
+        """Install the live observer on a source page, load it and queue the initial deals"""
+        if not source.live_installed:
+            def on_push(_binding_source: dict, rows: List[Dict]) -> None:
+                source.last_activity = time.monotonic()
+                if self._live_queue is not None:
+                    self._offer_live(self._live_queue, self._build_deals(rows, self._live_min_discount))
+
+            await source.page.expose_binding('__spybotPush', on_push)
+            await source.page.add_init_script(_LIVE_OBSERVER_SCRIPT)
+            source.live_installed = True
+
+        await self.navigate_to_deals(source)
+        source.last_activity = time.monotonic()
+
+        # Rows rendered before the observer fired are picked up by a full read
+        async for chunk in self.extract_deals_stream(min_discount, source):
+            self._offer_live(queue, chunk)
+
+    async def live_deals_stream(
+        self,
+        min_discount: float = 40.0,
+        stale_after: float = 900.0,
+        check_interval: float = 30.0
+    ) -> AsyncIterator[List[Deal]]:
+        """
+        Live scraping method - keep every page open and yield deals as the page changes
+
+        A MutationObserver installed with add_init_script pushes new or changed
+        rows to Python through page.expose_binding. A page is only reloaded when
+        it has been silent for stale_after seconds; when a reload fails the
+        pages are recovered with recover().
+
+        Args:
+            min_discount: Minimum discount percentage to filter
+            stale_after: Seconds without pushes before a page is reloaded
+            check_interval: Seconds between staleness checks
+
+        Yields:
+            Non-empty lists of Deal objects
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=100)
+        # Pages already installed by a previous stream push here from now on
+        self._live_queue = queue
+        self._live_min_discount = min_discount
+
+        if not self.page:
+            await self.initialize()
+        for source in self.sources:
+            await self._start_live(source, min_discount, queue)
+        logger.info(f"Live mode started on {len(self.sources)} pages")
+
+        while True:
+            try:
+                yield await asyncio.wait_for(queue.get(), timeout=check_interval)
+            except asyncio.TimeoutError:
+                await self.persist_cookies()
+
+            now = time.monotonic()
+            stale = [s for s in self.sources if now - s.last_activity > stale_after]
+            if not stale:
+                continue
+
+            try:
+                for source in stale:
+                    logger.info(f"No live updates from {source.url} for {stale_after:.0f}s, reloading")
+                    await self._start_live(source, min_discount, queue)
+            except Exception as e:
+                logger.error(f"Live reload failed: {e}")
+                await self.recover(stale)
+                # Recreated pages lost their observer and need a full start
+                for source in self.sources:
+                    if source in stale or not source.live_installed:
+                        await self._start_live(source, min_discount, queue)
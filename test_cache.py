@@ -0,0 +1,138 @@
+"""
+Tests for the deal caches, ASIN packing and the Bloom filter
+Run with: python -m pytest test_cache.py
+"""
+import asyncio
+import random
+import sqlite3
+import time
+
+import pytest
+
+from cache import BloomFilter, DealCache, PackedDealCache, PersistentDealCache, pack_asin, unpack_asin
+
+
+def random_asins(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    chars = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    return ['B0' + ''.join(rng.choices(chars, k=8)) for _ in range(count)]
+
+
+@pytest.mark.parametrize("asin", ["B08L5VR6C3", "0000000000", "ZZZZZZZZZZ", "4-B08L5VR6C3", "12-0123456789"])
+def test_pack_round_trip(asin):
+    assert unpack_asin(pack_asin(asin)) == asin
+
+
+def test_pack_normalizes_case_and_whitespace():
+    assert pack_asin(" b08l5vr6c3\n") == pack_asin("B08L5VR6C3")
+    assert pack_asin("4-B08L5VR6C3") != pack_asin("B08L5VR6C3")
+
+
+@pytest.mark.parametrize("asin", ["", "B08L5VR6C", "B08L5VR6C33", "+B08L5VR6C", "B08L5 R6C3", "x-B08L5VR6C3", "4-"])
+def test_pack_rejects_malformed(asin):
+    with pytest.raises(ValueError):
+        pack_asin(asin)
+
+
+def test_bloom_has_no_false_negatives_and_few_false_positives():
+    keys = [pack_asin(asin) for asin in random_asins(5000)]
+    bloom = BloomFilter(capacity=5000, error_rate=0.01)
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+
+    others = [pack_asin(asin) for asin in random_asins(5000, seed=1)]
+    false_positives = sum(key in bloom for key in others if key not in set(keys))
+    assert false_positives < 5000 * 0.03
+
+
+@pytest.mark.parametrize("bloom_capacity", [0, 100])
+def test_packed_cache_matches_dict_cache(bloom_capacity):
+    packed = PackedDealCache(initial_capacity=8, bloom_capacity=bloom_capacity)
+    reference = DealCache()
+    asins = random_asins(2000)
+    for asin in asins[:1000]:
+        packed.add(asin)
+        reference.add(asin)
+
+    # The table grew far past its initial capacity without losing entries
+    assert packed.get_stats()["total_entries"] == 1000
+    assert all(packed.is_cached(asin) for asin in asins[:1000])
+    assert packed.filter_new(asins) == reference.filter_new(asins) == asins[1000:]
+
+
+def test_filter_new_dedups_and_skips_malformed():
+    cache = PackedDealCache()
+    cache.add("B000000001")
+    batch = ["B000000001", "bad asin", "B000000002", "b000000002", "", "B000000003"]
+    assert cache.filter_new(batch) == ["B000000002", "B000000003"]
+
+
+def test_packed_cache_expires_entries():
+    cache = PackedDealCache(cache_duration_hours=1, bucket_seconds=0)
+    cache.add("B000000001", timestamp=time.time() - 7200)
+    cache.add("B000000002")
+    assert not cache.is_cached("B000000001")
+    assert cache.is_cached("B000000002")
+    assert cache.get_stats()["total_entries"] == 1
+
+    # Re-adding an expired ASIN makes it fresh again
+    cache.add("B000000001")
+    assert cache.is_cached("B000000001")
+
+
+def test_expiry_drops_posted_messages():
+    cache = PackedDealCache(cache_duration_hours=1, bucket_seconds=0)
+    cache.add("B000000001", timestamp=time.time() - 7200)
+    cache.posted.record("B000000001", "channel", 1, 10.0)
+    cache.add("B000000002")
+    cache.posted.record("B000000002", "channel", 2, 20.0)
+    cache.is_cached("B000000002")
+    assert cache.posted.asins() == ["B000000002"]
+
+
+def test_persistent_cache_survives_reopen(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = PersistentDealCache(path, batch_size=100)
+    cache.add("B000000001")
+    cache.posted.record("B000000001", "channel", 42, 19.99)
+    cache.posted.update("B000000001", 19.99, in_stock=False)
+    cache.close()
+
+    reopened = PersistentDealCache(path)
+    assert reopened.is_cached("B000000001")
+    posted = reopened.posted.get("B000000001")
+    assert posted.messages == {"channel": 42}
+    assert not posted.in_stock
+    reopened.close()
+
+
+def test_persistent_cache_skips_expired_rows(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = PersistentDealCache(path, cache_duration_hours=1)
+    cache.add("B000000001", timestamp=time.time() - 7200)
+    cache.add("B000000002")
+    cache.close()
+
+    reopened = PersistentDealCache(path, cache_duration_hours=1)
+    assert reopened.filter_new(["B000000001", "B000000002"]) == ["B000000001"]
+    reopened.close()
+
+
+def test_persistent_cache_flushes_on_a_timer(tmp_path):
+    path = str(tmp_path / "cache.db")
+
+    def rows_on_disk():
+        with sqlite3.connect(path) as conn:
+            return conn.execute("SELECT COUNT(*) FROM deals").fetchone()[0]
+
+    async def post_then_idle():
+        cache = PersistentDealCache(path, batch_size=100, flush_interval=0.05)
+        cache.add("B000000001")
+        assert rows_on_disk() == 0
+        # No further cache call: the timer commits the pending entry
+        await asyncio.sleep(0.2)
+        assert rows_on_disk() == 1
+        cache.close()
+
+    asyncio.run(post_then_idle())
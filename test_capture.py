@@ -0,0 +1,154 @@
+"""
+Tests for decoding Keepa deal payloads captured from the network
+Run with: python -m pytest test_capture.py
+"""
+import asyncio
+import gzip
+import json
+import zlib
+
+import pytest
+
+from capture import AMAZON_IMAGE_BASE, DealCapture, _decode_payload, parse_deal_object
+
+
+def keepa_deal(asin: str = "B000000001", **fields) -> dict:
+    """Keepa deal object: prices in cents, Amazon first then new offers"""
+    deal = {
+        "asin": asin,
+        "title": f"Deal {asin}",
+        "current": [2500, 2400],
+        "avg": [[6000, 5500], [5000, 4800]],
+        "image": [56, 49, 46, 106, 112, 103],  # "81.jpg"
+    }
+    deal.update(fields)
+    return deal
+
+
+def deflate_raw(data: bytes) -> bytes:
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+FRAME = json.dumps({"deals": {"dr": [keepa_deal()]}}).encode()
+
+
+@pytest.mark.parametrize("payload", [
+    FRAME.decode(),
+    FRAME,
+    deflate_raw(FRAME),
+    zlib.compress(FRAME),
+    gzip.compress(FRAME),
+])
+def test_decode_payload_plain_and_compressed(payload):
+    assert _decode_payload(payload) == json.loads(FRAME)
+
+
+@pytest.mark.parametrize("payload", [
+    "",
+    "   ",
+    "42",  # JSON, but not an object or a list
+    '{"deals": [',
+    "ping",
+    b"\xff\xfe\x00garbage",
+    zlib.compress(b'{"truncated": '),
+])
+def test_decode_payload_rejects_malformed(payload):
+    assert _decode_payload(payload) is None
+
+
+def test_prices_are_converted_from_cents():
+    row = parse_deal_object(keepa_deal())
+    assert row == {
+        "asin": "B000000001",
+        "title": "Deal B000000001",
+        "currentPrice": 25.0,
+        "averagePrice": 50.0,  # Longest average window
+        "discountPercent": 50.0,
+        "productUrl": "https://www.amazon.fr/dp/B000000001",
+        "imageUrl": AMAZON_IMAGE_BASE + "81.jpg",
+    }
+
+
+def test_new_offer_price_when_amazon_has_none():
+    row = parse_deal_object(keepa_deal(current=[-1, 2400], avg=[[6000, 4800], [-1, -1]]))
+    # The longest window has no new price, so the next one is used
+    assert (row["currentPrice"], row["averagePrice"], row["discountPercent"]) == (24.0, 48.0, 50.0)
+
+
+def test_objects_without_a_price_are_skipped():
+    assert parse_deal_object(keepa_deal(current=[-1, -1])) is None
+    assert parse_deal_object(keepa_deal(current=None)) is None
+    row = parse_deal_object(keepa_deal(avg="n/a", image="https://example.com/i.jpg", title=None))
+    assert (row["averagePrice"], row["discountPercent"], row["imageUrl"], row["title"]) == (
+        0.0, 0.0, "https://example.com/i.jpg", ""
+    )
+
+
+class StubWebSocket:
+    url = "wss://dyn.keepa.com/socket"
+
+    def __init__(self):
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+
+class StubRequest:
+    def __init__(self, resource_type: str):
+        self.resource_type = resource_type
+
+
+class StubResponse:
+    url = "https://dyn.keepa.com/deal"
+
+    def __init__(self, body: bytes, resource_type: str = "xhr", content_type: str = "application/json"):
+        self._body = body
+        self.request = StubRequest(resource_type)
+        self.headers = {"content-type": content_type}
+
+    async def body(self) -> bytes:
+        if self._body is None:
+            raise RuntimeError("No body for redirect")
+        return self._body
+
+
+def test_websocket_frames_collect_deals_by_asin():
+    capture = DealCapture()
+    websocket = StubWebSocket()
+    capture._on_websocket(websocket)
+    on_frame = websocket.handlers["framereceived"]
+
+    on_frame(deflate_raw(FRAME))
+    on_frame('{"status": "connected", "n": 3}')  # Not a deal frame
+    on_frame("not json")
+    on_frame(b"\x00\x01")
+    on_frame(json.dumps([keepa_deal(current=[2000, -1]), keepa_deal("B000000002"), {"asin": "short"}]))
+
+    assert capture.captured.is_set()
+    assert sorted(row["asin"] for row in capture.rows) == ["B000000001", "B000000002"]
+    # The later frame replaced the first one for the same ASIN
+    assert next(row for row in capture.rows if row["asin"] == "B000000001")["currentPrice"] == 20.0
+
+    capture.reset()
+    assert capture.rows == [] and not capture.captured.is_set()
+
+
+def test_only_json_xhr_responses_are_read():
+    capture = DealCapture()
+
+    async def run():
+        await capture._on_response(StubResponse(FRAME, resource_type="document"))
+        await capture._on_response(StubResponse(FRAME, content_type="text/html"))
+        await capture._on_response(StubResponse(None))  # Body unavailable
+        await capture._on_response(StubResponse(b'{"deals": '))
+        assert not capture.captured.is_set()
+        await capture._on_response(StubResponse(gzip.compress(FRAME), resource_type="fetch"))
+
+    asyncio.run(run())
+    assert [row["asin"] for row in capture.rows] == ["B000000001"]
+
+
+def test_wait_times_out_without_deals():
+    assert not asyncio.run(DealCapture().wait(timeout=0.01))
@@ -0,0 +1,98 @@
+"""
+Tests for saving the session cookies back to the cookies file
+Run with: python -m pytest test_cookies.py
+"""
+import asyncio
+import json
+import os
+
+import scraper
+from scraper import KeepaScraperEngine
+
+CLEARANCE = {"name": "cf_clearance", "domain": ".keepa.com", "path": "/", "value": "old"}
+
+
+class StubContext:
+    def __init__(self, cookies):
+        self._cookies = cookies
+
+    async def cookies(self):
+        return self._cookies
+
+    async def add_cookies(self, cookies):
+        pass
+
+
+class StubBrowser:
+    def is_connected(self) -> bool:
+        return True
+
+
+def make_engine(tmp_path, session_cookies, save_cookies=True) -> KeepaScraperEngine:
+    """Engine that loaded CLEARANCE from its cookies file and now holds session_cookies"""
+    cookies_file = tmp_path / "cookies.json"
+    cookies_file.write_text(json.dumps([CLEARANCE]), encoding='utf-8')
+    engine = KeepaScraperEngine(
+        "https://keepa.com/#!deals/4", use_cookies=True, cookies_file=str(cookies_file), save_cookies=save_cookies
+    )
+    engine.browser = StubBrowser()
+    engine.contexts = [StubContext(session_cookies)]
+    asyncio.run(engine._load_cookies(engine.contexts[0]))
+    return engine
+
+
+def saved(tmp_path):
+    return json.loads((tmp_path / "cookies.json").read_text(encoding='utf-8'))
+
+
+def test_refreshed_cookies_replace_the_file(tmp_path, monkeypatch):
+    refreshed = [dict(CLEARANCE, value="new")]
+    engine = make_engine(tmp_path, refreshed)
+    replaced = []
+
+    def replace(src, dst):
+        # Written in full to the temporary file before it takes the place of the real one
+        assert json.loads(open(src, encoding='utf-8').read()) == refreshed
+        replaced.append((os.path.basename(src), os.path.basename(dst)))
+        os.rename(src, dst)
+
+    monkeypatch.setattr(scraper.os, "replace", replace)
+    assert asyncio.run(engine.persist_cookies())
+    assert replaced == [("cookies.json.tmp", "cookies.json")]
+    assert saved(tmp_path) == refreshed
+    assert sorted(os.listdir(tmp_path)) == ["cookies.json"]
+
+    # Saved once: the same cookies are not written again
+    assert not asyncio.run(engine.persist_cookies())
+    assert len(replaced) == 1
+
+
+def test_unchanged_cookies_are_not_written(tmp_path):
+    engine = make_engine(tmp_path, [dict(CLEARANCE)])
+    before = os.stat(tmp_path / "cookies.json").st_mtime_ns
+    assert not asyncio.run(engine.persist_cookies())
+    assert os.stat(tmp_path / "cookies.json").st_mtime_ns == before
+
+
+def test_auto_save_disabled(tmp_path):
+    engine = make_engine(tmp_path, [dict(CLEARANCE, value="new")], save_cookies=False)
+    assert not asyncio.run(engine.persist_cookies())
+    assert saved(tmp_path) == [CLEARANCE]
+
+
+def test_failed_write_keeps_the_previous_file(tmp_path, monkeypatch):
+    engine = make_engine(tmp_path, [dict(CLEARANCE, value="new")])
+
+    def broken_dump(*args, **kwargs):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(scraper.json, "dump", broken_dump)
+    assert not asyncio.run(engine.persist_cookies())
+    assert saved(tmp_path) == [CLEARANCE]
+
+
+def test_no_save_without_a_browser(tmp_path):
+    engine = make_engine(tmp_path, [dict(CLEARANCE, value="new")])
+    engine.browser = None
+    assert not asyncio.run(engine.persist_cookies())
+    assert saved(tmp_path) == [CLEARANCE]
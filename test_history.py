@@ -0,0 +1,95 @@
+"""
+Tests for the local price history and its robust anomaly scores
+Run with: python -m pytest test_history.py
+"""
+import numpy as np
+import pytest
+
+from history import HistoryScores, PriceHistory
+
+
+def history_of(prices, asin="B000000001", **kwargs) -> PriceHistory:
+    """History with one observation per hour for a single ASIN"""
+    history = PriceHistory(**kwargs)
+    for hour, price in enumerate(prices):
+        history.record([asin], [price], timestamp=hour * 3600.0)
+    return history
+
+
+def test_record_skips_missing_prices_and_collapses_repeats():
+    history = PriceHistory(min_gap=3600)
+    history.record(["B000000001", "B000000002"], [10.0, 0], timestamp=0)
+    history.record(["B000000001"], [10.0], timestamp=60)  # Same price within min_gap
+    history.record(["B000000001"], [10.0], timestamp=7200)
+    assert len(history) == 1
+    assert history.get_stats() == {"asins": 1, "observations": 2}
+
+
+def test_record_trims_series_but_keeps_all_time_low():
+    history = history_of([5.0] + [50.0 + i for i in range(10)], max_points=4)
+    assert history.get_stats()["observations"] == 4
+
+    scores = history.score(["B000000001"], [6.0])
+    assert not scores.all_time_low[0]  # 5.0 was trimmed from the series, not from the low
+    assert history.score(["B000000001"], [4.0]).all_time_low[0]
+
+
+def test_robust_z_uses_median_and_mad():
+    history = history_of([100, 102, 98, 100, 104, 96])
+    scores = history.score(["B000000001"], [80.0])
+    # Median 100, MAD 2
+    assert scores.rolling_median[0] == pytest.approx(100)
+    assert scores.robust_z[0] == pytest.approx(0.6745 * -20 / 2)
+    assert scores.drop_percent[0] == pytest.approx(20)
+    assert scores.observations[0] == 6
+
+
+def test_flat_history_floors_mad():
+    history = history_of([100.0] * 5, min_gap=0)
+    scores = history.score(["B000000001"], [99.0])
+    # MAD is 0, floored at 1% of the median: one euro is not an outlier
+    assert scores.robust_z[0] == pytest.approx(-0.6745)
+
+
+def test_score_only_uses_last_window():
+    history = history_of([500.0] * 10 + [100.0, 101.0, 99.0], window=3, min_gap=0)
+    scores = history.score(["B000000001"], [100.0])
+    assert scores.observations[0] == 3
+    assert scores.rolling_median[0] == pytest.approx(100)
+
+
+def test_unknown_asin_scores_neutral():
+    scores = history_of([100.0]).score(["B000000009"], [10.0])
+    assert scores.observations[0] == 0
+    assert np.isnan(scores.rolling_median[0])
+    assert scores.robust_z[0] == 0
+    assert scores.drop_percent[0] == 0
+    assert not scores.all_time_low[0]
+
+
+def test_confirms():
+    scores = HistoryScores(
+        observations=np.array([2, 10, 10, 10]),
+        rolling_median=np.array([100.0, 100.0, 100.0, 100.0]),
+        robust_z=np.array([0.0, -1.0, -1.0, -5.0]),
+        drop_percent=np.array([0.0, 30.0, 10.0, 10.0]),
+        all_time_low=np.zeros(4, dtype=bool),
+    )
+    # Too little history / own drop reaches half of Keepa's / no / strong outlier
+    assert scores.confirms(np.full(4, 60.0), min_observations=5).tolist() == [True, True, False, True]
+
+
+def test_save_and_load_round_trip(tmp_path):
+    history = PriceHistory(min_gap=0)
+    history.record(["B000000001", "B000000002"], [10.0, 20.0], timestamp=0)
+    history.record(["B000000001"], [8.0], timestamp=1)
+    path = str(tmp_path / "history.npz")
+    history.save(path)
+
+    loaded = PriceHistory()
+    loaded.load(path)
+    assert loaded.get_stats() == history.get_stats()
+    expected = history.score(["B000000001", "B000000002"], [5.0, 20.0])
+    actual = loaded.score(["B000000001", "B000000002"], [5.0, 20.0])
+    assert actual.rolling_median.tolist() == expected.rolling_median.tolist()
+    assert actual.all_time_low.tolist() == [True, False]
@@ -0,0 +1,65 @@
+"""
+Tests for the Prometheus registry and the metrics of worker processes
+Run with: python -m pytest test_metrics.py
+"""
+from metrics import Counter, Gauge, Histogram, Registry
+
+
+def make_registry():
+    registry = Registry()
+    deals = registry.register(Counter("deals_total", "Deals", ["stage"]))
+    seconds = registry.register(Histogram("evaluate_seconds", "Evaluate", buckets=(0.1, 1.0)))
+    return registry, deals, seconds
+
+
+def sample(rendered: str, prefix: str) -> float:
+    return float(next(line for line in rendered.splitlines() if line.startswith(prefix)).rsplit(' ', 1)[1])
+
+
+def test_render_formats():
+    registry, deals, seconds = make_registry()
+    depth = registry.register(Gauge("queue_depth", "Depth", ["route"]))
+    deals.inc(3, stage="found")
+    seconds.observe(0.05)
+    seconds.observe(5.0)
+    depth.set_function(lambda: 7, route='a"b')
+
+    rendered = registry.render()
+    assert "# TYPE deals_total counter" in rendered
+    assert sample(rendered, 'deals_total{stage="found"}') == 3
+    assert sample(rendered, 'evaluate_seconds_bucket{le="0.1"}') == 1
+    assert sample(rendered, 'evaluate_seconds_bucket{le="+Inf"}') == 2
+    assert sample(rendered, "evaluate_seconds_count") == 2
+    assert sample(rendered, 'queue_depth{route="a\\"b"}') == 7
+
+
+def test_remote_snapshots_are_summed_not_accumulated():
+    registry, deals, seconds = make_registry()
+    worker, worker_deals, worker_seconds = make_registry()
+    deals.inc(1, stage="found")
+
+    worker_deals.inc(2, stage="found")
+    worker_seconds.observe(0.5)
+    registry.set_remote("scraper-1", worker.snapshot(["deals_total", "evaluate_seconds"]))
+    # A newer snapshot replaces the previous one from the same worker
+    worker_deals.inc(3, stage="found")
+    registry.set_remote("scraper-1", worker.snapshot(["deals_total", "evaluate_seconds"]))
+
+    rendered = registry.render()
+    assert sample(rendered, 'deals_total{stage="found"}') == 6
+    assert sample(rendered, 'evaluate_seconds_bucket{le="1.0"}') == 1
+    # Rendering never changes the local values
+    assert deals.get(stage="found") == 1
+    assert sample(registry.render(), 'deals_total{stage="found"}') == 6
+
+
+def test_retired_worker_totals_never_go_backwards():
+    registry, deals, _ = make_registry()
+    registry.set_remote("scraper-1", {"deals_total": {("found",): 4.0}})
+    registry.retire_remote("scraper-1")
+    # The restarted worker starts again from zero
+    registry.set_remote("scraper-1", {"deals_total": {("found",): 1.0}})
+
+    assert sample(registry.render(), 'deals_total{stage="found"}') == 5
+    assert deals.get(stage="found") == 4
+    registry.retire_remote("unknown")
@@ -0,0 +1,99 @@
+"""
+Tests for the request filter of the browser context
+Run with: python -m pytest test_network.py
+"""
+import asyncio
+
+import pytest
+
+from network import NetworkFilter
+
+
+class StubRequest:
+    def __init__(self, url: str, resource_type: str):
+        self.url = url
+        self.resource_type = resource_type
+
+
+class StubRoute:
+    def __init__(self, fail: bool = False):
+        self.outcome = None
+        self.fail = fail
+
+    async def abort(self):
+        self.outcome = "abort"
+
+    async def continue_(self):
+        if self.fail:
+            raise RuntimeError("Page closed")
+        self.outcome = "continue"
+
+
+class StubResponse:
+    def __init__(self, content_length=None):
+        self.headers = {} if content_length is None else {"content-length": content_length}
+
+
+@pytest.mark.parametrize("url, resource_type, blocked", [
+    ("https://keepa.com/#!deals/4", "document", False),
+    ("https://m.media-amazon.com/images/I/1.jpg", "image", True),
+    ("https://fonts.gstatic.com/font.woff2", "font", True),
+    ("https://www.google-analytics.com/collect", "xhr", True),
+    ("https://stats.g.doubleclick.net/r/collect", "script", True),  # Subdomain of a blocked host
+    ("https://notdoubleclick.net/x.js", "script", False),  # Same suffix, different host
+    ("https://graph.keepa.com/pricehistory.png", "image", False),  # Allowed host wins over the type
+    ("https://www.facebook.com/tr", "image", True),
+    ("data:image/png;base64,AAAA", "image", True),
+])
+def test_should_block(url, resource_type, blocked):
+    network_filter = NetworkFilter(allowed_hosts="graph.keepa.com")
+    assert network_filter.should_block(url, resource_type) is blocked
+
+
+def test_allowed_hosts_override_blocked_hosts():
+    network_filter = NetworkFilter(blocked_hosts=["keepa.com"], allowed_hosts=["dyn.keepa.com"])
+    assert network_filter.should_block("https://keepa.com/app.js", "script")
+    assert not network_filter.should_block("https://dyn.keepa.com/deal", "xhr")
+
+
+def test_lists_are_parsed_from_comma_separated_strings():
+    network_filter = NetworkFilter(blocked_resource_types=" Image, ,MEDIA", blocked_hosts="", allowed_hosts=None)
+    assert network_filter.blocked_resource_types == {"image", "media"}
+    assert network_filter.blocked_hosts == network_filter.allowed_hosts == set()
+    assert not network_filter.should_block("https://www.google-analytics.com/collect", "xhr")
+
+
+def test_counters_follow_routed_requests_and_reset_per_cycle():
+    network_filter = NetworkFilter()
+
+    async def run():
+        for url, resource_type in [
+            ("https://keepa.com/", "document"),
+            ("https://m.media-amazon.com/1.jpg", "image"),
+            ("https://m.media-amazon.com/2.jpg", "image"),
+            ("https://fonts.gstatic.com/f.woff2", "font"),
+        ]:
+            await network_filter._handle_route(StubRoute(), StubRequest(url, resource_type))
+        # A request whose page closed meanwhile is still counted, without raising
+        await network_filter._handle_route(StubRoute(fail=True), StubRequest("https://keepa.com/x", "xhr"))
+
+    asyncio.run(run())
+    for content_length in ("1200", "300", None, "chunked"):
+        network_filter._on_response(StubResponse(content_length))
+
+    assert network_filter.get_stats() == {
+        "requests_total": 5,
+        "requests_blocked": 3,
+        "requests_allowed": 2,
+        "bytes_received": 1500,
+        "blocked_by_type": {"image": 2, "font": 1},
+    }
+
+    network_filter.reset_stats()
+    assert network_filter.get_stats() == {
+        "requests_total": 0,
+        "requests_blocked": 0,
+        "requests_allowed": 0,
+        "bytes_received": 0,
+        "blocked_by_type": {},
+    }
@@ -0,0 +1,243 @@
+"""
+Tests for the scrape -> dedup -> publish pipeline and its bounded queues
+Run with: python -m pytest test_pipeline.py
+"""
+import asyncio
+
+import numpy as np
+import pytest
+
+from cache import DealCache
+from conftest import make_deal
+from history import PriceHistory
+from pipeline import DROP_LOWEST, DROP_OLDEST, BoundedQueue, DealPipeline
+from routing import DealRouter, Route
+from scraper import OUT_OF_STOCK, Deal, KeepaScraperEngine
+
+
+class FakePostingQueue:
+    """Records submitted deals and edits instead of posting them"""
+
+    def __init__(self, room: int = 1000):
+        self.submitted = []
+        self.edits = []
+        self.room = room
+
+    def submit(self, deal: Deal) -> bool:
+        self.submitted.append(deal)
+        return True
+
+    def is_pending(self, asin: str) -> bool:
+        # Nothing is ever posted, so submitted deals wait forever
+        return any(deal.asin == asin for deal in self.submitted)
+
+    async def wait_for_room(self, limit: int) -> None:
+        while len(self.submitted) >= min(limit, self.room):
+            await asyncio.sleep(0.01)
+
+    async def edit_deal(self, deal: Deal, message_id: int, previous_price: float) -> bool:
+        self.edits.append((deal.asin, message_id, previous_price, deal.availability))
+        return True
+
+
+def test_drop_oldest_keeps_newest_items():
+    dropped = []
+    queue = BoundedQueue(2, DROP_OLDEST, on_drop=dropped.append)
+    assert queue.offer(1) and queue.offer(2) and queue.offer(3)
+    assert dropped == [1]
+    assert [queue.get_nowait(), queue.get_nowait()] == [2, 3]
+    assert (queue.dropped, queue.max_depth) == (1, 2)
+
+
+def test_drop_lowest_evicts_lowest_priority():
+    queue = BoundedQueue(2, DROP_LOWEST, priority=lambda item: item)
+    queue.offer(50)
+    queue.offer(70)
+    assert queue.offer(60)  # Evicts 50
+    assert not queue.offer(40)  # Lower than everything queued: the new item goes
+    assert sorted([queue.get_nowait(), queue.get_nowait()]) == [60, 70]
+    assert queue.dropped == 2
+
+
+def test_drops_keep_join_balanced():
+    async def run():
+        queue = BoundedQueue(1, DROP_OLDEST)
+        queue.offer("a")
+        queue.offer("b")
+        queue.get_nowait()
+        queue.task_done()
+        await asyncio.wait_for(queue.join(), 0.5)
+
+    asyncio.run(run())
+
+
+def test_bounded_queue_validates_policy():
+    with pytest.raises(ValueError):
+        BoundedQueue(1, "drop_random")
+    with pytest.raises(ValueError):
+        BoundedQueue(1, DROP_LOWEST)
+
+
+async def run_pipeline(pipeline: DealPipeline, *chunks) -> None:
+    """Submit chunks and wait until both stages are idle"""
+    pipeline.start()
+    for chunk in chunks:
+        pipeline.submit(chunk)
+    await pipeline.drain_scraped()
+    await asyncio.wait_for(pipeline.outbox.join(), 1)
+    await pipeline.stop()
+
+
+def test_pipeline_routes_only_new_deals():
+    cache = DealCache()
+    cache.add("B000000001")
+    big, small = FakePostingQueue(), FakePostingQueue()
+    router = DealRouter([
+        Route(name="big", channel_id=1, min_discount=60),
+        Route(name="small", channel_id=2, max_discount=60),
+    ])
+    pipeline = DealPipeline(cache, router, {"big": big, "small": small})
+
+    asyncio.run(run_pipeline(
+        pipeline,
+        [make_deal("B000000001", 80), make_deal("B000000002", 70)],
+        [make_deal("B000000002", 70), make_deal("B000000003", 45)],
+    ))
+
+    assert [deal.asin for deal in big.submitted] == ["B000000002"]
+    assert [deal.asin for deal in small.submitted] == ["B000000003"]
+    assert pipeline.get_stats()["new_deals"] == 2
+
+
+def test_unrouted_and_waiting_deals_are_not_new_again():
+    posting = FakePostingQueue()
+    router = DealRouter([Route(name="big", channel_id=1, min_discount=60)])
+    pipeline = DealPipeline(DealCache(), router, {"big": posting})
+    cycle = [make_deal("B000000001", 30), make_deal("B000000002", 80)]
+
+
+    async def run():
+        new_deals = []
+        pipeline.start()
+        for _ in range(2):
+            # Second cycle: the unrouted deal is skipped and the other one still waits to be posted
+            pipeline.submit(cycle)
+            await pipeline.drain_scraped()
+            await asyncio.wait_for(pipeline.outbox.join(), 1)
+            new_deals.append(pipeline.get_stats()["new_deals"])
+        await pipeline.stop()
+        return new_deals
+
+    assert asyncio.run(run()) == [1, 1]
+    assert [deal.asin for deal in posting.submitted] == ["B000000002"]
+    assert router.get_stats()["unrouted"] == 1
+
+
+def test_outbox_overflow_drops_lowest_discount():
+    async def run():
+        posting = FakePostingQueue(room=0)  # Publishing is stuck
+        pipeline = DealPipeline(
+            DealCache(), DealRouter([Route(name="all", channel_id=1)]), {"all": posting}, outbox_size=2
+        )
+        pipeline.start()
+        pipeline.submit([make_deal("B000000001", 50), make_deal("B000000002", 90)])
+        await pipeline.drain_scraped()
+        await asyncio.sleep(0.05)  # The publish stage holds the first deal while it waits
+        pipeline.submit([make_deal("B000000003", 60), make_deal("B000000004", 40), make_deal("B000000005", 80)])
+        await pipeline.drain_scraped()
+        queued = sorted(item[1].asin for item in pipeline.outbox._queue)
+        await pipeline.stop()
+        return queued, pipeline.outbox.dropped
+
+    queued, dropped = asyncio.run(run())
+    # 40% is dropped on arrival, then 80% evicts 60%; 90% stays
+    assert queued == ["B000000002", "B000000005"]
+    assert dropped == 2
+
+
+def posted_pipeline(edit_min_drop=5.0):
+    """Pipeline with B000000001 posted at 50 EUR to the 'all' route as message 42"""
+    cache = DealCache()
+    cache.add("B000000001")
+    cache.posted.record("B000000001", "all", 42, 50.0)
+    posting = FakePostingQueue()
+    pipeline = DealPipeline(
+        cache, DealRouter([Route(name="all", channel_id=1)]), {"all": posting}, edit_min_drop=edit_min_drop
+    )
+    return pipeline, posting, cache
+
+
+async def submit_and_edit(pipeline: DealPipeline, *chunks) -> None:
+    """Run each chunk through dedup, then apply its edits as the scraper loop does"""
+    pipeline.start()
+    for chunk in chunks:
+        pipeline.submit(chunk)
+        await pipeline.drain_scraped()
+        pipeline.flush_edits()
+        if pipeline._edit_task:
+            await pipeline._edit_task
+    await pipeline.stop()
+
+
+def test_further_price_drop_edits_posted_message():
+    pipeline, posting, cache = posted_pipeline()
+    asyncio.run(submit_and_edit(
+        pipeline,
+        [make_deal("B000000001", price=48.0)],  # 4% below the posted price: not enough
+        [make_deal("B000000001", price=45.0)],
+        [make_deal("B000000001", price=44.0)],  # Compared with the edited price now
+    ))
+    assert posting.edits == [("B000000001", 42, 50.0, "In Stock")]
+    assert cache.posted.get("B000000001").price == 45.0
+    assert posting.submitted == []
+    assert pipeline.get_stats()["edits"] == {"queued": 1, "applied": 1, "pending": 0}
+
+
+def test_out_of_stock_edits_once():
+    pipeline, posting, cache = posted_pipeline()
+    gone = make_deal("B000000001", price=0.0)
+    gone.availability = OUT_OF_STOCK
+    asyncio.run(submit_and_edit(pipeline, [gone], [gone]))
+    assert posting.edits == [("B000000001", 42, 50.0, OUT_OF_STOCK)]
+    posted = cache.posted.get("B000000001")
+    assert (posted.price, posted.in_stock) == (50.0, False)
+
+
+def test_edits_coalesce_by_asin():
+    pipeline, posting, cache = posted_pipeline()
+
+    async def run():
+        pipeline.start()
+        pipeline.submit([make_deal("B000000001", price=45.0)])
+        pipeline.submit([make_deal("B000000001", price=40.0)])
+        await pipeline.drain_scraped()
+        pipeline.flush_edits()
+        await pipeline._edit_task
+        await pipeline.stop()
+
+    asyncio.run(run())
+    assert posting.edits == [("B000000001", 42, 50.0, "In Stock")]
+    assert cache.posted.get("B000000001").price == 40.0
+
+
+def test_edits_disabled():
+    pipeline, posting, cache = posted_pipeline(edit_min_drop=None)
+    asyncio.run(submit_and_edit(pipeline, [make_deal("B000000001", price=10.0)]))
+    assert posting.edits == [] and posting.submitted == []
+
+
+def test_history_never_rejects_posted_deals():
+    engine = KeepaScraperEngine.__new__(KeepaScraperEngine)
+    engine.price_history = PriceHistory(min_gap=0)
+    engine.history_min_observations = 5
+    engine.is_posted = {"B000000001"}.__contains__
+    for hour in range(10):
+        # Our median sits on the posted price once the deal has been seen for a while
+        engine.price_history.record(["B000000001", "B000000002"], [50.0 + hour % 3, 50.0 + hour % 3], hour)
+
+    columns = {
+        'asin': np.array(["B000000001", "B000000002"], dtype=object),
+        'current_price': np.array([48.0, 48.0]),
+        'discount_percent': np.array([60.0, 60.0]),
+    }
+    assert engine._check_history(columns, np.array([True, True])).tolist() == [True, False]
@@ -0,0 +1,208 @@
+"""
+Tests for the Discord rate limiter and the posting queue
+Run with: python -m pytest test_posting.py
+"""
+import asyncio
+import time
+
+import discord
+import pytest
+
+from conftest import make_deal
+from posting import PostingQueue, RateLimiter
+
+
+@pytest.mark.parametrize("url, route", [
+    ("https://discord.com/api/v10/channels/123/messages", "channels/123"),
+    ("https://discord.com/api/v10/channels/123/messages/456", "channels/123"),
+    ("https://discord.com/api/webhooks/123/tok-en_1?wait=true", "webhooks/123/tok-en_1"),
+    ("https://discord.com/api/v10/gateway", None),
+])
+def test_route_for(url, route):
+    assert RateLimiter.route_for(url) == route
+
+
+def test_acquire_waits_for_the_next_window():
+    async def run():
+        limiter = RateLimiter(default_limit=2, default_window=0.2)
+        started = time.monotonic()
+        for _ in range(3):
+            await limiter.acquire("channels/1")
+        return time.monotonic() - started
+
+    # Two tokens in the first window, the third waits for the reset
+    assert 0.15 <= asyncio.run(run()) < 1.0
+
+
+def test_routes_have_separate_buckets():
+    async def run():
+        limiter = RateLimiter(default_limit=1, default_window=10)
+        await asyncio.wait_for(limiter.acquire("channels/1"), 0.5)
+        await asyncio.wait_for(limiter.acquire("channels/2"), 0.5)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(limiter.acquire("channels/1"), 0.1)
+
+    asyncio.run(run())
+
+
+def test_update_follows_headers_without_giving_tokens_back():
+    limiter = RateLimiter(default_limit=5, default_window=5)
+    limiter.update("channels/1", {
+        "X-RateLimit-Limit": "10",
+        "X-RateLimit-Remaining": "3",
+        "X-RateLimit-Reset-After": "2.5",
+    })
+    bucket = limiter._bucket("channels/1")
+    assert (bucket.limit, bucket.remaining) == (10, 3)
+    assert bucket.reset_at - time.monotonic() == pytest.approx(2.5, abs=0.1)
+
+    # A late response reporting more tokens than we have left is ignored
+    limiter.update("channels/1", {"X-RateLimit-Remaining": "9"})
+    assert bucket.remaining == 3
+
+    # Malformed headers leave the bucket alone
+    limiter.update("channels/1", {"X-RateLimit-Remaining": "many"})
+    assert bucket.remaining == 3
+
+
+def test_429_blocks_route_or_everything():
+    limiter = RateLimiter()
+    limiter.update("channels/1", {"Retry-After": "3"}, status=429)
+    bucket = limiter._bucket("channels/1")
+    assert bucket.remaining == 0
+    assert bucket.reset_at - time.monotonic() == pytest.approx(3, abs=0.1)
+    assert limiter._global_blocked_until == 0
+
+    limiter.update("channels/2", {"Retry-After": "1", "X-RateLimit-Global": "true"}, status=429)
+    assert limiter._global_blocked_until > time.monotonic()
+    assert limiter.rate_limited == 2
+
+
+def test_posting_queue_posts_and_retries_rate_limited_deals():
+    posted = []
+    calls = {}
+
+    async def post(deal):
+        calls[deal.asin] = calls.get(deal.asin, 0) + 1
+        if deal.asin == "B000000002" and calls[deal.asin] == 1:
+            raise discord.RateLimited(0.05)
+        return 1000 + len(calls)
+
+    async def run():
+        queue = PostingQueue(
+            post, route=None, rate_limiter=RateLimiter(), concurrency=2,
+            on_posted=lambda deal, name, message_id: posted.append((deal.asin, name, message_id)),
+        )
+        queue.start()
+        assert queue.submit(make_deal("B000000001"))
+        assert queue.submit(make_deal("B000000002"))
+        assert not queue.submit(make_deal("B000000001"))  # Already waiting
+        await asyncio.wait_for(queue.join(), 2)
+        await queue.stop()
+        return queue.get_stats()
+
+    stats = asyncio.run(run())
+    assert sorted(asin for asin, _, _ in posted) == ["B000000001", "B000000002"]
+    assert all(name == "default" and message_id for _, name, message_id in posted)
+    assert (stats["posted"], stats["retried"], stats["failed"]) == (2, 1, 0)
+
+
+def test_posting_queue_gives_up_after_max_retries():
+    async def post(deal):
+        raise discord.RateLimited(0.01)
+
+    async def run():
+        queue = PostingQueue(post, route=None, rate_limiter=RateLimiter(), max_retries=2)
+        queue.start()
+        queue.submit(make_deal("B000000001"))
+        await asyncio.wait_for(queue.join(), 2)
+        await queue.stop()
+        # The deal can be submitted again once it was dropped
+        assert queue.submit(make_deal("B000000001"))
+        return queue.get_stats()
+
+    stats = asyncio.run(run())
+    assert (stats["retried"], stats["failed"], stats["posted"]) == (2, 1, 0)
+
+
+async def post_nothing(deals):
+    return True
+
+
+def burst_queue(*queued) -> PostingQueue:
+    """Digest-enabled queue from 3 waiting deals, holding (deal, attempt) items"""
+    queue = PostingQueue(
+        post_nothing, route=None, rate_limiter=RateLimiter(),
+        post_batch=post_nothing, burst_threshold=3, solo_discount=70.0,
+    )
+    for item in queued:
+        queue._queue.put_nowait(item)
+    return queue
+
+
+def queued_items(queue: PostingQueue):
+    return [(deal.asin, attempt) for deal, attempt in queue._queue._queue]
+
+
+def test_below_burst_threshold_posts_alone():
+    queue = burst_queue((make_deal("B000000002"), 0))
+    assert queue._take_batch(make_deal("B000000001"), 1) == ([make_deal("B000000001")], 1)
+    assert queued_items(queue) == [("B000000002", 0)]
+
+
+def test_burst_digest_requeues_solo_deals_ahead():
+    queue = burst_queue(
+        (make_deal("B000000002"), 0),
+        (make_deal("B000000003", 90), 0),
+        (make_deal("B000000004"), 0),
+    )
+    batch, attempt = queue._take_batch(make_deal("B000000001"), 0)
+    assert [deal.asin for deal in batch] == ["B000000001", "B000000002", "B000000004"]
+    assert attempt == 0
+    assert queued_items(queue) == [("B000000003", 0)]
+    # A solo deal taken first is never coalesced
+    assert queue._take_batch(make_deal("B000000005", 75), 0)[0] == [make_deal("B000000005", 75)]
+
+
+def test_burst_digest_caps_embeds_and_requeues_overflow():
+    waiting = [(make_deal(f"B0000000{i:02d}"), 0) for i in range(2, 16)]
+    queue = burst_queue(*waiting, (make_deal("B000000099", 80), 0))
+    batch, _ = queue._take_batch(make_deal("B000000001"), 0)
+    assert len(batch) == 10
+    assert [deal.asin for deal in batch[1:]] == [deal.asin for deal, _ in waiting[:9]]
+    # The solo deal goes first, then the deals that did not fit, in order
+    assert queued_items(queue) == [("B000000099", 0)] + [(deal.asin, 0) for deal, _ in waiting[9:]]
+
+
+def test_burst_digest_keeps_the_highest_attempt():
+    queue = burst_queue((make_deal("B000000002"), 2), (make_deal("B000000003"), 1))
+    batch, attempt = queue._take_batch(make_deal("B000000001"), 0)
+    assert len(batch) == 3
+    # Deals already rate limited keep their retry budget inside the digest
+    assert attempt == 2
+
+
+def test_rate_limited_digest_gives_up_with_the_retried_deals():
+    calls = []
+
+    async def post_batch(deals):
+        calls.append(len(deals))
+        raise discord.RateLimited(0.01)
+
+    async def run():
+        queue = PostingQueue(
+            post_nothing, route=None, rate_limiter=RateLimiter(), max_retries=2,
+            post_batch=post_batch, burst_threshold=2,
+        )
+        queue.submit(make_deal("B000000001"))
+        # This deal already used up its retries as a solo post
+        queue._pending.add("B000000002")
+        queue._queue.put_nowait((make_deal("B000000002"), 2))
+        queue.start()
+        await asyncio.wait_for(queue.join(), 2)
+        await queue.stop()
+        return queue.get_stats()
+
+    stats = asyncio.run(run())
+    assert calls == [2]
+    assert (stats["retried"], stats["failed"]) == (0, 2)
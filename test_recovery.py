@@ -0,0 +1,166 @@
+"""
+Tests for the tiered browser recovery of the scraper engine
+Run with: python -m pytest test_recovery.py
+"""
+import asyncio
+
+import pytest
+
+import scraper
+from scraper import KeepaScraperEngine
+
+URLS = ["https://keepa.com/#!deals/1", "https://keepa.com/#!deals/2"]
+
+
+class StubPage:
+    """Page answering the health probe only when healthy"""
+
+    def __init__(self, healthy: bool, fixed_by_reload: bool = False):
+        self.healthy = healthy
+        self.fixed_by_reload = fixed_by_reload
+        self.closed = False
+
+    async def evaluate(self, script):
+        if not self.healthy:
+            raise RuntimeError("Target crashed")
+        return "complete"
+
+    async def reload(self, **kwargs):
+        self.healthy = self.healthy or self.fixed_by_reload
+
+    async def add_init_script(self, script):
+        pass
+
+    def is_closed(self) -> bool:
+        return self.closed
+
+    async def close(self):
+        self.closed = True
+
+
+class StubContext:
+    """Context whose new pages are healthy when the context is"""
+
+    def __init__(self, healthy: bool = True):
+        self.healthy = healthy
+        self.closed = False
+
+    async def new_page(self) -> StubPage:
+        return StubPage(self.healthy)
+
+    async def close(self):
+        self.closed = True
+
+
+class StubBrowser:
+    def __init__(self, connected: bool = True, contexts_healthy: bool = True):
+        self.connected = connected
+        self.contexts_healthy = contexts_healthy
+
+    def is_connected(self) -> bool:
+        return self.connected
+
+    async def new_context(self, **kwargs) -> StubContext:
+        return StubContext(self.contexts_healthy)
+
+
+def make_engine(monkeypatch, page_fixed_by_reload=False, context_healthy=False,
+                contexts_healthy=False, connected=True, **kwargs):
+    """
+    Engine with two failed pages sharing one stub context
+
+    restart() is replaced by a relaunch onto a healthy stub browser.
+    """
+    monkeypatch.setattr(scraper, "STEALTH_AVAILABLE", False)
+    engine = KeepaScraperEngine(URLS, max_contexts=1, **kwargs)
+    context = StubContext(context_healthy)
+    engine.contexts = [context]
+    if not engine.profile_dir:
+        engine.browser = StubBrowser(connected, contexts_healthy)
+    for source in engine.sources:
+        source.context = context
+        source.page = StubPage(False, page_fixed_by_reload)
+
+    async def restart():
+        engine.restarts += 1
+        engine.browser = StubBrowser()
+        engine._persistent_closed = False
+        engine.contexts = [StubContext()]
+        for source in engine.sources:
+            source.context = engine.contexts[0]
+            source.page = StubPage(True)
+
+    engine.restarts = 0
+    monkeypatch.setattr(engine, "restart", restart)
+    return engine
+
+
+def attempts(engine):
+    return {tier: stats["attempts"] for tier, stats in engine.recovery_stats.items() if stats["attempts"]}
+
+
+def test_reload_is_tried_first(monkeypatch):
+    engine = make_engine(monkeypatch, page_fixed_by_reload=True)
+    pages = [source.page for source in engine.sources]
+    assert asyncio.run(engine.recover()) == "reload"
+    assert [source.page for source in engine.sources] == pages
+    assert attempts(engine) == {"reload": 1}
+    stats = engine.recovery_stats["reload"]
+    assert stats["successes"] == 1 and stats["last_seconds"] == stats["total_seconds"] >= 0
+
+
+def test_new_page_keeps_the_context(monkeypatch):
+    engine = make_engine(monkeypatch, context_healthy=True)
+    context = engine.contexts[0]
+    old_page = engine.sources[0].page
+    assert asyncio.run(engine.recover(engine.sources[:1])) == "page"
+    assert old_page.closed and engine.sources[0].page is not old_page
+    assert engine.sources[0].context is context
+    # Only the failed source was touched
+    assert not engine.sources[1].page.healthy
+    assert attempts(engine) == {"reload": 1, "page": 1}
+    assert engine.recovery_stats["reload"]["successes"] == 0
+
+
+def test_new_context_replaces_every_page_sharing_it(monkeypatch):
+    engine = make_engine(monkeypatch, contexts_healthy=True)
+    old_context = engine.contexts[0]
+    assert asyncio.run(engine.recover(engine.sources[:1])) == "context"
+    assert old_context.closed
+    new_context, = engine.contexts
+    assert new_context is not old_context
+    assert all(source.context is new_context and source.page.healthy for source in engine.sources)
+    assert attempts(engine) == {"reload": 1, "page": 1, "context": 1}
+
+
+def test_relaunch_is_the_last_resort(monkeypatch):
+    engine = make_engine(monkeypatch)
+    assert asyncio.run(engine.recover()) == "browser"
+    assert engine.restarts == 1
+    assert attempts(engine) == {"reload": 1, "page": 1, "context": 1, "browser": 1}
+    assert engine.recovery_stats["browser"]["successes"] == 1
+
+
+def test_disconnected_browser_is_relaunched_directly(monkeypatch):
+    engine = make_engine(monkeypatch, page_fixed_by_reload=True, connected=False)
+    assert asyncio.run(engine.recover()) == "browser"
+    assert attempts(engine) == {"browser": 1}
+
+
+def test_persistent_profile_skips_the_context_tier(monkeypatch, tmp_path):
+    engine = make_engine(monkeypatch, profile_dir=str(tmp_path))
+    assert asyncio.run(engine.recover()) == "browser"
+    assert attempts(engine) == {"reload": 1, "page": 1, "browser": 1}
+
+
+def test_recovery_fails_when_every_tier_fails(monkeypatch):
+    engine = make_engine(monkeypatch)
+
+    async def failed_restart():
+        engine.restarts += 1
+
+    monkeypatch.setattr(engine, "restart", failed_restart)
+    with pytest.raises(RuntimeError):
+        asyncio.run(engine.recover())
+    assert attempts(engine) == {"reload": 1, "page": 1, "context": 1, "browser": 1}
+    assert not any(stats["successes"] for stats in engine.recovery_stats.values())
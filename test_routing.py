@@ -0,0 +1,68 @@
+"""
+Tests for routing deals to several channels and webhooks
+Run with: python -m pytest test_routing.py
+"""
+import os
+
+import pytest
+
+from conftest import make_deal
+from routing import DealRouter, Route
+
+
+def test_route_needs_exactly_one_destination():
+    with pytest.raises(ValueError):
+        Route(name="none")
+    with pytest.raises(ValueError):
+        Route(name="both", channel_id=1, webhook_url="https://discord.com/api/webhooks/1/a")
+    assert Route(name="channel", channel_id="123").channel_id == 123
+
+
+@pytest.mark.parametrize("discount, bands", [
+    (49.9, []),
+    (50.0, ["50-70"]),
+    (69.9, ["50-70"]),
+    (70.0, ["70+"]),  # The upper bound is exclusive: one band only
+    (100.0, ["70+"]),
+])
+def test_adjacent_discount_bands_never_overlap(discount, bands):
+    router = DealRouter([
+        Route(name="50-70", channel_id=1, min_discount=50, max_discount=70),
+        Route(name="70+", channel_id=2, min_discount=70),
+    ])
+    assert [route.name for route in router.route(make_deal(discount=discount))] == bands
+
+
+def test_price_and_keyword_criteria():
+    route = Route(
+        name="tech", channel_id=1, min_price=10, max_price=100,
+        keywords=["SSD", "Écran"], exclude_keywords=["Coque"],
+    )
+    assert route.matches(make_deal(title="Samsung ssd 1 To"))
+    assert route.matches(make_deal(title="écran 27 pouces"))
+    assert not route.matches(make_deal(title="Coque pour SSD"))
+    assert not route.matches(make_deal(title="Clavier"))
+    assert not route.matches(make_deal(title="SSD", price=5))
+    assert not route.matches(make_deal(title="SSD", price=150))
+
+
+def test_router_counts_matched_and_unrouted():
+    router = DealRouter([Route(name="big", channel_id=1, min_discount=60)])
+    router.route(make_deal(discount=65))
+    router.route(make_deal(discount=30))
+    assert router.matched == {"big": 1}
+    assert router.unrouted == 1
+
+
+def test_router_rejects_duplicate_names():
+    with pytest.raises(ValueError):
+        DealRouter([Route(name="a", channel_id=1), Route(name="a", channel_id=2)])
+
+
+def test_example_file_loads():
+    example = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'routes.json.example')
+    router = DealRouter.from_file(example)
+    assert router.channel_ids and router.webhook_urls
+    # A 70% deal goes to the 70+ route only, not to 50-70 as well
+    names = [route.name for route in router.route(make_deal(discount=70.0, price=50.0, title="Casque"))]
+    assert names == ["erreurs-70"]
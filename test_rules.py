@@ -0,0 +1,112 @@
+"""
+Tests for the columnar deal filtering rules
+Run with: python -m pytest test_rules.py
+"""
+import json
+import os
+
+import numpy as np
+import pytest
+
+from rules import RuleSet, arrays_to_columns, rows_to_columns
+
+
+def columns(*deals):
+    """Columns from (asin, title, current price, average price) tuples"""
+    return rows_to_columns([
+        {
+            "asin": asin,
+            "title": title,
+            "currentPrice": current,
+            "averagePrice": average,
+            "discountPercent": (average - current) / average * 100 if current and average else 0,
+        }
+        for asin, title, current, average in deals
+    ])
+
+
+def test_rows_to_columns_fills_missing_values():
+    data = rows_to_columns([{"asin": "B000000001", "title": None, "currentPrice": None}])
+    assert data['current_price'].tolist() == [0.0]
+    assert data['average_price'].dtype == np.float64
+    assert data['title'].tolist() == ['']
+
+
+def test_arrays_to_columns_derives_discount_and_urls():
+    data = arrays_to_columns({
+        "asin": ["B000000001", "B000000002"],
+        "title": ["One", "Two"],
+        "currentPrice": [25.0, 0],
+        "averagePrice": [100.0, 50.0],
+        "productUrl": ["", "https://www.amazon.fr/dp/B000000002?th=1"],
+    })
+    assert data['discount_percent'].tolist() == [75.0, 0.0]
+    assert data['product_url'].tolist() == [
+        "https://www.amazon.fr/dp/B000000001",
+        "https://www.amazon.fr/dp/B000000002?th=1",
+    ]
+    assert data['image_url'].tolist() == ['', '']
+
+
+def test_base_discount_falls_back_to_scraper_value():
+    deals = columns(("B000000001", "A", 60, 100), ("B000000002", "B", 40, 100))
+    assert RuleSet().evaluate(deals, 50).tolist() == [False, True]
+    assert RuleSet(min_discount=30).evaluate(deals, 50).tolist() == [True, True]
+
+
+def test_discount_tiers_apply_to_first_matching_band():
+    rules = RuleSet(
+        min_discount=40,
+        discount_tiers=[{"max_price": 100, "min_discount": 55}, {"max_price": 20, "min_discount": 70}],
+    )
+    deals = columns(
+        ("B000000001", "Cheap, 60% off", 8, 20),  # <= 20: needs 70%
+        ("B000000002", "Cheap, 75% off", 5, 20),
+        ("B000000003", "Mid, 50% off", 50, 100),  # <= 100: needs 55%
+        ("B000000004", "Mid, 60% off", 40, 100),
+        ("B000000005", "Dear, 45% off", 550, 1000),  # Base 40%
+    )
+    assert rules.evaluate(deals, 0).tolist() == [False, True, False, True, True]
+
+
+def test_price_and_savings_bounds():
+    rules = RuleSet(min_discount=0, min_price=5, max_price=500, min_savings=10)
+    deals = columns(
+        ("B000000001", "Too cheap", 4, 40),
+        ("B000000002", "Too dear", 600, 1200),
+        ("B000000003", "Small saving", 10, 15),
+        ("B000000004", "Fine", 50, 100),
+    )
+    assert rules.evaluate(deals, 0).tolist() == [False, False, False, True]
+
+
+def test_keywords_are_case_insensitive():
+    rules = RuleSet(min_discount=0, include_keywords=["SSD", "écran"], exclude_keywords=["Reconditionné"])
+    deals = columns(
+        ("B000000001", "Samsung ssd 2 To", 50, 100),
+        ("B000000002", "ÉCRAN 27 pouces", 50, 100),
+        ("B000000003", "SSD reconditionné", 50, 100),
+        ("B000000004", "Clavier", 50, 100),
+    )
+    assert rules.evaluate(deals, 0).tolist() == [True, True, False, False]
+
+
+def test_blocked_asins():
+    rules = RuleSet(min_discount=0, blocked_asins=["b000000002"])
+    deals = columns(("B000000001", "A", 50, 100), ("B000000002", "B", 50, 100))
+    assert rules.evaluate(deals, 0).tolist() == [True, False]
+
+
+def test_empty_batch():
+    assert RuleSet(include_keywords=["ssd"]).evaluate(rows_to_columns([]), 40).tolist() == []
+
+
+def test_example_file_loads(tmp_path):
+    example = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rules.json.example')
+    rules = RuleSet.from_file(example)
+    assert [tier.max_price for tier in rules.discount_tiers] == sorted(t.max_price for t in rules.discount_tiers)
+
+    path = tmp_path / 'rules.json'
+    path.write_text(json.dumps({"min_discount": 50, "unknown": 1}), encoding='utf-8')
+    with pytest.raises(TypeError):
+        RuleSet.from_file(str(path))
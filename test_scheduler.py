@@ -0,0 +1,185 @@
+"""
+Tests for the adaptive scrape scheduler, KEEPA_URLS parsing and multi-page scraping
+Run with: python -m pytest test_scheduler.py
+"""
+import asyncio
+import time
+from datetime import datetime
+
+import pytest
+
+from conftest import make_deal
+from main import parse_keepa_urls
+from scheduler import AdaptiveScheduler, parse_hours
+from scraper import DealSource, KeepaScraperEngine
+
+NOON = datetime(2024, 1, 1, 12)
+NIGHT = datetime(2024, 1, 1, 3)
+
+
+def make_scheduler(**kwargs) -> AdaptiveScheduler:
+    """Scheduler without jitter, so intervals are exact"""
+    kwargs.setdefault('jitter', 0.0)
+    return AdaptiveScheduler(**kwargs)
+
+
+def test_parse_hours_ranges_and_wrap():
+    assert parse_hours("1-3,5") == {1, 2, 3, 5}
+    assert parse_hours("23-1") == {23, 0, 1}
+    assert parse_hours(" 7 , ,24") == {7, 0}
+    assert parse_hours("") == set()
+
+
+def test_no_yield_keeps_base_interval():
+    scheduler = make_scheduler(base_interval=300)
+    assert scheduler.record(0, now=NOON) == 300
+
+
+def test_yield_shrinks_interval_within_bounds():
+    scheduler = make_scheduler(base_interval=300, min_interval=60, yield_alpha=1.0, yield_target=1.0)
+    # One new deal per cycle at the target halves the interval
+    assert scheduler.record(1, now=NOON) == pytest.approx(150)
+    # A burst cannot go below min_interval
+    assert scheduler.record(100, now=NOON) == 60
+
+
+def test_errors_back_off_and_reset():
+    scheduler = make_scheduler(base_interval=100, max_interval=10_000, max_backoff_steps=3)
+    assert scheduler.record(0, errors=1, now=NOON) == 200
+    assert scheduler.record(0, errors=1, now=NOON) == 400
+    assert scheduler.record(0, errors=1, now=NOON) == 800
+    # Capped at max_backoff_steps doublings
+    assert scheduler.record(0, errors=1, now=NOON) == 800
+    assert scheduler.record(0, now=NOON) == 100
+
+
+def test_challenges_back_off_twice_as_fast():
+    scheduler = make_scheduler(base_interval=100, max_interval=10_000)
+    assert scheduler.record(0, challenges=1, now=NOON) == 400
+    assert scheduler.get_stats()["backoff_steps"] == 2
+
+
+def test_backoff_stays_below_max_interval():
+    scheduler = make_scheduler(base_interval=300, max_interval=1000)
+    for _ in range(5):
+        interval = scheduler.record(0, errors=1, now=NOON)
+    assert interval == 1000
+
+
+def test_quiet_hours_stretch_interval():
+    scheduler = make_scheduler(base_interval=100, quiet_hours={3}, quiet_factor=3.0)
+    assert scheduler.record(0, now=NIGHT) == 300
+    assert scheduler.record(0, now=NOON) == 100
+
+
+def test_hour_activity_needs_history():
+    scheduler = make_scheduler(base_interval=100, min_interval=10, yield_alpha=0.0)
+    # Below twelve hours of history every hour gets the base interval
+    for hour in range(11):
+        assert scheduler.record(4 if hour == 0 else 1, now=datetime(2024, 1, 1, hour)) == pytest.approx(100)
+    scheduler.record(1, now=datetime(2024, 1, 1, 11))
+
+    # The busy hour is scanned twice as often, a dead hour half as often (both clamped)
+    assert scheduler.record(4, now=datetime(2024, 1, 1, 0)) == pytest.approx(50)
+    assert scheduler.record(0, now=datetime(2024, 1, 1, 20)) == pytest.approx(200)
+
+
+def test_jitter_stays_within_fraction():
+    scheduler = AdaptiveScheduler(base_interval=100, min_interval=1, jitter=0.1)
+    for _ in range(50):
+        assert 90 <= scheduler.record(0, now=NOON) <= 110
+
+
+def test_seconds_until_next_measures_from_cycle_start(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr('scheduler.time.monotonic', lambda: clock[0])
+    scheduler = make_scheduler(base_interval=300)
+    assert scheduler.seconds_until_next() == 0
+
+    scheduler.cycle_started()
+    clock[0] += 120  # The cycle itself took two minutes
+    scheduler.record(0, now=NOON)
+    assert scheduler.seconds_until_next() == pytest.approx(180)
+
+    clock[0] += 400  # Overran the interval
+    assert scheduler.seconds_until_next() == 0
+
+
+def test_source_without_interval_follows_full_cycles():
+    source = DealSource(url="https://keepa.com/#!deals/4")
+    assert source.is_due(0.0, full_cycle=True)
+    assert not source.is_due(1e9, full_cycle=False)
+
+
+def test_source_with_interval_waits_for_next_due():
+    source = DealSource(url="https://keepa.com/#!deals/4", interval=60, next_due=100.0)
+    assert not source.is_due(99.0)
+    assert source.is_due(100.0, full_cycle=False)
+    assert source.is_due(150.0, full_cycle=True)
+
+
+def test_parse_keepa_urls_with_intervals():
+    urls, intervals = parse_keepa_urls(
+        " https://keepa.com/#!deals/4 ,https://keepa.com/#!deals/6|120, ,https://keepa.com/#!deals/8 | 30.5"
+    )
+    assert urls == ["https://keepa.com/#!deals/4", "https://keepa.com/#!deals/6", "https://keepa.com/#!deals/8"]
+    assert intervals == {
+        "https://keepa.com/#!deals/4": None,
+        "https://keepa.com/#!deals/6": 120.0,
+        "https://keepa.com/#!deals/8": 30.5,
+    }
+
+
+def test_parse_keepa_urls_default_interval_and_duplicates():
+    urls, intervals = parse_keepa_urls("https://keepa.com/#!deals/4|,https://keepa.com/#!deals/4|60", 300)
+    # The first entry of a URL wins; an empty interval takes the default
+    assert urls == ["https://keepa.com/#!deals/4"]
+    assert intervals == {"https://keepa.com/#!deals/4": 300}
+    assert parse_keepa_urls("") == ([], {})
+    with pytest.raises(ValueError):
+        parse_keepa_urls("https://keepa.com/#!deals/4|soon")
+
+
+def stub_engine(monkeypatch, pages, url_intervals=None) -> KeepaScraperEngine:
+    """Engine whose sources yield the given chunks of ASINs instead of browsing"""
+    engine = KeepaScraperEngine(list(pages), url_intervals=url_intervals)
+    for source in engine.sources:
+        source.page = object()  # Skips initialize()
+
+    async def navigate(source=None):
+        pass
+
+    async def extract(min_discount, source, chunk_size):
+        for chunk in pages[source.url]:
+            yield [make_deal(asin) for asin in chunk]
+
+    monkeypatch.setattr(engine, "navigate_to_deals", navigate)
+    monkeypatch.setattr(engine, "extract_deals_stream", extract)
+    return engine
+
+
+def test_scrape_deals_merges_pages_by_asin(monkeypatch):
+    engine = stub_engine(monkeypatch, {
+        "https://keepa.com/#!deals/4": [["B000000001", "B000000002"], ["B000000003"]],
+        "https://keepa.com/#!deals/6": [["B000000002", "B000000004"], ["B000000001"]],
+    })
+    asins = [deal.asin for deal in asyncio.run(engine.scrape_deals())]
+    assert sorted(asins) == ["B000000001", "B000000002", "B000000003", "B000000004"]
+    assert engine.cycle_stats == {"sources": 2, "deals": 4, "failures": 0, "challenges": 0}
+
+
+def test_early_wake_scrapes_only_sources_with_their_own_interval(monkeypatch):
+    pages = {
+        "https://keepa.com/#!deals/4": [["B000000001"]],
+        "https://keepa.com/#!deals/6": [["B000000002"]],
+    }
+    engine = stub_engine(monkeypatch, pages, url_intervals={"https://keepa.com/#!deals/6": 60})
+
+    async def wake():
+        return [deal.asin async for chunk in engine.scrape_deals_stream(full_cycle=False) for deal in chunk]
+
+    started = time.monotonic()
+    assert asyncio.run(wake()) == ["B000000002"]
+    # The next scan of the page is due one interval after this one started
+    assert engine.sources[1].next_due == pytest.approx(started + 60, abs=1)
+    assert engine.sources[0].next_due == 0.0
@@ -0,0 +1,99 @@
+"""
+Tests for tracing spans and their log file
+Run with: python -m pytest test_tracing.py
+"""
+import json
+import logging
+
+import pytest
+
+import logs
+import tracing
+
+
+@pytest.fixture
+def trace_file(tmp_path):
+    """Trace to a small rotating file, and turn tracing off afterwards"""
+    path = tmp_path / "traces.jsonl"
+    tracing.configure_tracing(str(path), max_bytes=4096, backup_count=2)
+    yield path
+    logs.stop_logging()
+    for handler in tracing.trace_logger.handlers[:]:
+        tracing.trace_logger.removeHandler(handler)
+    tracing._enabled = False
+
+
+def read_spans(path):
+    # Spans are written by the listener thread: stop it to flush them
+    logs.stop_logging()
+    return [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+
+
+def test_spans_nest_within_a_cycle(trace_file):
+    with tracing.trace_cycle(page="p1"):
+        with tracing.span("scraper.evaluate", rows=3):
+            pass
+
+    spans = read_spans(trace_file)
+    assert [record["span"] for record in spans] == ["scraper.evaluate", "cycle"]
+    evaluate, outer = spans
+    assert evaluate["cycle"] == outer["cycle"] is not None
+    assert evaluate["parent"] == outer["id"]
+    assert evaluate["rows"] == 3
+    assert outer["page"] == "p1"
+
+
+def test_failed_span_reports_error(trace_file):
+    with pytest.raises(RuntimeError):
+        with tracing.span("posting.post"):
+            raise RuntimeError("boom")
+    record, = read_spans(trace_file)
+    assert record["status"] == "error"
+
+
+def test_spans_rotate_and_stay_out_of_other_loggers(trace_file):
+    root = logging.getLogger()
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    root.addHandler(handler)
+    try:
+        for i in range(200):
+            with tracing.span("cache.add", i=i):
+                pass
+    finally:
+        root.removeHandler(handler)
+    logs.stop_logging()
+
+    assert sorted(path.name for path in trace_file.parent.iterdir()) == [
+        "traces.jsonl", "traces.jsonl.1", "traces.jsonl.2",
+    ]
+    assert not [record for record in records if record.name == logs.TRACE_LOGGER]
+
+
+def test_spans_share_the_log_listener(tmp_path):
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    log_path, trace_path = tmp_path / "app.log", tmp_path / "traces.jsonl"
+    try:
+        logs.setup_logging(path=str(log_path), sample_rate=0)
+        tracing.configure_tracing(str(trace_path))
+        # Spans go through the root queue handler, drained by the one listener thread
+        assert tracing.trace_logger.handlers == root.handlers
+
+        logging.getLogger("scraper").info("Cycle done")
+        with tracing.span("scraper.navigate"):
+            pass
+        logs.stop_logging()
+    finally:
+        for handler in tracing.trace_logger.handlers[:]:
+            tracing.trace_logger.removeHandler(handler)
+        tracing._enabled = False
+        root.handlers[:] = saved_handlers
+        root.setLevel(saved_level)
+
+    assert "Cycle done" in log_path.read_text(encoding='utf-8')
+    assert "scraper.navigate" not in log_path.read_text(encoding='utf-8')
+    assert [json.loads(line)["span"] for line in trace_path.read_text(encoding='utf-8').splitlines()] == [
+        "scraper.navigate"
+    ]
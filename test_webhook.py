@@ -0,0 +1,152 @@
+"""
+Tests for the webhook publisher against a local fake of the Discord API
+Run with: python -m pytest test_webhook.py
+"""
+import asyncio
+
+from aiohttp import web
+
+from conftest import make_deal
+from posting import RateLimiter
+from webhook import WebhookPublisher
+
+
+class FakeDiscord:
+    """
+    Local webhook endpoints recording every request
+
+    The webhook token picks the behaviour: "ok" accepts, "limited" answers
+    429 to its first `limited` requests, "broken" always fails. Messages
+    posted to a webhook get the ID in MESSAGE_IDS.
+    """
+
+    MESSAGE_IDS = {"ok": "111", "limited": "222"}
+
+    def __init__(self, limited: int = 0):
+        self.limited = limited
+        self.requests = []
+        self._runner = None
+        self.base_url = ""
+
+    async def _webhook(self, request: web.Request) -> web.Response:
+        token = request.match_info['token']
+        self.requests.append((request.method, request.path, dict(request.query), await request.json()))
+        if token == "broken":
+            return web.Response(status=500, text="boom")
+        if token == "limited" and self.limited:
+            self.limited -= 1
+            return web.json_response({"retry_after": 0.01}, status=429, headers={"Retry-After": "0.01"})
+        message_id = request.match_info.get('message_id', self.MESSAGE_IDS[token])
+        # Discord only returns the message when asked to wait for it
+        if request.method == "POST" and request.query.get("wait") != "true":
+            return web.Response(status=204)
+        return web.json_response({"id": message_id})
+
+    def url(self, token: str) -> str:
+        return f"{self.base_url}/api/webhooks/1/{token}"
+
+    async def __aenter__(self) -> 'FakeDiscord':
+        app = web.Application()
+        app.router.add_post('/api/webhooks/{id}/{token}', self._webhook)
+        app.router.add_patch('/api/webhooks/{id}/{token}/messages/{message_id}', self._webhook)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        self.base_url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self._runner.cleanup()
+
+
+def run_publisher(scenario, limited: int = 0, max_retries: int = 3):
+    """Run scenario(publisher, discord) against a fresh fake Discord"""
+    async def run():
+        async with FakeDiscord(limited) as discord:
+            # Short windows: a 429 blocks the route until its window resets
+            limiter = RateLimiter(default_window=0.05)
+            publisher = WebhookPublisher([discord.url("ok")], limiter, max_retries=max_retries)
+            try:
+                return await scenario(publisher, discord), discord
+            finally:
+                await publisher.close()
+
+    return asyncio.run(run())
+
+
+def test_post_deal_waits_for_the_message_id():
+    async def scenario(publisher, discord):
+        return await publisher.post_deal(make_deal())
+
+    message_id, discord = run_publisher(scenario)
+    assert message_id == 111
+    (method, path, query, payload), = discord.requests
+    assert (method, path, query) == ("POST", "/api/webhooks/1/ok", {"wait": "true"})
+    assert payload["username"] == "Amazon Price Monitor"
+    assert "B000000001" in str(payload["embeds"][0])
+
+
+def test_post_deal_uses_the_first_webhook_that_accepted_it():
+    async def scenario(publisher, discord):
+        return await publisher.post_deal(make_deal(), webhook_urls=[discord.url("broken"), discord.url("ok")])
+
+    message_id, discord = run_publisher(scenario)
+    assert message_id == 111
+    assert sorted(path for _, path, _, _ in discord.requests) == ["/api/webhooks/1/broken", "/api/webhooks/1/ok"]
+
+
+def test_429_is_retried_after_retry_after():
+    async def scenario(publisher, discord):
+        return await publisher.post_deal(make_deal(), webhook_urls=[discord.url("limited")])
+
+    message_id, discord = run_publisher(scenario, limited=2)
+    assert message_id == 222
+    assert len(discord.requests) == 3
+
+
+def test_gives_up_after_max_retries():
+    async def scenario(publisher, discord):
+        message_id = await publisher.post_deal(make_deal(), webhook_urls=[discord.url("limited")])
+        return message_id, publisher.rate_limiter.rate_limited
+
+    (message_id, rate_limited), discord = run_publisher(scenario, limited=10, max_retries=2)
+    assert message_id is None
+    assert len(discord.requests) == 3
+    assert rate_limited == 3
+
+
+def test_edit_deal_patches_the_message():
+    async def scenario(publisher, discord):
+        return await publisher.edit_deal(make_deal(), 42, previous_price=60.0)
+
+    edited, discord = run_publisher(scenario)
+    assert edited
+    (method, path, query, payload), = discord.requests
+    # Edits do not ask Discord to wait: the message already exists
+    assert (method, path, query) == ("PATCH", "/api/webhooks/1/ok/messages/42", {})
+    assert payload["embeds"]
+
+
+def test_post_digest_sends_one_message_with_every_embed():
+    async def scenario(publisher, discord):
+        deals = [make_deal(f"B00000000{i}") for i in range(1, 4)]
+        return await publisher.post_digest(deals, webhook_urls=[discord.url("ok"), discord.url("broken")])
+
+    success, discord = run_publisher(scenario)
+    assert success
+    posted = [payload for _, path, _, payload in discord.requests if path.endswith("/ok")]
+    assert len(posted) == 1 and len(posted[0]["embeds"]) == 3
+
+
+def test_failed_webhooks_return_nothing():
+    async def scenario(publisher, discord):
+        broken = [discord.url("broken")]
+        return (
+            await publisher.post_deal(make_deal(), webhook_urls=broken),
+            await publisher.post_digest([make_deal()], webhook_urls=broken),
+            await publisher.edit_deal(make_deal(), 42, 60.0, webhook_urls=broken),
+        )
+
+    results, _ = run_publisher(scenario)
+    assert results == (None, False, False)
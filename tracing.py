@@ -0,0 +1,248 @@
+"""
+Per-stage tracing spans and opt-in cycle profiling
+Spans are written as JSON lines tagged with the scraping cycle they belong to
+"""
+import cProfile
+import functools
+import inspect
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import pstats
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Spans go to their own logger so they never mix with the text logs
+trace_logger = logging.getLogger("trace")
+trace_logger.propagate = False
+
+_enabled = False
+_span_ids = itertools.count(1)
+_cycle_id: ContextVar[Optional[str]] = ContextVar("cycle_id", default=None)
+_parent_span: ContextVar[Optional[int]] = ContextVar("parent_span", default=None)
+
+
+def configure_tracing(path: str, max_bytes: int = 50 * 1024 * 1024, backup_count: int = 5) -> None:
+    """
+    Write spans to a rotating JSON lines file, from the logging thread
+
+    Args:
+        path: File the spans are appended to
+        max_bytes: File size that triggers a rotation (0 = never rotate)
+        backup_count: Rotated files kept
+    """
+    # Imported here: logs reads the cycle IDs of this module
+    from logs import route_trace
+
+    global _enabled
+    handler = logging.handlers.RotatingFileHandler(
+        path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+    )
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    route_trace(handler)
+    trace_logger.setLevel(logging.INFO)
+    _enabled = True
+    logger.info(f"Tracing spans to {path}")
+
+
+def current_cycle() -> Optional[str]:
+    """Get the ID of the cycle the current task runs in"""
+    return _cycle_id.get()
+
+
+@contextmanager
+def bind_cycle(cycle_id: Optional[str]) -> Iterator[None]:
+    """
+    Attribute spans to a cycle started in another task
+
+    Args:
+        cycle_id: ID returned by current_cycle() where the work was queued
+    """
+    token = _cycle_id.set(cycle_id)
+    try:
+        yield
+    finally:
+        _cycle_id.reset(token)
+
+
+class Span:
+    """
+    Timed section of work, emitted as one JSON line when it ends
+
+    Spans nest: a span opened while another is active in the same task
+    (or in a task created from it) records it as its parent. When tracing
+    is not configured, entering and leaving a span only checks a flag.
+    """
+    __slots__ = ('name', 'attrs', '_id', '_token', '_started', '_timestamp')
+
+    def __init__(self, name: str, **attrs):
+        self.name = name
+        self.attrs = attrs
+        self._token = None
+
+    def set(self, **attrs) -> None:
+        """Add attributes known only once the work is done"""
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> 'Span':
+        if not _enabled:
+            return self
+        self._id = next(_span_ids)
+        self._token = _parent_span.set(self._id)
+        self._timestamp = time.time()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if self._token is None:
+            return False
+        duration = time.perf_counter() - self._started
+        _parent_span.reset(self._token)
+        self._token = None
+
+        record = {
+            "ts": round(self._timestamp, 3),
+            "cycle": _cycle_id.get(),
+            "span": self.name,
+            "id": self._id,
+            "parent": _parent_span.get(),
+            "duration_ms": round(duration * 1000, 3),
+            "status": "error" if exc_type else "ok",
+        }
+        if exc_type:
+            record["error"] = exc_type.__name__
+        record.update(self.attrs)
+        trace_logger.info(json.dumps(record, default=str))
+        return False
+
+
+def span(name: str, **attrs) -> Span:
+    """
+    Open a span as a context manager
+
+    Args:
+        name: Stage name, dotted by component (e.g. "scraper.navigate")
+        **attrs: Attributes added to the JSON record
+
+    Returns:
+        Span to use in a with statement
+    """
+    return Span(name, **attrs)
+
+
+def traced(name: str) -> Callable:
+    """
+    Decorator running every call of a function or coroutine in a span
+
+    Args:
+        name: Span name
+
+    Returns:
+        Decorator
+    """
+    def decorator(function: Callable) -> Callable:
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                with Span(name):
+                    return await function(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with Span(name):
+                return function(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+class CycleProfiler:
+    """
+    Profiles the next N scraping cycles with cProfile
+
+    The profiler sees everything the event loop runs during the cycle,
+    including the posting workers, since they share the thread.
+    """
+
+    def __init__(self, cycles: int, directory: str = 'profiles', top: int = 40):
+        """
+        Initialize the profiler
+
+        Args:
+            cycles: Number of cycles left to profile
+            directory: Directory receiving the .prof dumps and text summaries
+            top: Functions listed in the text summary
+        """
+        self.remaining = max(0, cycles)
+        self.directory = directory
+        self.top = top
+
+    @contextmanager
+    def profile(self, cycle_id: str) -> Iterator[None]:
+        """
+        Profile the with block if cycles are left
+
+        Args:
+            cycle_id: Cycle ID, used to name the dump
+        """
+        if self.remaining <= 0:
+            yield
+            return
+
+        self.remaining -= 1
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            self._dump(profiler, cycle_id)
+
+    def _dump(self, profiler: cProfile.Profile, cycle_id: str) -> None:
+        """Write the binary stats and a cumulative-time summary"""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            base = os.path.join(self.directory, f"cycle-{cycle_id}")
+            profiler.dump_stats(f"{base}.prof")
+            with open(f"{base}.txt", 'w', encoding='utf-8') as f:
+                stats = pstats.Stats(profiler, stream=f)
+                stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top)
+            logger.info(f"Profile of cycle {cycle_id} written to {base}.prof ({self.remaining} cycles left)")
+        except Exception as e:
+            logger.error(f"Failed to write profile of cycle {cycle_id}: {e}")
+
+
+@contextmanager
+def trace_cycle(profiler: Optional[CycleProfiler] = None, **attrs) -> Iterator[Span]:
+    """
+    Run a scraping cycle under a new cycle ID
+
+    Every span opened inside, including in tasks created from it, is tagged
+    with the cycle ID.
+
+    Args:
+        profiler: Profiles the cycle while it has cycles left
+        **attrs: Attributes of the cycle span
+
+    Yields:
+        The cycle span, to attach results with set()
+    """
+    cycle_id = uuid.uuid4().hex[:12]
+    token = _cycle_id.set(cycle_id)
+    try:
+        with Span("cycle", **attrs) as cycle:
+            if profiler:
+                with profiler.profile(cycle_id):
+                    yield cycle
+            else:
+                yield cycle
+    finally:
+        _cycle_id.reset(token)
@@ -0,0 +1,238 @@
+"""
+Discord webhook publisher
+Posts deals without a gateway connection over a pooled aiohttp session
+"""
+import asyncio
+import logging
+from typing import List, Optional, Sequence
+
+import aiohttp
+from discord import Embed
+
+from bot import create_deal_embed, create_digest_embed, create_status_embed, create_update_embed
+from posting import RateLimiter
+from scraper import Deal
+
+logger = logging.getLogger(__name__)
+
+
+def add_link_field(embed: Embed, deal: Deal) -> Embed:
+    """
+    Add the deal links as an embed field
+
+    Webhooks cannot attach the bot's link buttons, so the same links are
+    rendered as markdown instead.
+
+    Args:
+        embed: Embed to extend
+        deal: Deal object
+
+    Returns:
+        The same embed
+    """
+    embed.add_field(
+        name="🔗 Links",
+        value=(
+            f"[🛒 BuyBox]({deal.amazon_cart_url}) • "
+            f"[🔍 Lookup]({deal.lookup_url}) • "
+            f"[📈 Keepa]({deal.keepa_url})"
+        ),
+        inline=False
+    )
+    return embed
+
+
+class WebhookPublisher:
+    """
+    Posts deal embeds to one or more Discord webhooks
+
+    A single ClientSession is kept open for the lifetime of the publisher
+    so connections to Discord are reused, and every webhook is posted to
+    in parallel. Each webhook has its own rate limit bucket, fed from the
+    response headers through the shared RateLimiter.
+    """
+
+    def __init__(
+        self,
+        webhook_urls: Sequence[str],
+        rate_limiter: RateLimiter,
+        username: str = "Amazon Price Monitor",
+        max_retries: int = 3,
+        timeout: float = 15.0
+    ):
+        """
+        Initialize the webhook publisher
+
+        Args:
+            webhook_urls: Discord webhook URLs to post to
+            rate_limiter: Shared rate limiter
+            username: Name displayed on webhook messages
+            max_retries: Retries for a rate-limited post
+            timeout: Request timeout in seconds
+        """
+        self.webhook_urls = list(webhook_urls)
+        self.rate_limiter = rate_limiter
+        self.username = username
+        self.max_retries = max_retries
+        self.timeout = timeout
+
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self) -> None:
+        """Open the pooled HTTP session"""
+        if self.session and not self.session.closed:
+            return
+        connector = aiohttp.TCPConnector(limit_per_host=max(len(self.webhook_urls) * 2, 4), ttl_dns_cache=300)
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            trace_configs=[self.rate_limiter.trace_config()]
+        )
+        logger.info(f"Webhook publisher ready ({len(self.webhook_urls)} webhooks)")
+
+    async def close(self) -> None:
+        """Close the HTTP session"""
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+    async def _execute(self, url: str, payload: dict, method: str = "POST") -> Optional[dict]:
+        """
+        Execute one webhook request, waiting out rate limits
+
+        Args:
+            url: Webhook URL (or the URL of one of its messages for PATCH)
+            payload: Message JSON
+            method: POST to send a message, PATCH to edit one
+
+        Returns:
+            The message returned by Discord, None on failure
+        """
+        route = self.rate_limiter.route_for(url)
+        # wait=true makes Discord return the created message, and with it its ID
+        params = {"wait": "true"} if method == "POST" else None
+
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire(route)
+            try:
+                async with self.session.request(method, url, params=params, json=payload) as response:
+                    if response.status == 429:
+                        # The trace config already blocked the route for Retry-After
+                        continue
+                    if response.status >= 400:
+                        logger.error(f"Webhook {route} returned {response.status}: {await response.text()}")
+                        return None
+                    return await response.json()
+
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                logger.error(f"Webhook {route} request failed: {e}")
+                return None
+
+        logger.error(f"Giving up on webhook {route} after {self.max_retries + 1} rate-limited attempts")
+        return None
+
+    async def _publish(self, payload: dict, webhook_urls: Optional[Sequence[str]] = None) -> List[Optional[dict]]:
+        """
+        Post a message to several webhooks in parallel
+
+        Args:
+            payload: Message JSON
+            webhook_urls: Webhooks to post to (defaults to every configured webhook)
+
+        Returns:
+            The message returned by each webhook, None where posting failed
+        """
+        if not self.session:
+            await self.start()
+
+        payload = {"username": self.username, **payload}
+        urls = webhook_urls or self.webhook_urls
+        return await asyncio.gather(*(self._execute(url, payload) for url in urls))
+
+    async def post_deal(self, deal: Deal, webhook_urls: Optional[Sequence[str]] = None) -> Optional[int]:
+        """
+        Post a deal to every webhook
+
+        Args:
+            deal: Deal object to post
+            webhook_urls: Webhooks to post to (defaults to every configured webhook)
+
+        Returns:
+            ID of the message posted to the first webhook that accepted it, None on failure
+        """
+        embed = add_link_field(create_deal_embed(deal), deal)
+        messages = [m for m in await self._publish({"embeds": [embed.to_dict()]}, webhook_urls) if m]
+        if not messages:
+            return None
+        logger.info(f"Posted deal via webhook: {deal.asin} ({deal.discount_percent:.1f}% off)")
+        return int(messages[0]["id"])
+
+    async def edit_deal(
+        self,
+        deal: Deal,
+        message_id: int,
+        previous_price: float,
+        webhook_urls: Optional[Sequence[str]] = None
+    ) -> bool:
+        """
+        Edit the embed of a message posted by a webhook
+
+        Args:
+            deal: Deal as seen in the latest cycle
+            message_id: ID of the message posted for the deal
+            previous_price: Price shown in the message until now
+            webhook_urls: Webhook that posted the message (defaults to the first configured webhook)
+
+        Returns:
+            True if edited successfully, False otherwise
+        """
+        if not self.session:
+            await self.start()
+
+        url = (webhook_urls or self.webhook_urls)[0]
+        embed = add_link_field(create_update_embed(deal, previous_price), deal)
+        message = await self._execute(f"{url}/messages/{message_id}", {"embeds": [embed.to_dict()]}, method="PATCH")
+        if message:
+            logger.info(f"Edited deal via webhook: {deal.asin} (€{previous_price:.2f} → €{deal.current_price:.2f}, {deal.availability})")
+        return bool(message)
+
+    async def post_digest(self, deals: List[Deal], webhook_urls: Optional[Sequence[str]] = None) -> bool:
+        """
+        Post several deals as one multi-embed message to every webhook
+
+        Args:
+            deals: Deals to post together (10 at most)
+            webhook_urls: Webhooks to post to (defaults to every configured webhook)
+
+        Returns:
+            True if posted to at least one webhook, False otherwise
+        """
+        embeds = []
+        for i, deal in enumerate(deals, start=1):
+            embed = create_digest_embed(deal, i)
+            embed.description += f" • [🛒]({deal.amazon_cart_url})"
+            embeds.append(embed.to_dict())
+
+        success = any(await self._publish({"embeds": embeds}, webhook_urls))
+        if success:
+            logger.info(f"Posted digest of {len(deals)} deals via webhook")
+        return success
+
+    async def send_status_message(
+        self,
+        message: str,
+        error: bool = False,
+        webhook_urls: Optional[Sequence[str]] = None
+    ) -> None:
+        """
+        Send a status message to one or more webhooks
+
+        Args:
+            message: Status message to send
+            error: Whether this is an error message
+            webhook_urls: Webhooks to post to (defaults to every configured webhook)
+        """
+        try:
+            await self._publish({"embeds": [create_status_embed(message, error).to_dict()]}, webhook_urls)
+        except Exception as e:
+            logger.error(f"Failed to send status message via webhook: {e}")
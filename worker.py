@@ -0,0 +1,590 @@
+"""
+Multi-process sharded scraping
+A supervisor starts N scraper processes, each with its own browser and a
+shard of the Keepa URLs, which stream their deals to the publisher process
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from cache import DealCache
+from history import PriceHistory
+from logs import listen_to_workers, setup_worker_logging
+from metrics import REGISTRY, SCRAPER_METRICS
+from network import NetworkFilter
+from rules import RuleSet
+from scheduler import AdaptiveScheduler
+from scraper import OUT_OF_STOCK, KeepaScraperEngine
+from tracing import configure_tracing, current_cycle, trace_cycle
+
+logger = logging.getLogger(__name__)
+
+# Messages sent by the workers, as tuples starting with their kind
+DEALS = "deals"  # (DEALS, worker, cycle_id, deals)
+CYCLE = "cycle"  # (CYCLE, worker, cycle_id, seconds, found, new)
+METRICS = "metrics"  # (METRICS, worker, snapshot), handled by the supervisor
+
+# Sent by the supervisor to each worker
+POSTED = "posted"  # (POSTED, asins): every ASIN with a posted message
+
+# Seconds between metric reports of a live worker
+METRICS_INTERVAL = 30.0
+
+
+@dataclass
+class ScraperSettings:
+    """Scraper configuration shared by the in-process scraper and the workers (picklable)"""
+    headless: bool = True
+    use_cookies: bool = False
+    cookies_file: str = "cookies.json"
+    save_cookies: bool = True
+    profile_dir: str = ""
+    extraction_mode: str = "dom"
+    max_contexts: int = 2
+    max_concurrency: int = 2
+    block_resources: bool = True
+    blocked_resource_types: str = ""
+    blocked_hosts: str = ""
+    allowed_hosts: str = ""
+    rules_file: str = ""
+    history_min_observations: int = 5
+    keep_posted: bool = False  # Keep rows that lost their price, to mark posted deals out of stock
+
+    # Only used by worker processes, the publisher runs these itself in-process
+    min_discount: float = 40.0
+    chunk_size: int = 25
+    live_mode: bool = False
+    live_stale_seconds: int = 900
+    cache_duration_hours: int = 24
+    scheduler: Dict[str, object] = field(default_factory=dict)  # AdaptiveScheduler arguments
+    history_file: str = ""  # Empty = no local price history
+    history_save_interval: int = 3600
+    debug: bool = False
+    log_sample_rate: float = 5.0
+    trace_file: str = ""
+    trace_max_bytes: int = 50 * 1024 * 1024
+    trace_backup_count: int = 5
+
+
+def create_scraper(
+    settings: ScraperSettings,
+    urls: List[str],
+    url_intervals: Dict[str, Optional[float]],
+    price_history: Optional[PriceHistory] = None,
+    is_posted: Optional[Callable[[str], bool]] = None
+) -> KeepaScraperEngine:
+    """
+    Build a scraper engine for a set of URLs
+
+    Args:
+        settings: Scraper configuration
+        urls: Keepa URLs watched by the engine
+        url_intervals: Per-URL intervals (None = every cycle)
+        price_history: Local price history cross-checking Keepa's discounts
+        is_posted: Tells whether an ASIN has a posted message
+
+    Returns:
+        KeepaScraperEngine instance, not initialized
+    """
+    network_filter = None
+    if settings.block_resources:
+        network_filter = NetworkFilter(
+            blocked_resource_types=settings.blocked_resource_types,
+            blocked_hosts=settings.blocked_hosts,
+            allowed_hosts=settings.allowed_hosts
+        )
+
+    rules = RuleSet.from_file(settings.rules_file) if settings.rules_file else RuleSet()
+
+    return KeepaScraperEngine(
+        keepa_url=urls,
+        headless=settings.headless,
+        use_cookies=settings.use_cookies,
+        cookies_file=settings.cookies_file,
+        network_filter=network_filter,
+        extraction_mode=settings.extraction_mode,
+        url_intervals={url: url_intervals.get(url) for url in urls},
+        max_contexts=settings.max_contexts,
+        max_concurrency=settings.max_concurrency,
+        price_history=price_history,
+        history_min_observations=settings.history_min_observations,
+        rules=rules,
+        profile_dir=settings.profile_dir or None,
+        save_cookies=settings.save_cookies,
+        is_posted=is_posted
+    )
+
+
+def shard_urls(urls: List[str], workers: int) -> List[List[str]]:
+    """
+    Split URLs between workers, round-robin
+
+    Args:
+        urls: Keepa URLs
+        workers: Number of worker processes
+
+    Returns:
+        One non-empty list of URLs per worker (fewer lists than workers if
+        there are fewer URLs)
+    """
+    count = max(1, min(workers, len(urls)))
+    return [urls[i::count] for i in range(count)]
+
+
+def _worker_path(path: str, index: int) -> str:
+    """Per-worker variant of a file or directory path (cache.db -> cache-2.db)"""
+    base, ext = os.path.splitext(path)
+    return f"{base}-{index + 1}{ext}"
+
+
+class ScraperWorker:
+    """
+    Scraping loop of one worker process
+
+    Mirrors the publisher's scraper and live loops, but hands every chunk
+    to a multiprocessing queue instead of the pipeline. Deal caching and
+    posting stay in the publisher; the worker only remembers which ASINs
+    it has sent recently, to feed its adaptive scheduler.
+    """
+
+    def __init__(
+        self,
+        index: int,
+        settings: ScraperSettings,
+        urls: List[str],
+        url_intervals: Dict[str, Optional[float]],
+        deal_queue,
+        stop_event,
+        control_queue=None
+    ):
+        """
+        Initialize the worker
+
+        Args:
+            index: Worker number, from 0
+            settings: Scraper configuration
+            urls: Shard of Keepa URLs owned by the worker
+            url_intervals: Per-URL intervals
+            deal_queue: Multiprocessing queue read by the publisher
+            stop_event: Multiprocessing event set by the supervisor to stop
+            control_queue: Multiprocessing queue of posted-ASIN snapshots from the supervisor
+        """
+        self.index = index
+        self.settings = settings
+        self.deal_queue = deal_queue
+        self.stop_event = stop_event
+        self.control_queue = control_queue
+        self.posted: Set[str] = set()
+        self._metrics_sent_at = 0.0
+
+        self.price_history: Optional[PriceHistory] = None
+        self.history_file = ""
+        if settings.history_file:
+            self.price_history = PriceHistory()
+            self.history_file = _worker_path(settings.history_file, index)
+            # Start from the shared history the first time
+            for path in (self.history_file, settings.history_file):
+                if os.path.exists(path):
+                    try:
+                        self.price_history.load(path)
+                        break
+                    except Exception as e:
+                        logger.error(f"Failed to load price history {path}: {e}")
+        self._history_saved_at = time.monotonic()
+
+        self.scheduler = AdaptiveScheduler(**settings.scheduler)
+        self.seen = DealCache(cache_duration_hours=settings.cache_duration_hours)
+        self.scraper = create_scraper(
+            settings,
+            urls,
+            url_intervals,
+            price_history=self.price_history,
+            # Keep posted deals that lost their price, from the supervisor's last snapshot
+            is_posted=self.posted.__contains__ if settings.keep_posted else None
+        )
+
+    @property
+    def stopping(self) -> bool:
+        return self.stop_event.is_set()
+
+    def _send(self, message: tuple) -> None:
+        """Queue a message for the publisher (never waits, the queue is unbounded)"""
+        self.deal_queue.put(message)
+
+    def _read_control(self) -> None:
+        """Apply the latest posted-ASIN snapshot sent by the supervisor, without waiting"""
+        if self.control_queue is None:
+            return
+        latest = None
+        while True:
+            try:
+                latest = self.control_queue.get_nowait()
+            except queue.Empty:
+                break
+        if latest and latest[0] == POSTED:
+            # Updated in place, the scraper holds a reference to the set's lookup
+            self.posted.clear()
+            self.posted.update(latest[1])
+
+    def _report_metrics(self, force: bool = False) -> None:
+        """Send the browser-side metrics to the publisher's /metrics"""
+        now = time.monotonic()
+        if force or now - self._metrics_sent_at >= METRICS_INTERVAL:
+            self._metrics_sent_at = now
+            self._send((METRICS, self.index, REGISTRY.snapshot(SCRAPER_METRICS)))
+
+    async def _sleep(self, seconds: float) -> None:
+        """Sleep, waking up early when the supervisor asks to stop"""
+        deadline = time.monotonic() + seconds
+        while not self.stopping and time.monotonic() < deadline:
+            await asyncio.sleep(min(1.0, deadline - time.monotonic()))
+
+    def save_price_history(self, force: bool = False) -> None:
+        """Save the worker's price history when the save interval has elapsed"""
+        if not self.price_history:
+            return
+        if not force and time.monotonic() - self._history_saved_at < self.settings.history_save_interval:
+            return
+
+        try:
+            self.price_history.save(self.history_file)
+        except Exception as e:
+            logger.error(f"Failed to save price history: {e}")
+        self._history_saved_at = time.monotonic()
+
+    async def run(self) -> None:
+        """Initialize the browser and scrape until stopped"""
+        try:
+            await self.scraper.initialize()
+            if self.settings.live_mode:
+                await self.live_loop()
+            else:
+                await self.scraper_loop()
+        finally:
+            await self.scraper.cleanup()
+            self.save_price_history(force=True)
+
+    async def scraper_loop(self) -> None:
+        """Scrape the shard on the adaptive schedule"""
+        while not self.stopping:
+            # URLs without their own interval only run on scheduler cycles
+            full_cycle = self.scheduler.seconds_until_next() <= 0
+            self._read_control()
+            try:
+                if full_cycle:
+                    self.scheduler.cycle_started()
+                cycle_started = time.perf_counter()
+
+                with trace_cycle(worker=self.index, full_cycle=full_cycle) as cycle_span:
+                    found = 0
+                    new_deals = 0
+                    async for chunk in self.scraper.scrape_deals_stream(
+                        min_discount=self.settings.min_discount,
+                        chunk_size=self.settings.chunk_size,
+                        full_cycle=full_cycle
+                    ):
+                        found += len(chunk)
+                        # Priceless rows are only there to update posted messages, not new deals
+                        new_asins = set(self.seen.filter_new(
+                            deal.asin for deal in chunk if deal.availability != OUT_OF_STOCK
+                        ))
+                        for asin in new_asins:
+                            self.seen.add(asin)
+                        new_deals += len(new_asins)
+                        self._send((DEALS, self.index, current_cycle(), chunk))
+
+                        if self.stopping:
+                            break
+
+                    cycle_span.set(found=found, new=new_deals)
+                    self._send((CYCLE, self.index, current_cycle(), time.perf_counter() - cycle_started, found, new_deals))
+                    self._report_metrics(force=True)
+                    logger.info(f"Scraping cycle {current_cycle()} complete. Found {found} deals ({new_deals} new).")
+
+                if full_cycle:
+                    cycle = self.scraper.cycle_stats
+                    self.scheduler.record(
+                        new_deals,
+                        errors=cycle.get('failures', 0),
+                        challenges=cycle.get('challenges', 0)
+                    )
+                self.save_price_history()
+
+                wait = self.scheduler.seconds_until_next()
+                due = self.scraper.seconds_until_due()
+                if due is not None:
+                    wait = min(wait, due)
+                logger.info(f"Waiting {wait:.0f}s until next scan...")
+                await self._sleep(wait)
+
+            except Exception as e:
+                logger.error(f"Error in scraper loop: {e}", exc_info=True)
+
+                if full_cycle:
+                    self.scheduler.record(0, errors=1)
+                try:
+                    logger.info("Attempting to recover scraper...")
+                    await self.scraper.recover()
+                    await self._sleep(max(self.scheduler.seconds_until_next(), 30))
+                except Exception as recover_error:
+                    logger.error(f"Failed to recover scraper: {recover_error}")
+                    await self._sleep(max(self.scheduler.seconds_until_next(), 60))
+
+    async def live_loop(self) -> None:
+        """Keep the shard's pages open and send deals as they appear"""
+        while not self.stopping:
+            try:
+                async for chunk in self.scraper.live_deals_stream(
+                    min_discount=self.settings.min_discount,
+                    stale_after=self.settings.live_stale_seconds
+                ):
+                    self._send((DEALS, self.index, None, chunk))
+                    self._read_control()
+                    self._report_metrics()
+                    self.save_price_history()
+
+                    if self.stopping:
+                        break
+
+            except Exception as e:
+                logger.error(f"Error in live loop: {e}", exc_info=True)
+
+                try:
+                    logger.info("Attempting to recover scraper...")
+                    await self.scraper.recover()
+                    await self._sleep(30)
+                except Exception as recover_error:
+                    logger.error(f"Failed to recover scraper: {recover_error}")
+                    await self._sleep(60)
+
+
+def run_worker(
+    index: int,
+    settings: ScraperSettings,
+    urls: List[str],
+    url_intervals: Dict[str, Optional[float]],
+    deal_queue,
+    log_queue,
+    stop_event,
+    control_queue=None
+) -> None:
+    """Entry point of a worker process"""
+    # Ctrl+C reaches the whole process group; the supervisor decides when workers stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    setup_worker_logging(log_queue, settings.debug, settings.log_sample_rate)
+    if settings.trace_file:
+        configure_tracing(
+            _worker_path(settings.trace_file, index), settings.trace_max_bytes, settings.trace_backup_count
+        )
+
+    logger.info(f"Scraper worker {index + 1} started with {len(urls)} URL(s): {', '.join(urls)}")
+    try:
+        worker = ScraperWorker(index, settings, urls, url_intervals, deal_queue, stop_event, control_queue)
+        asyncio.run(worker.run())
+    except Exception as e:
+        logger.error(f"Scraper worker {index + 1} crashed: {e}", exc_info=True)
+        # Exit code 1 tells the supervisor to restart the worker
+        raise SystemExit(1)
+    finally:
+        # Deals still buffered once the publisher stopped reading must not block the exit
+        deal_queue.cancel_join_thread()
+    logger.info(f"Scraper worker {index + 1} stopped")
+
+
+class WorkerSupervisor:
+    """
+    Starts and watches the scraper worker processes
+
+    Each worker owns a shard of the URLs and its own browser, so scraping
+    uses several cores while a single publisher process dedups and posts.
+    Workers that die are restarted with a backoff. The supervisor sends
+    each worker the ASINs with a posted message, so they only keep the
+    priceless rows needed for out-of-stock edits, and adds the browser
+    metrics they report to the publisher's registry.
+    """
+
+    def __init__(
+        self,
+        settings: ScraperSettings,
+        urls: List[str],
+        url_intervals: Dict[str, Optional[float]],
+        workers: int,
+        restart_delay: float = 30.0,
+        posted_asins: Optional[Callable[[], Iterable[str]]] = None,
+        sync_interval: float = 30.0
+    ):
+        """
+        Initialize the supervisor
+
+        Args:
+            settings: Scraper configuration
+            urls: Every Keepa URL, split between the workers
+            url_intervals: Per-URL intervals
+            workers: Number of worker processes (capped at the number of URLs)
+            restart_delay: Seconds before restarting a dead worker, doubled on each crash
+            posted_asins: Returns the ASINs with a posted message, None if edits are off
+            sync_interval: Minimum seconds between two posted-ASIN snapshots to a worker
+        """
+        # Playwright and asyncio do not survive a fork
+        self._context = multiprocessing.get_context('spawn')
+        self.settings = settings
+        self.url_intervals = url_intervals
+        self.shards = shard_urls(urls, workers)
+        self.restart_delay = restart_delay
+        self.posted_asins = posted_asins
+        self.sync_interval = sync_interval
+
+        self.deals = self._context.Queue()
+        self._controls = [self._context.Queue() for _ in self.shards]
+        self._synced_at: List[float] = [0.0] * len(self.shards)
+        self.logs = self._context.Queue()
+        self._log_listener = None
+        self._stop_event = self._context.Event()
+        self._processes: List[Optional[multiprocessing.Process]] = [None] * len(self.shards)
+        self._restart_at: List[float] = [0.0] * len(self.shards)
+        self._crashes: List[int] = [0] * len(self.shards)
+        self.restarts = 0
+
+    def _worker_settings(self, index: int) -> ScraperSettings:
+        """Settings of one worker: its own browser profile, only the first one saves cookies"""
+        settings = ScraperSettings(**vars(self.settings))
+        if settings.profile_dir:
+            settings.profile_dir = _worker_path(settings.profile_dir, index)
+        settings.save_cookies = settings.save_cookies and index == 0
+        return settings
+
+    def _spawn(self, index: int) -> None:
+        process = self._context.Process(
+            target=run_worker,
+            args=(
+                index,
+                self._worker_settings(index),
+                self.shards[index],
+                self.url_intervals,
+                self.deals,
+                self.logs,
+                self._stop_event,
+                self._controls[index]
+            ),
+            name=f"scraper-{index + 1}",
+            daemon=True
+        )
+        process.start()
+        self._processes[index] = process
+        self.sync_posted(index, force=True)
+
+    def sync_posted(self, index: int, force: bool = False) -> None:
+        """
+        Send a worker the ASINs with a posted message
+
+        Args:
+            index: Worker number
+            force: Send even if the last snapshot is recent
+        """
+        if not self.posted_asins:
+            return
+        now = time.monotonic()
+        if not force and now - self._synced_at[index] < self.sync_interval:
+            return
+        self._synced_at[index] = now
+        try:
+            self._controls[index].put((POSTED, frozenset(self.posted_asins())))
+        except Exception as e:
+            logger.error(f"Failed to send posted deals to worker {index + 1}: {e}")
+
+    def start(self) -> None:
+        """Start one process per shard"""
+        self._log_listener = listen_to_workers(self.logs)
+        for index in range(len(self.shards)):
+            self._spawn(index)
+        logger.info(f"Started {len(self.shards)} scraper workers")
+
+    def check(self) -> None:
+        """Restart workers that exited, once their backoff has elapsed"""
+        if self._stop_event.is_set():
+            return
+        now = time.monotonic()
+        for index, process in enumerate(self._processes):
+            if process is None or process.is_alive():
+                continue
+            if not self._restart_at[index]:
+                # Keep its totals, its replacement counts from zero
+                REGISTRY.retire_remote(process.name)
+                self._crashes[index] += 1
+                delay = self.restart_delay * 2 ** min(self._crashes[index] - 1, 5)
+                self._restart_at[index] = now + delay
+                logger.error(
+                    f"Scraper worker {index + 1} exited with code {process.exitcode}, restarting in {delay:.0f}s"
+                )
+            elif now >= self._restart_at[index]:
+                self._restart_at[index] = 0.0
+                self.restarts += 1
+                self._spawn(index)
+
+    async def messages(self, poll_interval: float = 1.0):
+        """
+        Yield the deal and cycle messages sent by the workers until stop() is called
+
+        Reads happen in a thread, so the event loop never blocks on the queue.
+        Metric reports are applied to the registry here, and workers that
+        sent a message get a fresh posted-ASIN snapshot when theirs is old.
+        """
+        checked_at = time.monotonic()
+        while not self._stop_event.is_set():
+            try:
+                message = await asyncio.to_thread(self.deals.get, True, poll_interval)
+            except queue.Empty:
+                message = None
+
+            if message is not None:
+                worker = message[1]
+                if message[0] == METRICS:
+                    REGISTRY.set_remote(f"scraper-{worker + 1}", message[2])
+                else:
+                    yield message
+                self.sync_posted(worker)
+
+            if time.monotonic() - checked_at >= poll_interval:
+                checked_at = time.monotonic()
+                self.check()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Ask the workers to stop and wait for them, killing those that hang"""
+        self._stop_event.set()
+        for control in self._controls:
+            # Snapshots a dead worker never read must not block our exit
+            control.cancel_join_thread()
+        deadline = time.monotonic() + timeout
+        for process in self._processes:
+            if process is None:
+                continue
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning(f"Scraper worker {process.name} did not stop, terminating it")
+                process.terminate()
+                process.join(5)
+        if self._log_listener:
+            self._log_listener.stop()
+            self._log_listener = None
+
+    def get_stats(self) -> dict:
+        """Get the state of every worker"""
+        return {
+            "workers": [
+                {
+                    "name": f"scraper-{index + 1}",
+                    "urls": len(shard),
+                    "alive": bool(process and process.is_alive()),
+                    "crashes": self._crashes[index],
+                }
+                for index, (shard, process) in enumerate(zip(self.shards, self._processes))
+            ],
+            "restarts": self.restarts,
+        }